@@ -0,0 +1,205 @@
+# AlarmAudioService Class
+#
+# Plays the alarm sounds on a thread of its own, so that starting, stopping and
+# polling the audio never blocks the frame processing loop (slow audio drivers
+# made frame times spike when an alarm started). The WAV files are decoded into
+# PCM buffers once at startup, the alarm objects only put fire/stop commands in
+# a queue, which never blocks.
+
+import queue
+import threading
+import time
+import wave
+import simpleaudio as sa
+
+# Alarm name -> WAV file of its sound, in decreasing priority
+ALARM_WAV_FILE_PATHS = {
+    "eyes_closed": "assets/audios/eyes_closed.wav",
+    "yawn": "assets/audios/yawn.wav",
+}
+
+# Put in the command queue to stop the service
+SHUTDOWN = None
+
+
+def load_pcm_buffer(wav_file_path: str) -> tuple:
+    """
+    Decodes a WAV file into a PCM buffer simpleaudio can play.
+
+    Args:
+    - wav_file_path (str): File path of the WAV audio file.
+
+    Returns:
+    - pcm_buffer (tuple): (audio data (bytes), number of channels, bytes per sample, sample rate).
+    """
+    with wave.open(wav_file_path, "rb") as wav_file:
+        return (
+            wav_file.readframes(wav_file.getnframes()),
+            wav_file.getnchannels(),
+            wav_file.getsampwidth(),
+            wav_file.getframerate(),
+        )
+
+
+class AlarmAudioService:
+    def __init__(
+        self,
+        alarm_wav_file_paths: dict = ALARM_WAV_FILE_PATHS,
+        debounce_interval: float = 0.5,
+        poll_interval: float = 0.05,
+    ) -> None:
+        """
+        Initializes the AlarmAudioService object, loading the alarm sounds.
+
+        Args:
+        - alarm_wav_file_paths (dict): Alarm name -> file path of its WAV sound, in decreasing priority.
+        - debounce_interval (float): Minimum seconds between two starts of the sound of an alarm.
+        - poll_interval (float): Seconds between two checks of the playing sound while no command comes.
+
+        Attributes:
+        - pcm_buffers (dict): Alarm name -> PCM buffer of its sound (see load_pcm_buffer).
+        - priorities (dict): Alarm name -> priority, higher sounds over lower.
+        - debounce_interval (float): Minimum seconds between two starts of the sound of an alarm.
+        - poll_interval (float): Seconds between two checks of the playing sound.
+        - commands (queue.SimpleQueue): (command, alarm name) tuples waiting for the service thread.
+        - playing (str): Name of the alarm whose sound is playing, None if none, set by the service thread.
+        - play_object: simpleaudio PlayObject of the playing sound, None if none.
+        - last_started (dict): Alarm name -> time.monotonic() value its sound last started at.
+        - sounds_started (int): Number of alarm sounds started.
+        - thread: Thread playing the sounds, None if not started.
+        """
+        self.pcm_buffers: dict = {
+            name: load_pcm_buffer(wav_file_path)
+            for name, wav_file_path in alarm_wav_file_paths.items()
+        }
+        self.priorities: dict = {
+            name: len(alarm_wav_file_paths) - index
+            for index, name in enumerate(alarm_wav_file_paths)
+        }
+        self.debounce_interval: float = debounce_interval
+        self.poll_interval: float = poll_interval
+        self.commands = queue.SimpleQueue()
+        self.playing: str = None
+        self.play_object = None
+        self.last_started: dict = {}
+        self.sounds_started: int = 0
+        self.thread = None
+
+    def start(self):
+        """
+        Starts the service thread.
+
+        Returns:
+        - self (AlarmAudioService): The started service.
+        """
+        self.thread = threading.Thread(
+            target=self.play_loop, name="alarm-audio", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def fire(self, name: str) -> None:
+        """
+        Asks for the sound of an alarm to play, without waiting. Called every frame while the
+        alarm condition holds, the sound restarts when it ends.
+
+        Args:
+        - name (str): Name of the alarm.
+
+        Returns:
+        None
+        """
+        self.commands.put(("fire", name))
+
+    def stop_alarm(self, name: str) -> None:
+        """
+        Asks for the sound of an alarm to stop if it is playing, without waiting.
+
+        Args:
+        - name (str): Name of the alarm.
+
+        Returns:
+        None
+        """
+        self.commands.put(("stop", name))
+
+    def is_playing(self, name: str) -> bool:
+        """
+        Checks if the sound of an alarm is playing, as last seen by the service thread.
+
+        Args:
+        - name (str): Name of the alarm.
+
+        Returns:
+        - is_playing (bool): True if the sound of the alarm is playing, False otherwise.
+        """
+        return self.playing == name
+
+    def play_loop(self) -> None:
+        """
+        Runs the fire/stop commands until stopped, and notices when the playing sound ends.
+
+        Returns:
+        None
+        """
+        while True:
+            try:
+                command = self.commands.get(timeout=self.poll_interval)
+            except queue.Empty:
+                command = ()
+            if command is SHUTDOWN:
+                break
+            if self.play_object is not None and not self.play_object.is_playing():
+                self.playing = None
+                self.play_object = None
+            if command:
+                action, name = command
+                if action == "fire":
+                    self.play(name)
+                elif name == self.playing:
+                    self.play_object.stop()
+                    self.playing = None
+                    self.play_object = None
+        if self.play_object is not None:
+            self.play_object.stop()
+            self.playing = None
+            self.play_object = None
+
+    def play(self, name: str) -> None:
+        """
+        Starts the sound of an alarm, unless it or a higher priority alarm is playing or it
+        started less than debounce_interval seconds ago. Stops a lower priority sound.
+
+        Args:
+        - name (str): Name of the alarm.
+
+        Returns:
+        None
+        """
+        if self.playing is not None and (
+            self.priorities[self.playing] >= self.priorities[name]
+        ):
+            return
+        now = time.monotonic()
+        if now - self.last_started.get(name, -self.debounce_interval) < (
+            self.debounce_interval
+        ):
+            return
+        if self.play_object is not None:
+            self.play_object.stop()
+        self.play_object = sa.play_buffer(*self.pcm_buffers[name])
+        self.playing = name
+        self.last_started[name] = now
+        self.sounds_started += 1
+
+    def stop(self) -> None:
+        """
+        Stops the service thread and the playing sound.
+
+        Returns:
+        None
+        """
+        if self.thread is not None:
+            self.commands.put(SHUTDOWN)
+            self.thread.join()
+            self.thread = None
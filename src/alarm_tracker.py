@@ -0,0 +1,149 @@
+# AlarmTracker Classes
+
+import numpy as np
+from alarm_window import AlarmWindow, AlarmWindowArray
+
+
+class AlarmTracker:
+    def __init__(self, time_threshold: int) -> None:
+        """
+        Initializes the AlarmTracker object.
+
+        Decides alarms the same way as EyesClosed and Yawn, without playing any audio,
+        for offline scoring and for benchmarks on machines without audio.
+
+        Args:
+        - time_threshold (int): Time threshold in seconds.
+
+        Attributes:
+        - time_threshold (int): Time threshold in seconds.
+        - alarm_window (AlarmWindow): Sliding window of the bounded frames deciding the alarm.
+        - alarming (bool): Whether the alarm condition held on the last frame.
+        - alarms_started (int): Number of times the alarm started.
+        """
+        self.time_threshold: int = time_threshold
+        self.alarm_window: AlarmWindow = AlarmWindow(time_threshold)
+        self.alarming: bool = False
+        self.alarms_started: int = 0
+
+    def add_bounded_frame(self, ok: bool, timestamp: float) -> bool:
+        """
+        Adds a bounded frame to the tracker.
+
+        Args:
+        - ok (bool): Flag indicating if the frame is "ok" or "notok".
+        - timestamp (float): Monotonic capture timestamp of the frame in seconds.
+
+        Returns:
+        - started (bool): True if the alarm started on this frame, False otherwise.
+        """
+        was_alarming = self.alarming
+        self.alarming = self.alarm_window.add(ok, timestamp)
+        started = self.alarming and not was_alarming
+        if started:
+            self.alarms_started += 1
+        return started
+
+    def update_time_threshold(self, time_threshold: int) -> None:
+        """
+        Updates the time threshold.
+
+        Args:
+        - time_threshold (int): Time threshold in seconds.
+
+        Returns:
+        None
+        """
+        self.time_threshold = time_threshold
+        self.alarm_window.update_time_threshold(time_threshold)
+
+    def trigger_alarm(self) -> None:
+        """
+        Does nothing, as AlarmTracker plays no audio, so that it can stand in for EyesClosed/Yawn.
+
+        Returns:
+        None
+        """
+        pass
+
+    def reset(self) -> None:
+        """
+        Resets the state of the AlarmTracker object.
+
+        Returns:
+        None
+        """
+        self.alarm_window.reset()
+        self.alarming = False
+
+
+class AlarmTrackerArray:
+    def __init__(self, size: int, time_threshold: int) -> None:
+        """
+        Initializes the AlarmTrackerArray object, the struct-of-arrays version of AlarmTracker.
+
+        Decides the alarms of several faces at once, each index holding the alarm state of one face.
+
+        Args:
+        - size (int): Number of tracked faces.
+        - time_threshold (int): Time threshold in seconds.
+
+        Attributes:
+        - time_threshold (int): Time threshold in seconds.
+        - alarm_windows (AlarmWindowArray): Sliding windows of the bounded frames deciding the alarms.
+        - alarming (numpy.ndarray): (size,) whether the alarm condition held on the last frame of each face.
+        - alarms_started (numpy.ndarray): (size,) number of times the alarm of each face started.
+        - alarms_started_total (int): Number of times the alarm of any face started, kept across resets.
+        """
+        self.time_threshold: int = time_threshold
+        self.alarm_windows: AlarmWindowArray = AlarmWindowArray(size, time_threshold)
+        self.alarming = np.zeros(size, dtype=bool)
+        self.alarms_started = np.zeros(size, dtype=np.int64)
+        self.alarms_started_total: int = 0
+
+    def add_bounded_frames(self, indices, ok, timestamp: float):
+        """
+        Adds a bounded frame to the trackers of some faces.
+
+        Args:
+        - indices (numpy.ndarray): Indices of the faces, without duplicates.
+        - ok (numpy.ndarray): Flags indicating if the frame of each face is "ok" or "notok".
+        - timestamp (float): Monotonic capture timestamp of the frame in seconds.
+
+        Returns:
+        - started (numpy.ndarray): True where the alarm started on this frame, False otherwise.
+        """
+        was_alarming = self.alarming[indices]
+        alarming = self.alarm_windows.add(indices, ok, timestamp)
+        self.alarming[indices] = alarming
+        started = alarming & ~was_alarming
+        self.alarms_started[indices] += started
+        self.alarms_started_total += int(np.count_nonzero(started))
+        return started
+
+    def update_time_threshold(self, time_threshold: int) -> None:
+        """
+        Updates the time threshold.
+
+        Args:
+        - time_threshold (int): Time threshold in seconds.
+
+        Returns:
+        None
+        """
+        self.time_threshold = time_threshold
+        self.alarm_windows.update_time_threshold(time_threshold)
+
+    def reset(self, indices) -> None:
+        """
+        Resets the state of some faces, e.g. when their index is given to a new face.
+
+        Args:
+        - indices (numpy.ndarray): Indices of the faces to reset.
+
+        Returns:
+        None
+        """
+        self.alarm_windows.reset(indices)
+        self.alarming[indices] = False
+        self.alarms_started[indices] = 0
@@ -0,0 +1,342 @@
+# AlarmWindow Classes
+#
+# Decide alarms from the capture timestamps of the frames, instead of counting
+# frames against time_threshold * fps: an alarm holds while the eyes were closed
+# (or the mouth yawning) for more than percentage_threshold% of a sliding window
+# of the last time_threshold * 100 / percentage_threshold seconds. Continuous
+# closure therefore alarms after time_threshold seconds, whatever the frame rate,
+# and short openings (blinks) within the window are tolerated.
+#
+# Every frame holds its state for the time since the previous frame. Durations
+# are kept in integer nanoseconds, so that the window sums are exact and
+# threshold_sweep reproduces the alarms bit for bit. A gap longer than
+# max_frame_gap between two frames (face lost, stream stalled) empties the window.
+
+import collections
+import numpy as np
+
+# Percentage of the window the eyes must be closed (mouth yawning) for the alarm
+PERCENTAGE_THRESHOLD = 80
+
+# Seconds between two frames after which the window is emptied
+MAX_FRAME_GAP = 1.0
+
+
+def to_nanoseconds(seconds):
+    """
+    Converts seconds to integer nanoseconds.
+
+    Args:
+    - seconds (float or numpy.ndarray): Seconds.
+
+    Returns:
+    - nanoseconds (int or numpy.ndarray): Rounded nanoseconds, int64 for arrays.
+    """
+    if isinstance(seconds, np.ndarray):
+        return np.round(seconds * 1e9).astype(np.int64)
+    return round(seconds * 1e9)
+
+
+def window_nanoseconds(time_threshold: float, percentage_threshold: int) -> int:
+    """
+    Returns the length of the sliding window of a time threshold.
+
+    Args:
+    - time_threshold (float): Time threshold in seconds.
+    - percentage_threshold (int): Percentage of the window the state must be "notok" for the alarm.
+
+    Returns:
+    - window (int): Window length in nanoseconds.
+    """
+    return to_nanoseconds(time_threshold * 100 / percentage_threshold)
+
+
+class AlarmWindow:
+    def __init__(
+        self,
+        time_threshold: float,
+        percentage_threshold: int = PERCENTAGE_THRESHOLD,
+        max_frame_gap: float = MAX_FRAME_GAP,
+    ) -> None:
+        """
+        Initializes the AlarmWindow object.
+
+        Args:
+        - time_threshold (float): Seconds of continuous "notok" state after which the alarm holds.
+        - percentage_threshold (int): Percentage of the window the state must be "notok" for the alarm.
+        - max_frame_gap (float): Seconds between two frames after which the window is emptied.
+
+        Attributes:
+        - time_threshold (float): Seconds of continuous "notok" state after which the alarm holds.
+        - percentage_threshold (int): Percentage of the window the state must be "notok" for the alarm.
+        - max_frame_gap (int): Nanoseconds between two frames after which the window is emptied.
+        - window (int): Length of the sliding window in nanoseconds.
+        - entries (collections.deque): (end timestamp, duration, ok) of the frames in the window, in nanoseconds.
+        - notok_duration (int): Nanoseconds of "notok" state of the entries.
+        - last_timestamp (int): Timestamp of the last frame in nanoseconds, None before the first frame.
+        - alarming (bool): Whether the alarm condition held on the last frame.
+        """
+        self.percentage_threshold: int = percentage_threshold
+        self.max_frame_gap: int = to_nanoseconds(max_frame_gap)
+        self.entries: collections.deque = collections.deque()
+        self.notok_duration: int = 0
+        self.last_timestamp = None
+        self.alarming: bool = False
+        self.update_time_threshold(time_threshold)
+
+    def update_time_threshold(self, time_threshold: float) -> None:
+        """
+        Updates the time threshold, and the window length with it.
+
+        Args:
+        - time_threshold (float): Time threshold in seconds.
+
+        Returns:
+        None
+        """
+        self.time_threshold: float = time_threshold
+        self.window: int = window_nanoseconds(time_threshold, self.percentage_threshold)
+
+    def add(self, ok: bool, timestamp: float) -> bool:
+        """
+        Adds a frame to the window.
+
+        Args:
+        - ok (bool): Flag indicating if the frame is "ok" or "notok".
+        - timestamp (float): Monotonic capture timestamp of the frame in seconds.
+
+        Returns:
+        - alarming (bool): True if the alarm condition holds, False otherwise.
+        """
+        timestamp = to_nanoseconds(timestamp)
+        if self.last_timestamp is None or not (
+            0 <= timestamp - self.last_timestamp <= self.max_frame_gap
+        ):
+            self.reset()
+        elif timestamp > self.last_timestamp:
+            duration = timestamp - self.last_timestamp
+            self.entries.append((timestamp, duration, ok))
+            if not ok:
+                self.notok_duration += duration
+        self.last_timestamp = timestamp
+
+        # Dropping the entries that ended before the window, trimming the one it starts in
+        window_start = timestamp - self.window
+        while self.entries and self.entries[0][0] <= window_start:
+            _, duration, entry_ok = self.entries.popleft()
+            if not entry_ok:
+                self.notok_duration -= duration
+        notok_duration = self.notok_duration
+        if self.entries:
+            end, duration, entry_ok = self.entries[0]
+            if not entry_ok and end - duration < window_start:
+                notok_duration -= window_start - (end - duration)
+
+        self.alarming = notok_duration * 100 > self.percentage_threshold * self.window
+        return self.alarming
+
+    def notok_pending(self, share: float = 0.25) -> bool:
+        """
+        Checks if "notok" state is building up in the window, beyond what blinks account for.
+
+        Args:
+        - share (float): Share of the alarm threshold the "notok" time must exceed.
+
+        Returns:
+        - notok_pending (bool): True if the "notok" time of the window exceeds share of the alarm threshold,
+                                False otherwise.
+        """
+        return (
+            self.notok_duration * 100 > share * self.percentage_threshold * self.window
+        )
+
+    def reset(self) -> None:
+        """
+        Empties the window.
+
+        Returns:
+        None
+        """
+        self.entries.clear()
+        self.notok_duration = 0
+        self.last_timestamp = None
+        self.alarming = False
+
+
+class AlarmWindowArray:
+    def __init__(
+        self,
+        size: int,
+        time_threshold: float,
+        percentage_threshold: int = PERCENTAGE_THRESHOLD,
+        max_frame_gap: float = MAX_FRAME_GAP,
+        capacity: int = 256,
+    ) -> None:
+        """
+        Initializes the AlarmWindowArray object, the struct-of-arrays version of AlarmWindow.
+
+        Keeps the windows of several faces at once, each index holding the window of one face,
+        whose entries are kept in a ring buffer that grows when full.
+
+        Args:
+        - size (int): Number of windows.
+        - time_threshold (float): Seconds of continuous "notok" state after which the alarm holds.
+        - percentage_threshold (int): Percentage of the window the state must be "notok" for the alarm.
+        - max_frame_gap (float): Seconds between two frames after which a window is emptied.
+        - capacity (int): Initial number of entries of every ring buffer.
+
+        Attributes:
+        - time_threshold (float): Seconds of continuous "notok" state after which the alarm holds.
+        - percentage_threshold (int): Percentage of the window the state must be "notok" for the alarm.
+        - max_frame_gap (int): Nanoseconds between two frames after which a window is emptied.
+        - window (int): Length of the sliding windows in nanoseconds.
+        - ends (numpy.ndarray): (size, capacity) end timestamps of the entries in nanoseconds.
+        - durations (numpy.ndarray): (size, capacity) durations of the entries in nanoseconds.
+        - notok (numpy.ndarray): (size, capacity) True for "notok" entries.
+        - heads (numpy.ndarray): (size,) ring buffer index of the oldest entry of every window.
+        - counts (numpy.ndarray): (size,) number of entries of every window.
+        - notok_durations (numpy.ndarray): (size,) nanoseconds of "notok" state of the entries of every window.
+        - last_timestamps (numpy.ndarray): (size,) timestamp of the last frame of every window, -1 before the first.
+        - alarming (numpy.ndarray): (size,) whether the alarm condition held on the last frame of each window.
+        """
+        self.percentage_threshold: int = percentage_threshold
+        self.max_frame_gap: int = to_nanoseconds(max_frame_gap)
+        self.ends = np.zeros((size, capacity), dtype=np.int64)
+        self.durations = np.zeros((size, capacity), dtype=np.int64)
+        self.notok = np.zeros((size, capacity), dtype=bool)
+        self.heads = np.zeros(size, dtype=np.int64)
+        self.counts = np.zeros(size, dtype=np.int64)
+        self.notok_durations = np.zeros(size, dtype=np.int64)
+        self.last_timestamps = np.full(size, -1, dtype=np.int64)
+        self.alarming = np.zeros(size, dtype=bool)
+        self.update_time_threshold(time_threshold)
+
+    def update_time_threshold(self, time_threshold: float) -> None:
+        """
+        Updates the time threshold, and the window length with it.
+
+        Args:
+        - time_threshold (float): Time threshold in seconds.
+
+        Returns:
+        None
+        """
+        self.time_threshold: float = time_threshold
+        self.window: int = window_nanoseconds(time_threshold, self.percentage_threshold)
+
+    def grow(self) -> None:
+        """
+        Doubles the capacity of the ring buffers, moving the oldest entries to index 0.
+
+        Returns:
+        None
+        """
+        size, capacity = self.ends.shape
+        order = (self.heads[:, np.newaxis] + np.arange(capacity)) % capacity
+        rows = np.arange(size)[:, np.newaxis]
+        for name in ("ends", "durations", "notok"):
+            array = getattr(self, name)
+            grown = np.zeros((size, 2 * capacity), dtype=array.dtype)
+            grown[:, :capacity] = array[rows, order]
+            setattr(self, name, grown)
+        self.heads[:] = 0
+
+    def add(self, indices, ok, timestamp: float):
+        """
+        Adds a frame to some of the windows, as AlarmWindow.add would.
+
+        Args:
+        - indices (numpy.ndarray): Indices of the windows, without duplicates.
+        - ok (numpy.ndarray): Flags indicating if the frame of each window is "ok" or "notok".
+        - timestamp (float): Monotonic capture timestamp of the frame in seconds.
+
+        Returns:
+        - alarming (numpy.ndarray): True where the alarm condition holds, False otherwise.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        ok = np.asarray(ok, dtype=bool)
+        timestamp = to_nanoseconds(timestamp)
+        durations = timestamp - self.last_timestamps[indices]
+        restarted = (self.last_timestamps[indices] < 0) | ~(
+            (0 <= durations) & (durations <= self.max_frame_gap)
+        )
+        self.reset(indices[restarted])
+        self.last_timestamps[indices] = timestamp
+
+        appended = ~restarted & (durations > 0)
+        indices_appended = indices[appended]
+        if len(indices_appended) and (
+            self.counts[indices_appended].max() == self.ends.shape[1]
+        ):
+            self.grow()
+        capacity = self.ends.shape[1]
+        positions = (
+            self.heads[indices_appended] + self.counts[indices_appended]
+        ) % capacity
+        self.ends[indices_appended, positions] = timestamp
+        self.durations[indices_appended, positions] = durations[appended]
+        self.notok[indices_appended, positions] = ~ok[appended]
+        self.counts[indices_appended] += 1
+        self.notok_durations[indices_appended] += durations[appended] * ~ok[appended]
+
+        # Dropping the entries that ended before the windows, a few per frame at most
+        window_start = timestamp - self.window
+        expiring = indices[self.counts[indices] > 0]
+        while len(expiring):
+            heads = self.heads[expiring]
+            expired = self.ends[expiring, heads] <= window_start
+            expiring, heads = expiring[expired], heads[expired]
+            self.notok_durations[expiring] -= (
+                self.durations[expiring, heads] * self.notok[expiring, heads]
+            )
+            self.heads[expiring] = (heads + 1) % capacity
+            self.counts[expiring] -= 1
+            expiring = expiring[self.counts[expiring] > 0]
+
+        # Trimming the entries the windows start in
+        notok_durations = self.notok_durations[indices]
+        heads = self.heads[indices]
+        entry_starts = self.ends[indices, heads] - self.durations[indices, heads]
+        trimmed = (
+            (self.counts[indices] > 0)
+            & self.notok[indices, heads]
+            & (entry_starts < window_start)
+        )
+        notok_durations -= np.where(trimmed, window_start - entry_starts, 0)
+
+        alarming = notok_durations * 100 > self.percentage_threshold * self.window
+        self.alarming[indices] = alarming
+        return alarming
+
+    def notok_pending(self, indices, share: float = 0.25):
+        """
+        Checks which of the windows have "notok" state building up, as AlarmWindow.notok_pending would.
+
+        Args:
+        - indices (numpy.ndarray): Indices of the windows to check.
+        - share (float): Share of the alarm threshold the "notok" time must exceed.
+
+        Returns:
+        - notok_pending (numpy.ndarray): True where the "notok" time of the window exceeds share of the
+                                         alarm threshold, False otherwise.
+        """
+        return (
+            self.notok_durations[indices] * 100
+            > share * self.percentage_threshold * self.window
+        )
+
+    def reset(self, indices) -> None:
+        """
+        Empties some of the windows.
+
+        Args:
+        - indices (numpy.ndarray): Indices of the windows to empty.
+
+        Returns:
+        None
+        """
+        self.heads[indices] = 0
+        self.counts[indices] = 0
+        self.notok_durations[indices] = 0
+        self.last_timestamps[indices] = -1
+        self.alarming[indices] = False
@@ -0,0 +1,295 @@
+# Offline Batch Video Scoring
+#
+# Scores a directory of recorded videos headlessly (no camera, no GUI),
+# sharding the videos across a process pool with one FaceMesh per worker.
+# Writes per-frame ratios and alarm states to one CSV per video, and all
+# alarm events to alarm_events.csv in the output directory. With
+# --record-landmarks, the landmarks of every video are also saved as a
+# landmark recording (see landmark_recording), to be replayed without FaceMesh.
+#
+# Usage:
+#   python src/batch_scoring.py recordings/ --output-directory results/
+#   python src/batch_scoring.py recordings/ --record-landmarks
+
+import argparse
+import concurrent.futures
+import csv
+import os
+import tomli
+import cv2 as cv
+import numpy as np
+
+import landmarks
+import landmark_detectors
+import landmark_recording
+import ratio_utils
+from alarm_tracker import AlarmTracker
+from detection_pipeline import eye_aspect_ratio_thresholds
+
+VIDEO_EXTENSIONS = (".avi", ".mkv", ".mov", ".mp4")
+
+# Number of frames whose ratios are computed together
+CHUNK_SIZE = 256
+
+# Landmark detector (FaceMesh instance) of the current worker process
+detector = None
+
+
+def initialize_worker() -> None:
+    """
+    Creates the FaceMesh landmark detector of a worker process, reused for all the videos it scores.
+
+    Returns:
+    None
+    """
+    global detector
+    detector = landmark_detectors.MediaPipeLandmarkDetector()
+
+
+def score_video(
+    video_path: str, output_path: str, config: dict, recording_directory: str = None
+) -> dict:
+    """
+    Scores a single video, writing its per-frame results to a CSV file.
+
+    Args:
+    - video_path (str): Path of the video to score.
+    - output_path (str): Path of the CSV file to write.
+    - config (dict): Loaded config.toml.
+    - recording_directory (str): Directory to record the landmarks of the video into, None to not record them.
+
+    Returns:
+    - summary (dict): Video path, number of frames, frames with a face, and the list of alarm events.
+    """
+    camera = cv.VideoCapture(video_path)
+    video_fps = camera.get(cv.CAP_PROP_FPS) or 30.0
+    recorder = None
+    if recording_directory is not None:
+        recorder = landmark_recording.LandmarkRecorder(
+            recording_directory,
+            int(camera.get(cv.CAP_PROP_FRAME_WIDTH)),
+            int(camera.get(cv.CAP_PROP_FRAME_HEIGHT)),
+            video_fps,
+        )
+    left_threshold, right_threshold = eye_aspect_ratio_thresholds(config)
+    mouth_threshold = config["ratio_thresholds"]["mouth_aspect_ratio"]
+    eyes_closed_alarm = AlarmTracker(config["time_thresholds"]["eyes_closed"])
+    yawn_alarm = AlarmTracker(config["time_thresholds"]["yawn"])
+
+    # Landmark subsets of the current chunk of frames
+    eyes_chunk = np.zeros((CHUNK_SIZE, 2, len(landmarks.LEFT_EYE), 2), dtype=np.int32)
+    mouth_chunk = np.zeros((CHUNK_SIZE, len(landmarks.MOUTH), 2), dtype=np.int32)
+    face_detected_chunk = np.zeros(CHUNK_SIZE, dtype=bool)
+
+    summary = {"video": video_path, "frames": 0, "face_frames": 0, "events": []}
+
+    def flush_chunk(writer, first_frame_index: int, chunk_length: int) -> None:
+        eye_aspect_ratios = ratio_utils.eye_aspect_ratios(eyes_chunk[:chunk_length])
+        mouth_aspect_ratios = ratio_utils.mouth_aspect_ratios(
+            mouth_chunk[:chunk_length]
+        )
+        for i in range(chunk_length):
+            frame_index = first_frame_index + i
+            timestamp = frame_index / video_fps
+            if not face_detected_chunk[i]:
+                writer.writerow(
+                    [frame_index, f"{timestamp:.3f}", 0, "", "", "", "", ""]
+                )
+                continue
+            left_eye_aspect_ratio, right_eye_aspect_ratio = eye_aspect_ratios[i]
+            mouth_aspect_ratio = mouth_aspect_ratios[i]
+            eyes_open = (
+                left_eye_aspect_ratio >= left_threshold
+                or right_eye_aspect_ratio >= right_threshold
+            )
+            if eyes_closed_alarm.add_bounded_frame(ok=eyes_open, timestamp=timestamp):
+                summary["events"].append(
+                    (video_path, "eyes_closed", frame_index, timestamp)
+                )
+            if yawn_alarm.add_bounded_frame(
+                ok=mouth_aspect_ratio <= mouth_threshold, timestamp=timestamp
+            ):
+                summary["events"].append((video_path, "yawn", frame_index, timestamp))
+            writer.writerow(
+                [
+                    frame_index,
+                    f"{timestamp:.3f}",
+                    1,
+                    f"{left_eye_aspect_ratio:.5f}",
+                    f"{right_eye_aspect_ratio:.5f}",
+                    f"{mouth_aspect_ratio:.5f}",
+                    int(eyes_closed_alarm.alarming),
+                    int(yawn_alarm.alarming),
+                ]
+            )
+
+    with open(output_path, "w", newline="") as output_file:
+        writer = csv.writer(output_file)
+        writer.writerow(
+            [
+                "frame",
+                "timestamp",
+                "face_detected",
+                "left_eye_aspect_ratio",
+                "right_eye_aspect_ratio",
+                "mouth_aspect_ratio",
+                "eyes_closed_alarm",
+                "yawn_alarm",
+            ]
+        )
+        chunk_length = 0
+        while True:
+            frame_read_successful, frame = camera.read()
+            if not frame_read_successful:
+                break
+            faces_coordinates = detector.detect(frame)
+            if recorder is not None:
+                recorder.add_frame(
+                    None if faces_coordinates is None else faces_coordinates[0],
+                    (summary["frames"] + chunk_length) / video_fps,
+                )
+            face_detected_chunk[chunk_length] = faces_coordinates is not None
+            if faces_coordinates is not None:
+                eyes_chunk[chunk_length] = landmarks.eyes(faces_coordinates[0])
+                mouth_chunk[chunk_length] = landmarks.mouth(faces_coordinates[0])
+                summary["face_frames"] += 1
+            chunk_length += 1
+            if chunk_length == CHUNK_SIZE:
+                flush_chunk(writer, summary["frames"], chunk_length)
+                summary["frames"] += chunk_length
+                chunk_length = 0
+        flush_chunk(writer, summary["frames"], chunk_length)
+        summary["frames"] += chunk_length
+
+    camera.release()
+    if recorder is not None:
+        recorder.close()
+    return summary
+
+
+def find_videos(videos_directory: str) -> list:
+    """
+    Lists the video files of a directory, recursively.
+
+    Args:
+    - videos_directory (str): Directory to search.
+
+    Returns:
+    - video_paths (list): Sorted list of video file paths.
+    """
+    video_paths = []
+    for root, _, file_names in os.walk(videos_directory):
+        for file_name in file_names:
+            if file_name.lower().endswith(VIDEO_EXTENSIONS):
+                video_paths.append(os.path.join(root, file_name))
+    return sorted(video_paths)
+
+
+def output_path_for(
+    video_path: str,
+    videos_directory: str,
+    output_directory: str,
+    extension: str = ".csv",
+) -> str:
+    """
+    Returns the output file path for a video, flattening its path relative to the videos directory.
+
+    Args:
+    - video_path (str): Path of the video.
+    - videos_directory (str): Directory the videos were found in.
+    - output_directory (str): Directory of the results.
+    - extension (str): Extension of the output file.
+
+    Returns:
+    - output_path (str): Path of the output file.
+    """
+    relative_path = os.path.relpath(video_path, videos_directory)
+    file_name = os.path.splitext(relative_path)[0].replace(os.sep, "__") + extension
+    return os.path.join(output_directory, file_name)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Scores recorded videos for drowsiness, without a camera or GUI."
+    )
+    parser.add_argument("videos_directory", help="directory of recorded videos")
+    parser.add_argument(
+        "--output-directory", default="results", help="directory of the results"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument("--config", default="config.toml", help="configuration file")
+    parser.add_argument(
+        "--record-landmarks",
+        action="store_true",
+        help="also save the landmarks of every video as a .landmarks recording",
+    )
+    args = parser.parse_args()
+
+    with open(args.config, mode="rb") as config_file:
+        config = tomli.load(config_file)
+
+    video_paths = find_videos(args.videos_directory)
+    if not video_paths:
+        print(f"[WARNING] No videos found in {args.videos_directory}")
+        return
+    os.makedirs(args.output_directory, exist_ok=True)
+    print(f"[INFO] Scoring {len(video_paths)} videos with {args.workers} workers ...")
+
+    events = []
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=args.workers, initializer=initialize_worker
+    ) as executor:
+        futures = {
+            executor.submit(
+                score_video,
+                video_path,
+                output_path_for(
+                    video_path, args.videos_directory, args.output_directory
+                ),
+                config,
+                (
+                    output_path_for(
+                        video_path,
+                        args.videos_directory,
+                        args.output_directory,
+                        extension=".landmarks",
+                    )
+                    if args.record_landmarks
+                    else None
+                ),
+            ): video_path
+            for video_path in video_paths
+        }
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                summary = future.result()
+            except Exception as exception:
+                print(f"[ERROR] Scoring {futures[future]} failed: {exception}")
+                continue
+            events.extend(summary["events"])
+            print(
+                "[INFO] Scored {}: {} frames, {} with a face, {} alarms".format(
+                    summary["video"],
+                    summary["frames"],
+                    summary["face_frames"],
+                    len(summary["events"]),
+                )
+            )
+
+    events.sort()
+    with open(
+        os.path.join(args.output_directory, "alarm_events.csv"), "w", newline=""
+    ) as events_file:
+        writer = csv.writer(events_file)
+        writer.writerow(["video", "alarm", "frame", "timestamp"])
+        for video_path, alarm, frame_index, timestamp in events:
+            writer.writerow([video_path, alarm, frame_index, f"{timestamp:.3f}"])
+
+
+if __name__ == "__main__":
+    main()
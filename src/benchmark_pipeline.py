@@ -0,0 +1,184 @@
+# Pipeline Benchmark
+#
+# Benchmarks the landmarks -> face tracking -> ratios -> alarms pipeline of the
+# entry points (MultiFaceDetectionPipeline), and optionally the HUD and landmark
+# drawing, without a camera, a GUI or audio. Landmarks come from a
+# synthetic face or a recording, so no model is needed either, unless the
+# mediapipe detector is selected explicitly with a video file.
+#
+# Usage:
+#   python src/benchmark_pipeline.py --frames 10000
+#   python src/benchmark_pipeline.py --replay results/video.landmarks --draw
+
+import argparse
+import time
+import cv2 as cv
+import numpy as np
+
+import alarm_tracker
+import colors
+import detection_pipeline
+import drawing_utils
+import fps
+import inference_governor
+import landmark_detectors
+import landmark_recording
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmarks the detection pipeline without a camera or GUI."
+    )
+    parser.add_argument(
+        "--detector",
+        choices=("synthetic", "replay", "mediapipe"),
+        default="synthetic",
+        help="landmark detector to use (default: synthetic)",
+    )
+    parser.add_argument(
+        "--replay",
+        help="landmark recording directory or .npy file, implies --detector replay",
+    )
+    parser.add_argument("--video", help="video file for the mediapipe detector")
+    parser.add_argument("--frames", type=int, default=3000, help="frames to process")
+    parser.add_argument("--width", type=int, default=1280, help="frame width")
+    parser.add_argument("--height", type=int, default=720, help="frame height")
+    parser.add_argument(
+        "--fps",
+        type=float,
+        default=30.0,
+        help="frame rate the frames are timed at (default: 30, or the frame rate of the recording)",
+    )
+    parser.add_argument(
+        "--faces", type=int, default=1, help="maximum number of tracked faces"
+    )
+    parser.add_argument(
+        "--draw", action="store_true", help="also draw landmarks and the HUD"
+    )
+    parser.add_argument(
+        "--roi",
+        action="store_true",
+        help="run the mediapipe detector on the region of the previous face only",
+    )
+    parser.add_argument(
+        "--governor",
+        type=int,
+        default=1,
+        metavar="MAX_INTERVAL",
+        help="infer every MAX_INTERVAL frames while the face is plainly awake (default: 1, every frame)",
+    )
+    args = parser.parse_args()
+    if args.detector == "replay" and not args.replay:
+        parser.error("--detector replay needs --replay")
+    if args.detector == "mediapipe" and not args.video:
+        parser.error("--detector mediapipe needs --video")
+
+    camera = None
+    if args.replay and landmark_recording.is_recording(args.replay):
+        recording = landmark_recording.LandmarkRecording(args.replay)
+        detector = landmark_detectors.ReplayLandmarkDetector.from_recording(recording)
+        args.fps = recording.fps
+        args.width, args.height = recording.frame_width, recording.frame_height
+    elif args.replay:
+        detector = landmark_detectors.ReplayLandmarkDetector.from_file(args.replay)
+    elif args.detector == "mediapipe":
+        detector = landmark_detectors.MediaPipeLandmarkDetector(
+            max_num_faces=args.faces, roi=args.roi
+        )
+        camera = cv.VideoCapture(args.video)
+    else:
+        detector = landmark_detectors.SyntheticLandmarkDetector(fps=args.fps)
+
+    pipeline = detection_pipeline.MultiFaceDetectionPipeline(
+        alarm_tracker.AlarmTracker(3),
+        alarm_tracker.AlarmTracker(4),
+        left_eye_aspect_ratio_threshold=0.15,
+        right_eye_aspect_ratio_threshold=0.15,
+        mouth_aspect_ratio_threshold=0.4,
+        max_faces=args.faces,
+    )
+    governor = inference_governor.InferenceGovernor(max_interval=args.governor)
+    hud = drawing_utils.HUDCompositor()
+    frame = np.zeros((args.height, args.width, 3), dtype=np.uint8)
+
+    # Durations of every run of the stages, for their min/p50/p99
+    stage_timers = fps.StageTimers(window_size=max(args.frames, 1))
+    faces_detected = 0
+    frames_processed = 0
+    faces_coordinates = None
+    benchmark_start_time = time.perf_counter_ns()
+    for _ in range(args.frames):
+        if camera is not None:
+            frame_read_successful, frame = camera.read(frame)
+            if not frame_read_successful:
+                break
+        # Skipped frames reuse the landmarks of the last inferred frame
+        inferred = governor.should_infer()
+        if inferred:
+            with stage_timers.measure("detect"):
+                faces_coordinates = detector.detect(frame)
+        else:
+            detector.skip()
+        frames_processed += 1
+        if faces_coordinates is None and args.replay and detector.exhausted():
+            break
+
+        # Frames without a face go through the pipeline too, so their tracks miss them
+        stage_timers.start("pipeline")
+        decisions = pipeline.process(faces_coordinates, frames_processed / args.fps)
+        governor.update(pipeline, decisions, inferred=inferred)
+        stage_timers.stop("pipeline")
+        if len(decisions["face_ids"]) == 0:
+            continue
+        faces_detected += 1
+
+        if args.draw:
+            stage_timers.start("draw")
+            for coordinates_index in decisions["coordinates_indices"]:
+                drawing_utils.face_landmarks(
+                    frame, faces_coordinates[coordinates_index]
+                )
+            hud.text_with_background(
+                "(Left, Right) Eye Aspect Ratios: ({}, {})".format(
+                    round(float(decisions["left_eye_aspect_ratio"][0]), 3),
+                    round(float(decisions["right_eye_aspect_ratio"][0]), 3),
+                ),
+                (0, 0),
+                text_color=colors.GREEN,
+                background_color=colors.BLACK,
+                background_opacity=0.8,
+            )
+            hud.text_with_background(
+                "Eyes: OPEN" if decisions["eyes_open"].all() else "Eyes: CLOSE",
+                (0, 46),
+                text_color=colors.BLACK,
+                background_color=colors.GREEN,
+                background_opacity=0.8,
+            )
+            hud.compose(frame)
+            stage_timers.stop("draw")
+    benchmark_time = (time.perf_counter_ns() - benchmark_start_time) / 1e9
+    detector.close()
+
+    print(f"[INFO] Detector: {type(detector).__name__}")
+    print(
+        "[INFO] Frames: {}, with a tracked face: {}, in {:.3f} s ({:.1f} frames/s)".format(
+            frames_processed,
+            faces_detected,
+            benchmark_time,
+            frames_processed / max(benchmark_time, 1e-9),
+        )
+    )
+    print("[INFO] Stage timings:\n" + stage_timers.report())
+    print(
+        "[INFO] Alarms started: eyes closed {}, yawn {}, faces tracked {}".format(
+            pipeline.eyes_closed_alarms.alarms_started_total,
+            pipeline.yawn_alarms.alarms_started_total,
+            pipeline.face_tracker.next_track_id,
+        )
+    )
+    print(f"[INFO] Inference governor: {governor.stats()}")
+
+
+if __name__ == "__main__":
+    main()
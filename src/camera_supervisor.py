@@ -0,0 +1,540 @@
+# Camera Supervisor
+#
+# Runs one worker process per camera (device index or video file), each with
+# its own capture thread, FaceMesh and multi-face detection pipeline, so that
+# cameras do not share a GIL. Workers send their per-frame decisions to the
+# supervisor over a queue, the supervisor aggregates them: it reports alarms
+# and per-camera FPS, sounds the alarms for the driver's face of the cameras
+# listed in audio_cameras of [cameras] (the others only log and count their
+# alarms), and restarts the workers that crash (with an exponential backoff).
+# The supervisor exposes the per-camera counters as set in [metrics] of
+# config.toml.
+#
+# Usage:
+#   python src/camera_supervisor.py                  (cameras of config.toml)
+#   python src/camera_supervisor.py 0 1              (driver and cabin cameras)
+#   python src/camera_supervisor.py 0 cabin.mp4 --no-audio
+
+import argparse
+import multiprocessing
+import queue
+import time
+import tomli
+
+import metrics
+from video_sources import parse_source
+
+# Exit code of a worker whose video file ended, it is not restarted
+EXIT_CODE_FINISHED = 0
+
+# Seconds before restarting a crashed worker, doubled on every crash up to the maximum
+RESTART_DELAY = 1.0
+MAX_RESTART_DELAY = 30.0
+
+# Seconds a worker must run for its restart delay to go back to RESTART_DELAY
+STABLE_RUN_TIME = 60.0
+
+
+def run_camera(
+    camera_index: int,
+    source,
+    config: dict,
+    results_queue,
+    stop_event,
+    config_file_path: str = None,
+) -> None:
+    """
+    Worker process of a camera: captures frames, detects the faces and decides their alarms.
+
+    Args:
+    - camera_index (int): Index of the camera in the supervisor.
+    - source (int or str): Device index, or path/URL of a video.
+    - config (dict): Loaded config.toml.
+    - results_queue (multiprocessing.Queue): Queue the per-frame decisions are sent to.
+    - stop_event (multiprocessing.Event): Set by the supervisor to stop the worker.
+    - config_file_path (str): Configuration file whose edits are applied between two frames,
+                              None to keep the settings of config.
+
+    Returns:
+    None
+
+    Raises:
+    - RuntimeError: If the source cannot be opened or a camera stops delivering frames,
+                    so that the worker exits with an error and gets restarted.
+    """
+    # Imported here, so that the supervisor process does not load OpenCV and MediaPipe
+    import cv2 as cv
+
+    import config_watcher
+    import detection_pipeline
+    import inference_governor
+    import initializer
+    import landmark_detectors
+    import video_stream
+    from alarm_tracker import AlarmTracker
+
+    # Pending results are not worth blocking the exit of the worker for
+    results_queue.cancel_join_thread()
+    is_video_file = isinstance(source, str)
+    # Opening the source and loading and warming up FaceMesh run at the same time,
+    # so that restarting a crashed camera takes as long as the slowest of them
+    startup = initializer.Initializer()
+    # Video files are processed as fast as possible without dropping frames,
+    # cameras always process their latest frame
+    startup.add(
+        "camera",
+        lambda: video_stream.VideoStream(
+            source,
+            queue_size=2,
+            drop_policy="block" if is_video_file else "latest",
+            buffer_pool_size=4,
+        ).start(),
+        cleanup=video_stream.VideoStream.close,
+    )
+    startup.add(
+        "detector",
+        landmark_detectors.MediaPipeLandmarkDetector.from_config,
+        config,
+        warm_up=True,
+        cleanup=lambda detector: detector.close(),
+    )
+    initialized = startup.run()
+    print(f"[INFO] Camera {camera_index}: {startup.report()}")
+    stream = initialized["camera"]
+    detector = initialized["detector"]
+    # Video files are read faster than real time, their frames are timed by the frame rate
+    video_fps = (stream.stream.get(cv.CAP_PROP_FPS) or 30.0) if is_video_file else 0
+    pipeline = detection_pipeline.MultiFaceDetectionPipeline.from_config(
+        config,
+        AlarmTracker(config["time_thresholds"]["eyes_closed"]),
+        AlarmTracker(config["time_thresholds"]["yawn"]),
+    )
+    governor = inference_governor.InferenceGovernor.from_config(config)
+    config_file_watcher = None
+    if config_file_path is not None:
+        config_file_watcher = config_watcher.ConfigWatcher(config_file_path).start()
+    applied_settings = None
+    faces_coordinates = None
+    try:
+        while not stop_event.is_set():
+            frame_read_successful, frame, sequence_number, capture_timestamp = (
+                stream.read(timeout=1.0)
+            )
+            if not frame_read_successful:
+                if not stream.stream_ended:
+                    continue
+                if stream.frames_read == 0:
+                    raise RuntimeError(f"Cannot read frames from {source}")
+                if not is_video_file:
+                    raise RuntimeError(f"Camera {source} stopped delivering frames")
+                break
+            inferred = governor.should_infer()
+            if inferred:
+                faces_coordinates = detector.detect(frame)
+            stream.release(frame)
+            if (
+                config_file_watcher is not None
+                and config_file_watcher.settings is not applied_settings
+            ):
+                applied_settings = config_file_watcher.settings
+                applied_settings.apply(pipeline)
+            decisions = pipeline.process(
+                faces_coordinates,
+                sequence_number / video_fps if is_video_file else capture_timestamp,
+            )
+            governor.update(pipeline, decisions)
+            results_queue.put(
+                {
+                    "camera": camera_index,
+                    "frame": sequence_number,
+                    "capture_timestamp": capture_timestamp,
+                    "inferred": inferred,
+                    "frames_dropped": stream.frames_dropped,
+                    "face_ids": decisions["face_ids"].tolist(),
+                    "eyes_closed_alarming": decisions["eyes_closed_alarming"].tolist(),
+                    "yawn_alarming": decisions["yawn_alarming"].tolist(),
+                    "sounding": decisions["sounding"].tolist(),
+                }
+            )
+    finally:
+        stream.close()
+        detector.close()
+        if config_file_watcher is not None:
+            config_file_watcher.stop()
+
+
+class CameraSupervisor:
+    def __init__(
+        self,
+        sources: list,
+        config: dict,
+        play_audio: bool = True,
+        config_file_path: str = None,
+    ) -> None:
+        """
+        Initializes the CameraSupervisor object.
+
+        Args:
+        - sources (list): Device indices or video paths/URLs of the cameras.
+        - config (dict): Loaded config.toml.
+        - play_audio (bool): Whether to sound the eyes closed and yawn alarms of the cameras in
+                             audio_cameras of [cameras].
+        - config_file_path (str): Configuration file the workers watch, applying its edits between
+                                  two frames, None to not watch it.
+
+        Attributes:
+        - sources (list): Device indices or video paths/URLs of the cameras.
+        - config (dict): Loaded config.toml.
+        - config_file_path (str): Configuration file the workers watch, None to not watch it.
+        - audio_cameras (set): Indices of the cameras sounding the alarms, the driver's camera usually.
+        - context: Multiprocessing context the workers are spawned with.
+        - results_queue (multiprocessing.Queue): Queue of the per-frame decisions of all the workers.
+        - stop_event (multiprocessing.Event): Set to stop the workers.
+        - workers (list): Worker process of every camera, None once finished.
+        - started_times (list): time.monotonic() value at which every worker was started.
+        - restart_delays (list): Current restart delay of every camera in seconds.
+        - restart_times (list): time.monotonic() value at which every crashed camera is restarted, None if not crashed.
+        - restarts (list): Number of restarts of every camera.
+        - frames (list): Number of frames processed by every camera since the last report.
+        - inferred_frames (list): Number of frames inferred by every camera since the last report.
+        - faces (list): Number of faces in the last frame of every camera.
+        - alarming (dict): (camera, face_id) -> (eyes closed alarming, yawn alarming) of the last frames.
+        - alarm_audio_service (AlarmAudioService): Plays the alarm sounds while running, None without audio.
+        - eyes_closed_alarm: EyesClosed object sounding for the audio cameras, None without audio.
+        - yawn_alarm: Yawn object sounding for the audio cameras, None without audio.
+        - metrics (Metrics): Per-camera counters, exposed by metrics_exporter.
+        - metrics_exporter (MetricsExporter): Serves the metrics while running, None before run().
+        """
+        self.sources: list = [parse_source(source) for source in sources]
+        self.config: dict = config
+        self.config_file_path: str = config_file_path
+        self.audio_cameras: set = set(config["cameras"]["audio_cameras"])
+        self.context = multiprocessing.get_context("spawn")
+        self.results_queue = self.context.Queue()
+        self.stop_event = self.context.Event()
+        self.workers: list = [None] * len(self.sources)
+        self.started_times: list = [0.0] * len(self.sources)
+        self.restart_delays: list = [RESTART_DELAY] * len(self.sources)
+        self.restart_times: list = [None] * len(self.sources)
+        self.restarts: list = [0] * len(self.sources)
+        self.frames: list = [0] * len(self.sources)
+        self.inferred_frames: list = [0] * len(self.sources)
+        self.faces: list = [0] * len(self.sources)
+        self.alarming: dict = {}
+        self.metrics = metrics.Metrics()
+        self.metrics.describe(
+            "frames_processed_total", "counter", "Frames processed, per camera."
+        )
+        self.metrics.describe(
+            "frames_inferred_total",
+            "counter",
+            "Frames the landmark detector ran on, per camera.",
+        )
+        self.metrics.describe(
+            "frames_dropped_total",
+            "counter",
+            "Captured frames dropped before being processed, per camera (reset on restarts).",
+        )
+        self.metrics.describe(
+            "alarms_fired_total", "counter", "Alarms started, per camera and alarm."
+        )
+        self.metrics.describe(
+            "camera_restarts_total",
+            "counter",
+            "Restarts of crashed workers, per camera.",
+        )
+        self.metrics.collect(
+            "faces_tracked",
+            "gauge",
+            "Faces in the last frame, per camera.",
+            lambda: {
+                (("camera", camera_index),): faces
+                for camera_index, faces in enumerate(self.faces)
+            },
+        )
+        self.metrics.collect(
+            "queue_depth",
+            "gauge",
+            "Frames waiting in the queues.",
+            self.results_queue_depth,
+        )
+        self.metrics_exporter = None
+        self.alarm_audio_service = None
+        self.eyes_closed_alarm = None
+        self.yawn_alarm = None
+        if play_audio:
+            import alarm_audio
+            import eyes_closed
+            import yawn
+
+            self.alarm_audio_service = alarm_audio.AlarmAudioService()
+            self.eyes_closed_alarm = eyes_closed.EyesClosed(
+                time_threshold=config["time_thresholds"]["eyes_closed"],
+                alarm_audio_service=self.alarm_audio_service,
+            )
+            self.yawn_alarm = yawn.Yawn(
+                time_threshold=config["time_thresholds"]["yawn"],
+                alarm_audio_service=self.alarm_audio_service,
+            )
+
+    def start_worker(self, camera_index: int) -> None:
+        """
+        Starts the worker process of a camera.
+
+        Args:
+        - camera_index (int): Index of the camera.
+
+        Returns:
+        None
+        """
+        worker = self.context.Process(
+            target=run_camera,
+            args=(
+                camera_index,
+                self.sources[camera_index],
+                self.config,
+                self.results_queue,
+                self.stop_event,
+                self.config_file_path,
+            ),
+            name=f"camera-{camera_index}",
+            daemon=True,
+        )
+        worker.start()
+        self.workers[camera_index] = worker
+        self.started_times[camera_index] = time.monotonic()
+        self.restart_times[camera_index] = None
+        print(
+            f"[INFO] Started camera {camera_index} ({self.sources[camera_index]}), pid {worker.pid}"
+        )
+
+    def check_workers(self) -> None:
+        """
+        Restarts the crashed workers once their restart delay is over, and forgets the finished ones.
+
+        Returns:
+        None
+        """
+        now = time.monotonic()
+        for camera_index, worker in enumerate(self.workers):
+            if self.restart_times[camera_index] is not None:
+                if now >= self.restart_times[camera_index]:
+                    self.restarts[camera_index] += 1
+                    self.metrics.inc(
+                        "camera_restarts_total", labels=(("camera", camera_index),)
+                    )
+                    self.start_worker(camera_index)
+                continue
+            if worker is None or worker.is_alive():
+                continue
+            worker.join()
+            if worker.exitcode == EXIT_CODE_FINISHED:
+                print(f"[INFO] Camera {camera_index} finished")
+                self.workers[camera_index] = None
+                continue
+            if now - self.started_times[camera_index] >= STABLE_RUN_TIME:
+                self.restart_delays[camera_index] = RESTART_DELAY
+            print(
+                "[WARNING] Camera {} crashed (exit code {}), restarting in {:.0f} s".format(
+                    camera_index, worker.exitcode, self.restart_delays[camera_index]
+                )
+            )
+            self.restart_times[camera_index] = now + self.restart_delays[camera_index]
+            self.restart_delays[camera_index] = min(
+                2 * self.restart_delays[camera_index], MAX_RESTART_DELAY
+            )
+
+    def handle_result(self, result: dict) -> None:
+        """
+        Aggregates the decisions of a frame of a camera, reporting the alarms that start, and sounding
+        them if the camera is an audio camera.
+
+        Args:
+        - result (dict): Per-frame decisions sent by a worker.
+
+        Returns:
+        None
+        """
+        camera_index = result["camera"]
+        self.frames[camera_index] += 1
+        self.inferred_frames[camera_index] += result["inferred"]
+        self.faces[camera_index] = len(result["face_ids"])
+        camera_labels = (("camera", camera_index),)
+        self.metrics.inc("frames_processed_total", labels=camera_labels)
+        self.metrics.inc(
+            "frames_inferred_total", int(result["inferred"]), labels=camera_labels
+        )
+        self.metrics.set(
+            "frames_dropped_total", result["frames_dropped"], labels=camera_labels
+        )
+        for face_id, eyes_closed_alarming, yawn_alarming in zip(
+            result["face_ids"], result["eyes_closed_alarming"], result["yawn_alarming"]
+        ):
+            was_eyes_closed_alarming, was_yawn_alarming = self.alarming.get(
+                (camera_index, face_id), (False, False)
+            )
+            if eyes_closed_alarming and not was_eyes_closed_alarming:
+                print(f"[ALARM] Camera {camera_index}, face {face_id}: eyes closed")
+                self.metrics.inc(
+                    "alarms_fired_total",
+                    labels=camera_labels + (("alarm", "eyes_closed"),),
+                )
+            if yawn_alarming and not was_yawn_alarming:
+                print(f"[ALARM] Camera {camera_index}, face {face_id}: yawning")
+                self.metrics.inc(
+                    "alarms_fired_total", labels=camera_labels + (("alarm", "yawn"),)
+                )
+            self.alarming[(camera_index, face_id)] = (
+                eyes_closed_alarming,
+                yawn_alarming,
+            )
+        if self.eyes_closed_alarm is None or camera_index not in self.audio_cameras:
+            return
+        if any(
+            alarming and sounding
+            for alarming, sounding in zip(
+                result["eyes_closed_alarming"], result["sounding"]
+            )
+        ):
+            self.eyes_closed_alarm.trigger_alarm()
+        if any(
+            alarming and sounding
+            for alarming, sounding in zip(result["yawn_alarming"], result["sounding"])
+        ):
+            self.yawn_alarm.trigger_alarm()
+
+    def results_queue_depth(self) -> dict:
+        """
+        Returns the number of results waiting in the results queue, for the queue_depth metric.
+
+        Returns:
+        - queue_depth (dict): Labels -> depth, empty where the platform cannot tell (macOS).
+        """
+        try:
+            return {(("queue", "results"),): self.results_queue.qsize()}
+        except NotImplementedError:
+            return {}
+
+    def report(self, elapsed_time: float) -> None:
+        """
+        Prints the FPS, inferred frames and faces of every camera since the last report.
+
+        Args:
+        - elapsed_time (float): Seconds since the last report.
+
+        Returns:
+        None
+        """
+        for camera_index, source in enumerate(self.sources):
+            if self.workers[camera_index] is None:
+                state = "finished"
+            elif self.restart_times[camera_index] is not None:
+                state = "restarting"
+            else:
+                state = "running"
+            print(
+                "[INFO] Camera {} ({}): {:.1f} FPS, {:.0f}% inferred, {} faces, {} restarts, {}".format(
+                    camera_index,
+                    source,
+                    self.frames[camera_index] / elapsed_time,
+                    100
+                    * self.inferred_frames[camera_index]
+                    / max(self.frames[camera_index], 1),
+                    self.faces[camera_index],
+                    self.restarts[camera_index],
+                    state,
+                )
+            )
+            self.frames[camera_index] = 0
+            self.inferred_frames[camera_index] = 0
+
+    def run(self, report_interval: float = 5.0) -> None:
+        """
+        Starts the workers and aggregates their results until all of them finished or Ctrl+C is pressed.
+
+        Args:
+        - report_interval (float): Seconds between two FPS reports.
+
+        Returns:
+        None
+        """
+        self.metrics_exporter = metrics.MetricsExporter.from_config(
+            self.metrics, self.config
+        ).start()
+        if self.alarm_audio_service is not None:
+            self.alarm_audio_service.start()
+        for camera_index in range(len(self.sources)):
+            self.start_worker(camera_index)
+        last_report_time = time.monotonic()
+        try:
+            while any(worker is not None for worker in self.workers):
+                try:
+                    self.handle_result(self.results_queue.get(timeout=0.1))
+                    # Drain the queue before checking the workers again
+                    while True:
+                        self.handle_result(self.results_queue.get_nowait())
+                except queue.Empty:
+                    pass
+                self.check_workers()
+                now = time.monotonic()
+                if now - last_report_time >= report_interval:
+                    self.report(now - last_report_time)
+                    last_report_time = now
+        except KeyboardInterrupt:
+            print("[INFO] Stopping the cameras ...")
+        finally:
+            self.stop()
+
+    def stop(self) -> None:
+        """
+        Stops all the workers.
+
+        Returns:
+        None
+        """
+        self.stop_event.set()
+        for worker in self.workers:
+            if worker is None:
+                continue
+            worker.join(timeout=5.0)
+            if worker.is_alive():
+                worker.terminate()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+            self.metrics_exporter = None
+        if self.alarm_audio_service is not None:
+            self.alarm_audio_service.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Runs one capture and inference process per camera."
+    )
+    parser.add_argument(
+        "sources",
+        nargs="*",
+        help="camera device indices or video paths (default: [cameras] of config.toml)",
+    )
+    parser.add_argument("--config", default="config.toml", help="configuration file")
+    parser.add_argument(
+        "--no-audio", action="store_true", help="do not sound the alarms"
+    )
+    parser.add_argument(
+        "--report-interval",
+        type=float,
+        default=5.0,
+        help="seconds between two FPS reports",
+    )
+    args = parser.parse_args()
+
+    with open(args.config, mode="rb") as config_file:
+        config = tomli.load(config_file)
+    sources = args.sources or config["cameras"]["sources"]
+    supervisor = CameraSupervisor(
+        sources, config, play_audio=not args.no_audio, config_file_path=args.config
+    )
+    supervisor.run(report_interval=args.report_interval)
+
+
+if __name__ == "__main__":
+    main()
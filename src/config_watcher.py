@@ -0,0 +1,209 @@
+# ConfigWatcher Class
+#
+# Watches config.toml and, when it changes, parses and validates it and swaps in
+# a new Settings snapshot, so thresholds can be changed on a running unit
+# without reloading FaceMesh or reopening the camera. The processing loops read
+# the snapshot once per frame, so a change applies between two frames. Invalid
+# edits are rejected with a warning, the last valid settings staying in use.
+# Settings that only apply at startup (face tracking, governor, cameras,
+# metrics) are reported as needing a restart.
+
+import os
+import threading
+import tomli
+
+from settings import Settings
+
+# Values of ratio_to_use
+RATIOS_TO_USE = ("eye_aspect_ratio", "modified_eye_aspect_ratio")
+
+# Smallest valid ratio threshold, also the lower end of the threshold sliders of main.py
+MIN_RATIO_THRESHOLD = 0.01
+
+# Sections only read at startup
+RESTART_SECTIONS = ("face_tracking", "inference_governor", "cameras", "metrics")
+
+
+def validate_config(config: dict) -> Settings:
+    """
+    Checks a loaded config.toml and creates its Settings.
+
+    Args:
+    - config (dict): Loaded config.toml.
+
+    Returns:
+    - settings (Settings): The settings of the configuration.
+
+    Raises:
+    - ValueError: If a setting is missing, has a wrong type or is out of range.
+    """
+    try:
+        settings = Settings.from_config(config)
+    except (KeyError, TypeError) as error:
+        raise ValueError(f"Missing setting: {error}") from error
+    for name, value in settings._asdict().items():
+        expected_type = Settings.__annotations__[name]
+        # TOML integers are fine where floats are expected, booleans are not numbers here
+        if isinstance(value, bool) != (expected_type is bool) or not isinstance(
+            value, (int, float) if expected_type in (int, float) else expected_type
+        ):
+            raise ValueError(
+                f"{name} must be a {expected_type.__name__}, got {value!r}"
+            )
+    if settings.ratio_to_use not in RATIOS_TO_USE:
+        raise ValueError(
+            f"ratio_to_use must be one of {RATIOS_TO_USE}, got {settings.ratio_to_use!r}"
+        )
+    for name in (
+        "eye_aspect_ratio_threshold",
+        "modified_eye_aspect_ratio_left_threshold",
+        "modified_eye_aspect_ratio_right_threshold",
+        "mouth_aspect_ratio_threshold",
+    ):
+        if not MIN_RATIO_THRESHOLD <= getattr(settings, name) <= 1.0:
+            raise ValueError(
+                f"{name} must be in [{MIN_RATIO_THRESHOLD}, 1], got {getattr(settings, name)}"
+            )
+    for name in ("eyes_closed_time_threshold", "yawn_time_threshold"):
+        if getattr(settings, name) <= 0:
+            raise ValueError(f"{name} must be positive, got {getattr(settings, name)}")
+    return settings
+
+
+class ConfigWatcher:
+    def __init__(
+        self,
+        config_file_path: str = "config.toml",
+        poll_interval: float = 1.0,
+        on_reload=None,
+    ) -> None:
+        """
+        Initializes the ConfigWatcher object, loading the configuration file.
+
+        Args:
+        - config_file_path (str): Path of the configuration file.
+        - poll_interval (float): Seconds between two checks of the file.
+        - on_reload: Function called with the new configuration (dict) after a valid reload, from the
+                     watcher thread, None for none. Its exceptions are logged as warnings.
+
+        Attributes:
+        - config_file_path (str): Path of the configuration file.
+        - poll_interval (float): Seconds between two checks of the file.
+        - on_reload: Function called with the new configuration after a valid reload, None for none.
+        - config (dict): The last valid configuration.
+        - settings (Settings): Settings of the last valid configuration, replaced (never modified) on reloads.
+        - file_state (tuple): (modification time in nanoseconds, size) of the file when last read.
+        - reloads (int): Number of valid reloads.
+        - rejected_reloads (int): Number of reloads rejected because the file was invalid.
+        - stop_event: Threading event set to stop watching.
+        - thread: Thread watching the file, None if not started.
+
+        Raises:
+        - ValueError: If the configuration file is invalid at startup.
+        """
+        self.config_file_path: str = config_file_path
+        self.poll_interval: float = poll_interval
+        self.on_reload = on_reload
+        self.file_state: tuple = self.read_file_state()
+        with open(config_file_path, mode="rb") as config_file:
+            self.config: dict = tomli.load(config_file)
+        self.settings: Settings = validate_config(self.config)
+        self.reloads: int = 0
+        self.rejected_reloads: int = 0
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def read_file_state(self) -> tuple:
+        """
+        Returns what tells that the configuration file changed.
+
+        Returns:
+        - file_state (tuple): (modification time in nanoseconds, size) of the file, None if it does not exist.
+        """
+        try:
+            file_stat = os.stat(self.config_file_path)
+        except FileNotFoundError:
+            return None
+        return (file_stat.st_mtime_ns, file_stat.st_size)
+
+    def start(self):
+        """
+        Starts watching the configuration file.
+
+        Returns:
+        - self (ConfigWatcher): The started watcher.
+        """
+        self.thread = threading.Thread(
+            target=self.watch_loop, name="config-watcher", daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def watch_loop(self) -> None:
+        """
+        Checks the configuration file every poll_interval seconds until stopped.
+
+        Returns:
+        None
+        """
+        while not self.stop_event.wait(self.poll_interval):
+            self.check()
+
+    def check(self) -> bool:
+        """
+        Reloads the configuration file if it changed since it was last read.
+
+        Returns:
+        - reloaded (bool): True if a new valid configuration was swapped in.
+        """
+        file_state = self.read_file_state()
+        if file_state is None or file_state == self.file_state:
+            return False
+        self.file_state = file_state
+        try:
+            with open(self.config_file_path, mode="rb") as config_file:
+                config = tomli.load(config_file)
+            settings = validate_config(config)
+        except (OSError, tomli.TOMLDecodeError, ValueError) as error:
+            self.rejected_reloads += 1
+            print(
+                f"[WARNING] Rejected {self.config_file_path}, keeping the last valid settings: {error}"
+            )
+            return False
+        restart_sections = [
+            section
+            for section in RESTART_SECTIONS
+            if config.get(section) != self.config.get(section)
+        ]
+        if restart_sections:
+            print(
+                "[WARNING] Changes to [{}] of {} apply after a restart".format(
+                    "], [".join(restart_sections), self.config_file_path
+                )
+            )
+        self.config = config
+        # Rebinding the reference is atomic, the loops get the old or the new snapshot
+        self.settings = settings
+        self.reloads += 1
+        print(f"[INFO] Reloaded {self.config_file_path}")
+        if self.on_reload is not None:
+            # A failing callback must not end the watcher thread, reloads go on
+            try:
+                self.on_reload(config)
+            except Exception as exception:
+                print(
+                    f"[WARNING] Reload callback of {self.config_file_path} failed: {exception}"
+                )
+        return True
+
+    def stop(self) -> None:
+        """
+        Stops watching the configuration file.
+
+        Returns:
+        None
+        """
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
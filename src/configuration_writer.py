@@ -1,5 +1,9 @@
+import os
 import tomli_w
 
+# Written first, then moved over config.toml
+TEMPORARY_CONFIG_FILE_PATH = "config.toml.tmp"
+
 
 class ConfigurationWriter:
     def __init__(self):
@@ -28,6 +32,20 @@ class ConfigurationWriter:
         time_thresholds__yawn: int,
         show_ratios__eye_aspect_ratio: bool,
         show_ratios__mouth_aspect_ratio: bool,
+        face_tracking__max_num_faces: int = 1,
+        face_tracking__alarm_all_faces: bool = False,
+        face_tracking__roi_inference: bool = False,
+        face_tracking__roi_padding: float = 0.25,
+        inference_governor__enabled: bool = False,
+        inference_governor__max_interval: int = 4,
+        inference_governor__ratio_margin: float = 0.25,
+        cameras__sources: list = None,
+        cameras__audio_cameras: list = None,
+        metrics__enabled: bool = False,
+        metrics__host: str = "127.0.0.1",
+        metrics__port: int = 9108,
+        metrics__file_path: str = "",
+        metrics__dump_interval: float = 10.0,
     ):
         """
         Writes the configuration parameters to a TOML file.
@@ -50,6 +68,20 @@ class ConfigurationWriter:
         - time_thresholds__yawn (int): The threshold for detecting yawn.
         - show_ratios__eye_aspect_ratio (bool): Whether to show eye aspect ratio.
         - show_ratios__mouth_aspect_ratio (bool): Whether to show mouth aspect ratio.
+        - face_tracking__max_num_faces (int): The maximum number of tracked faces.
+        - face_tracking__alarm_all_faces (bool): Whether every tracked face sounds the alarms, not only the driver's.
+        - face_tracking__roi_inference (bool): Whether to run FaceMesh only on the region of the faces of the previous frame.
+        - face_tracking__roi_padding (float): The padding of that region, relative to the face size.
+        - inference_governor__enabled (bool): Whether to lower the inference rate while the faces are plainly awake.
+        - inference_governor__max_interval (int): The number of frames between two inferences at the lowered rate.
+        - inference_governor__ratio_margin (float): The relative distance the ratios must keep from their thresholds for the rate to be lowered.
+        - cameras__sources (list): Device indices or video paths of the cameras of the supervisor, [0] if None.
+        - cameras__audio_cameras (list): Indices in sources of the cameras sounding the alarms, [0] if None.
+        - metrics__enabled (bool): Whether to expose the metrics of the processing loop.
+        - metrics__host (str): The address the metrics endpoint listens on.
+        - metrics__port (int): The port of the metrics endpoint.
+        - metrics__file_path (str): The file the metrics are dumped to periodically, "" for no dump.
+        - metrics__dump_interval (float): The seconds between two dumps of the metrics.
 
         Returns:
         - None
@@ -77,6 +109,32 @@ class ConfigurationWriter:
                 "eye_aspect_ratio": show_ratios__eye_aspect_ratio,
                 "mouth_aspect_ratio": show_ratios__mouth_aspect_ratio,
             },
+            "face_tracking": {
+                "max_num_faces": face_tracking__max_num_faces,
+                "alarm_all_faces": face_tracking__alarm_all_faces,
+                "roi_inference": face_tracking__roi_inference,
+                "roi_padding": face_tracking__roi_padding,
+            },
+            "inference_governor": {
+                "enabled": inference_governor__enabled,
+                "max_interval": inference_governor__max_interval,
+                "ratio_margin": inference_governor__ratio_margin,
+            },
+            "cameras": {
+                "sources": [0] if cameras__sources is None else cameras__sources,
+                "audio_cameras": (
+                    [0] if cameras__audio_cameras is None else cameras__audio_cameras
+                ),
+            },
+            "metrics": {
+                "enabled": metrics__enabled,
+                "host": metrics__host,
+                "port": metrics__port,
+                "file_path": metrics__file_path,
+                "dump_interval": metrics__dump_interval,
+            },
         }
-        with open("config.toml", "wb") as config_file:
+        # Replacing the file at once, so that the config watcher never reads it half written
+        with open(TEMPORARY_CONFIG_FILE_PATH, "wb") as config_file:
             tomli_w.dump(doc, config_file)
+        os.replace(TEMPORARY_CONFIG_FILE_PATH, "config.toml")
@@ -0,0 +1,218 @@
+# MultiFaceDetectionPipeline Class
+
+import numpy as np
+
+import landmarks
+import ratio_utils
+from alarm_tracker import AlarmTrackerArray
+from face_tracker import FaceTracker
+
+
+def eye_aspect_ratio_thresholds(config: dict):
+    """
+    Returns the (left, right) eye aspect ratio thresholds to use, as main.py decides them.
+
+    Args:
+    - config (dict): Loaded config.toml.
+
+    Returns:
+    - thresholds (tuple): (left, right) eye aspect ratio thresholds.
+    """
+    if config["ratio_to_use"] == "modified_eye_aspect_ratio":
+        return (
+            config["ratio_thresholds"]["modified_eye_aspect_ratio_left"],
+            config["ratio_thresholds"]["modified_eye_aspect_ratio_right"],
+        )
+    return (
+        config["ratio_thresholds"]["eye_aspect_ratio"],
+        config["ratio_thresholds"]["eye_aspect_ratio"],
+    )
+
+
+class MultiFaceDetectionPipeline:
+    def __init__(
+        self,
+        eyes_closed_alarm,
+        yawn_alarm,
+        left_eye_aspect_ratio_threshold: float,
+        right_eye_aspect_ratio_threshold: float,
+        mouth_aspect_ratio_threshold: float,
+        max_faces: int,
+        alarm_all_faces: bool = False,
+    ) -> None:
+        """
+        Initializes the MultiFaceDetectionPipeline object.
+
+        Turns the landmarks of the faces of a frame into ratios, eyes/mouth states and alarm updates,
+        independently of where the landmarks come from (see landmark_detectors). Faces keep stable IDs
+        across frames (see FaceTracker), and the alarm state of every face is kept in arrays indexed
+        by its track slot, so all the faces of a frame are decided in one vectorized step.
+
+        Only the driver, the face tracked the longest, sounds the alarms unless alarm_all_faces is set,
+        so that dozing passengers do not keep them sounding. Their alarms are in the decisions only.
+
+        Args:
+        - eyes_closed_alarm: EyesClosed (or AlarmTracker) object, sounding while the eyes of the driver are closed too long.
+        - yawn_alarm: Yawn (or AlarmTracker) object, sounding while the driver yawns too long.
+        - left_eye_aspect_ratio_threshold (float): Left eye ratio under which the eye is closed.
+        - right_eye_aspect_ratio_threshold (float): Right eye ratio under which the eye is closed.
+        - mouth_aspect_ratio_threshold (float): Mouth ratio over which the mouth is yawning.
+        - max_faces (int): Maximum number of tracked faces.
+        - alarm_all_faces (bool): Whether every tracked face sounds the alarms, not only the driver.
+
+        Attributes:
+        - eyes_closed_alarm: EyesClosed object, whose time threshold applies to every face.
+        - yawn_alarm: Yawn object, whose time threshold applies to every face.
+        - face_tracker (FaceTracker): Associates the faces of every frame with their tracks.
+        - eyes_closed_alarms (AlarmTrackerArray): Eyes closed alarm state of every track slot.
+        - yawn_alarms (AlarmTrackerArray): Yawn alarm state of every track slot.
+        - left_eye_aspect_ratio_threshold (float): Left eye ratio under which the eye is closed.
+        - right_eye_aspect_ratio_threshold (float): Right eye ratio under which the eye is closed.
+        - mouth_aspect_ratio_threshold (float): Mouth ratio over which the mouth is yawning.
+        - alarm_all_faces (bool): Whether every tracked face sounds the alarms, not only the driver.
+        """
+        self.eyes_closed_alarm = eyes_closed_alarm
+        self.yawn_alarm = yawn_alarm
+        self.alarm_all_faces: bool = alarm_all_faces
+        self.face_tracker = FaceTracker(max_faces)
+        self.eyes_closed_alarms = AlarmTrackerArray(
+            max_faces, eyes_closed_alarm.time_threshold
+        )
+        self.yawn_alarms = AlarmTrackerArray(max_faces, yawn_alarm.time_threshold)
+        self.update_thresholds(
+            left_eye_aspect_ratio_threshold,
+            right_eye_aspect_ratio_threshold,
+            mouth_aspect_ratio_threshold,
+        )
+
+    @classmethod
+    def from_config(cls, config: dict, eyes_closed_alarm, yawn_alarm):
+        """
+        Creates a MultiFaceDetectionPipeline with the ratio thresholds and face tracking of config.toml.
+
+        Args:
+        - config (dict): Loaded config.toml.
+        - eyes_closed_alarm: EyesClosed (or AlarmTracker) object, sounding for the driver.
+        - yawn_alarm: Yawn (or AlarmTracker) object, sounding for the driver.
+
+        Returns:
+        - pipeline (MultiFaceDetectionPipeline): The created pipeline.
+        """
+        left_threshold, right_threshold = eye_aspect_ratio_thresholds(config)
+        return cls(
+            eyes_closed_alarm,
+            yawn_alarm,
+            left_threshold,
+            right_threshold,
+            config["ratio_thresholds"]["mouth_aspect_ratio"],
+            config["face_tracking"]["max_num_faces"],
+            config["face_tracking"]["alarm_all_faces"],
+        )
+
+    def update_thresholds(
+        self,
+        left_eye_aspect_ratio_threshold: float,
+        right_eye_aspect_ratio_threshold: float,
+        mouth_aspect_ratio_threshold: float,
+    ) -> None:
+        """
+        Updates the ratio thresholds.
+
+        Args:
+        - left_eye_aspect_ratio_threshold (float): Left eye ratio under which the eye is closed.
+        - right_eye_aspect_ratio_threshold (float): Right eye ratio under which the eye is closed.
+        - mouth_aspect_ratio_threshold (float): Mouth ratio over which the mouth is yawning.
+
+        Returns:
+        None
+        """
+        self.left_eye_aspect_ratio_threshold: float = left_eye_aspect_ratio_threshold
+        self.right_eye_aspect_ratio_threshold: float = right_eye_aspect_ratio_threshold
+        self.mouth_aspect_ratio_threshold: float = mouth_aspect_ratio_threshold
+
+    def notok_pending(self) -> bool:
+        """
+        Checks if not-ok time is building up in the alarm windows of any tracked face.
+
+        Returns:
+        - notok_pending (bool): True if not-ok time is building up in the eyes closed or yawn alarm window of a track.
+        """
+        slots = np.flatnonzero(self.face_tracker.track_ids >= 0)
+        return bool(
+            self.eyes_closed_alarms.alarm_windows.notok_pending(slots).any()
+            or self.yawn_alarms.alarm_windows.notok_pending(slots).any()
+        )
+
+    def process(self, faces_coordinates, timestamp: float) -> dict:
+        """
+        Processes the landmarks of all the faces of a frame, sounding the alarms if the driver needs them.
+
+        Args:
+        - faces_coordinates (numpy.ndarray): (faces, 468, 2) array of landmark coordinates, or None
+                                             if no face was detected.
+        - timestamp (float): Monotonic capture timestamp of the frame in seconds.
+
+        Returns:
+        - decisions (dict): (faces,) arrays, for the tracked faces only: face_ids, coordinates_indices
+                            (index of every face in faces_coordinates), left_eye_aspect_ratio,
+                            right_eye_aspect_ratio, mouth_aspect_ratio, eyes_open, mouth_normal,
+                            eyes_closed_alarming, yawn_alarming and sounding (whether the face sounds the
+                            alarms, see alarm_all_faces). Faces are sorted by ID, oldest first.
+        """
+        if faces_coordinates is None:
+            faces_coordinates = np.empty((0, landmarks.NUM_LANDMARKS, 2), np.int32)
+        slots, new_tracks = self.face_tracker.update(faces_coordinates)
+        self.eyes_closed_alarms.reset(slots[new_tracks])
+        self.yawn_alarms.reset(slots[new_tracks])
+
+        # Tracked faces, oldest first
+        face_ids = self.face_tracker.track_ids[slots]
+        coordinates_indices = np.flatnonzero(slots >= 0)
+        coordinates_indices = coordinates_indices[
+            np.argsort(face_ids[coordinates_indices], kind="stable")
+        ]
+        slots = slots[coordinates_indices]
+        faces_coordinates = faces_coordinates[coordinates_indices]
+
+        eye_aspect_ratios = ratio_utils.eye_aspect_ratios(
+            landmarks.eyes(faces_coordinates)
+        )
+        mouth_aspect_ratios = ratio_utils.mouth_aspect_ratios(
+            landmarks.mouth(faces_coordinates)
+        )
+        eyes_open = (
+            eye_aspect_ratios[:, 0] >= self.left_eye_aspect_ratio_threshold
+        ) | (eye_aspect_ratios[:, 1] >= self.right_eye_aspect_ratio_threshold)
+        mouth_normal = mouth_aspect_ratios <= self.mouth_aspect_ratio_threshold
+
+        self.eyes_closed_alarms.update_time_threshold(
+            self.eyes_closed_alarm.time_threshold
+        )
+        self.yawn_alarms.update_time_threshold(self.yawn_alarm.time_threshold)
+        self.eyes_closed_alarms.add_bounded_frames(slots, eyes_open, timestamp)
+        self.yawn_alarms.add_bounded_frames(slots, mouth_normal, timestamp)
+        eyes_closed_alarming = self.eyes_closed_alarms.alarming[slots]
+        yawn_alarming = self.yawn_alarms.alarming[slots]
+
+        face_ids = self.face_tracker.track_ids[slots]
+        sounding = np.full(len(face_ids), self.alarm_all_faces)
+        if len(face_ids) and not self.alarm_all_faces:
+            # IDs grow with time, the driver's track has the smallest ID, even if it missed this frame
+            tracked_ids = self.face_tracker.track_ids
+            sounding = face_ids == tracked_ids[tracked_ids >= 0].min()
+        if (eyes_closed_alarming & sounding).any():
+            self.eyes_closed_alarm.trigger_alarm()
+        if (yawn_alarming & sounding).any():
+            self.yawn_alarm.trigger_alarm()
+        return {
+            "face_ids": face_ids,
+            "coordinates_indices": coordinates_indices,
+            "left_eye_aspect_ratio": eye_aspect_ratios[:, 0],
+            "right_eye_aspect_ratio": eye_aspect_ratios[:, 1],
+            "mouth_aspect_ratio": mouth_aspect_ratios,
+            "eyes_open": eyes_open,
+            "mouth_normal": mouth_normal,
+            "eyes_closed_alarming": eyes_closed_alarming,
+            "yawn_alarming": yawn_alarming,
+            "sounding": sounding,
+        }
@@ -1,7 +1,55 @@
 # Drawing utility functions
 
+import functools
 import cv2 as cv
+import numpy as np
 import colors
+import landmarks
+
+
+@functools.lru_cache(maxsize=256)
+def text_size(text):
+    """
+    Returns the size of a text drawn with the HUD font, cached as most HUD strings repeat every frame.
+
+    Args:
+        text (str): The text to be measured.
+
+    Returns:
+        tuple: ((text_width, text_height), baseline), as returned by cv.getTextSize().
+    """
+    return cv.getTextSize(text, cv.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+
+
+def blend_rectangle(image, top_left, bottom_right, color, opacity=1.0):
+    """
+    Alpha blends a filled rectangle into an image, in place, touching only the pixels of the rectangle.
+
+    Args:
+        image (numpy.ndarray): The input image as a NumPy array.
+        top_left (tuple): The (x, y) coordinates of the top-left corner of the rectangle.
+        bottom_right (tuple): The (x, y) coordinates of the bottom-right corner of the rectangle, inclusive,
+                              as with cv.rectangle().
+        color (tuple): The color of the rectangle, specified as a tuple of (B, G, R) values.
+        opacity (float, optional): The opacity of the rectangle, ranging from 0.0 to 1.0. Defaults to 1.0.
+
+    Returns:
+        None.
+    """
+    image_height, image_width = image.shape[:2]
+    x0, y0 = max(top_left[0], 0), max(top_left[1], 0)
+    x1, y1 = min(bottom_right[0] + 1, image_width), min(
+        bottom_right[1] + 1, image_height
+    )
+    if x0 >= x1 or y0 >= y1:
+        return
+    roi = image[y0:y1, x0:x1]
+    if opacity >= 1.0:
+        roi[:] = color
+        return
+    fill = np.empty_like(roi)
+    fill[:] = color
+    cv.addWeighted(fill, opacity, roi, 1 - opacity, 0, dst=roi)
 
 
 def text(image, text, text_position, text_color=colors.BLACK):
@@ -41,9 +89,8 @@ def text(image, text, text_position, text_color=colors.BLACK):
         - The drawn text is positioned just below the text_position coordinates, with a small margin for readability.
         - The function returns the input image with the text drawn on it.
     """
-    (text_width, text_height), _ = cv.getTextSize(text, cv.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+    (text_width, text_height), _ = text_size(text)
     x, y = text_position
-    overlay = image.copy()
     cv.putText(
         image, text, (x, y + text_height), cv.FONT_HERSHEY_SIMPLEX, 0.5, text_color, 1
     )
@@ -109,23 +156,20 @@ def text_with_background(
           to 1.0 (fully opaque).
         - The padding_x and padding_y parameters specify the horizontal and vertical padding between the text and the
           background box, respectively.
+        - The background box is blended only over its own pixels, and the input image is drawn on in place.
         - The function returns the input image with the text drawn on it with a background box.
     """
-    (text_width, text_height), _ = cv.getTextSize(text, cv.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+    (text_width, text_height), _ = text_size(text)
     x, y = position
-    overlay = image.copy()
-    cv.rectangle(
-        overlay,
+    blend_rectangle(
+        image,
         (x, y),
         (x + text_width + 2 * padding_x, y + text_height + 2 * padding_y),
         background_color,
-        -1,
-    )
-    new_image = cv.addWeighted(
-        overlay, background_opacity, image, 1 - background_opacity, 0
+        background_opacity,
     )
     cv.putText(
-        new_image,
+        image,
         text,
         (x + padding_x, y + padding_y + text_height),
         cv.FONT_HERSHEY_SIMPLEX,
@@ -133,5 +177,184 @@ def text_with_background(
         text_color,
         1,
     )
-    image = new_image
     return image
+
+
+@functools.lru_cache(maxsize=16)
+def point_sprite_offsets(radius, thickness):
+    """
+    Returns the pixel offsets of a circle drawn around (0, 0), computed once per (radius, thickness).
+
+    Args:
+        radius (int): The radius of the circle.
+        thickness (int): The thickness of the circle outline, -1 for a filled circle, as with cv.circle().
+
+    Returns:
+        tuple: (dy, dx) arrays of the vertical and horizontal offsets of the circle pixels.
+    """
+    size = 2 * radius + 1
+    sprite = np.zeros((size, size), dtype=np.uint8)
+    cv.circle(sprite, (radius, radius), radius, 1, thickness)
+    dy, dx = np.nonzero(sprite)
+    return dy - radius, dx - radius
+
+
+def points(image, coordinates, color, radius=1, thickness=-1):
+    """
+    Draws a circle at each of the given points, all in one batch.
+
+    Args:
+        image (numpy.ndarray): The input image as a NumPy array.
+        coordinates (numpy.ndarray): The (N, 2) array of (x, y) coordinates of the points.
+        color (tuple): The color of the points, specified as a tuple of (B, G, R) values.
+        radius (int, optional): The radius of the circles. Defaults to 1.
+        thickness (int, optional): The thickness of the circle outlines, -1 for filled circles. Defaults to -1.
+
+    Returns:
+        numpy.ndarray: The input image with the points drawn on it.
+
+    Raises:
+        None.
+
+    Example usage:
+        # Draw the eye landmarks in green
+        image = points(image, landmarks.eyes(mesh_coordinates).reshape(-1, 2), colors.GREEN)
+
+    Note:
+        - Instead of one cv.circle() call per point, a precomputed circle sprite is stamped at every point
+          with a single NumPy fancy-index assignment. The circles are not anti-aliased.
+        - Pixels falling outside of the image are skipped.
+    """
+    dy, dx = point_sprite_offsets(radius, thickness)
+    coordinates = np.asarray(coordinates)
+    ys = coordinates[:, 1, np.newaxis] + dy
+    xs = coordinates[:, 0, np.newaxis] + dx
+    image_height, image_width = image.shape[:2]
+    inside = (ys >= 0) & (ys < image_height) & (xs >= 0) & (xs < image_width)
+    image[ys[inside], xs[inside]] = color
+    return image
+
+
+def face_landmarks(image, mesh_coordinates, face=True, eye=True, mouth=True):
+    """
+    Draws the face, eye and mouth landmark groups of a face.
+
+    Args:
+        image (numpy.ndarray): The input image as a NumPy array.
+        mesh_coordinates (numpy.ndarray): The (468, 2) array of landmark coordinates.
+        face (bool, optional): Whether to draw all the face landmarks, in colors.CYAN. Defaults to True.
+        eye (bool, optional): Whether to draw the eye landmarks, in colors.GREEN. Defaults to True.
+        mouth (bool, optional): Whether to draw the mouth landmarks, in colors.MAGNETA. Defaults to True.
+
+    Returns:
+        numpy.ndarray: The input image with the landmarks drawn on it.
+    """
+    if face:
+        points(image, mesh_coordinates, colors.CYAN)
+    if eye:
+        points(image, mesh_coordinates[landmarks.EYES.reshape(-1)], colors.GREEN)
+    if mouth:
+        points(image, mesh_coordinates[landmarks.MOUTH], colors.MAGNETA)
+    return image
+
+
+class HUDCompositor:
+    def __init__(self) -> None:
+        """
+        Initializes the HUDCompositor object.
+
+        Collects the HUD items of a frame, and draws all of them onto the frame in one pass.
+
+        Attributes:
+        - items (list): HUD items queued for the current frame.
+        """
+        self.items: list = []
+
+    def text(self, text, text_position, text_color=colors.BLACK) -> None:
+        """
+        Queues a text, see text() for the arguments.
+
+        Returns:
+        None
+        """
+        self.items.append((text, text_position, text_color, None, 0.0, 0, 0))
+
+    def text_with_background(
+        self,
+        text,
+        position,
+        text_color=colors.WHITE,
+        background_color=colors.GRAY,
+        background_opacity=1.0,
+        padding_x=5,
+        padding_y=5,
+    ) -> None:
+        """
+        Queues a text with a background box, see text_with_background() for the arguments.
+
+        Returns:
+        None
+        """
+        self.items.append(
+            (
+                text,
+                position,
+                text_color,
+                background_color,
+                background_opacity,
+                padding_x,
+                padding_y,
+            )
+        )
+
+    def clear(self) -> None:
+        """
+        Drops the queued HUD items without drawing them.
+
+        Returns:
+        None
+        """
+        self.items.clear()
+
+    def compose(self, image):
+        """
+        Draws the queued HUD items onto an image, in place, and clears the queue.
+
+        Args:
+        - image (numpy.ndarray): The frame to draw on.
+
+        Returns:
+        - image (numpy.ndarray): The same frame, with the HUD drawn on it.
+
+        Notes:
+        - Background boxes are blended only over their own region of interest, not the whole frame.
+        """
+        for (
+            text,
+            (x, y),
+            text_color,
+            background_color,
+            background_opacity,
+            padding_x,
+            padding_y,
+        ) in self.items:
+            (text_width, text_height), _ = text_size(text)
+            if background_color is not None:
+                blend_rectangle(
+                    image,
+                    (x, y),
+                    (x + text_width + 2 * padding_x, y + text_height + 2 * padding_y),
+                    background_color,
+                    background_opacity,
+                )
+            cv.putText(
+                image,
+                text,
+                (x + padding_x, y + padding_y + text_height),
+                cv.FONT_HERSHEY_SIMPLEX,
+                0.5,
+                text_color,
+                1,
+            )
+        self.items.clear()
+        return image
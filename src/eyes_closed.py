@@ -1,48 +1,38 @@
 # EyesClosed Class
 
-import simpleaudio as sa
-from frames import Frames
+from alarm_window import AlarmWindow
 
 
 class EyesClosed:
-    def __init__(self, time_threshold: int, alarm_wav_file_path: str) -> None:
+    def __init__(self, time_threshold: int, alarm_audio_service) -> None:
         """
         Initializes the EyesClosed object.
 
         Args:
         - time_threshold (int): Time threshold in seconds for detecting closed eyes.
-        - alarm_wav_file_path (str): File path of the WAV audio file for the alarm sound.
+        - alarm_audio_service (AlarmAudioService): Started service playing the alarm sound.
 
         Attributes:
         - time_threshold (int): Time threshold in seconds for detecting closed eyes.
-        - alarm_wav_obj: WaveObject instance created from the alarm WAV audio file.
-        - alarm_audio_instance: Audio instance for playing the alarm sound.
-        - bounded_frames (Frames): Frames object to track the count of bounded frames.
+        - alarm_audio_service (AlarmAudioService): Service playing the alarm sound.
+        - alarm_window (AlarmWindow): Sliding window of the bounded frames deciding the alarm.
         """
         self.time_threshold: int = time_threshold
-        self.alarm_wav_obj = sa.WaveObject.from_wave_file(alarm_wav_file_path)
-        self.alarm_audio_instance = None
-        self.bounded_frames: Frames = Frames(80)
+        self.alarm_audio_service = alarm_audio_service
+        self.alarm_window: AlarmWindow = AlarmWindow(time_threshold)
 
-    def add_bounded_frame(self, ok: bool, fps: float) -> None:
+    def add_bounded_frame(self, ok: bool, timestamp: float) -> None:
         """
         Adds a bounded frame to the tracker and triggers the alarm if the conditions are met.
 
         Args:
         - ok (bool): Flag indicating if the frame is "ok" or "notok".
-        - fps (float): Frames per second of the video stream.
+        - timestamp (float): Monotonic capture timestamp of the frame in seconds.
 
         Returns:
         None
         """
-        if ok:
-            self.bounded_frames.add_ok()
-        else:
-            self.bounded_frames.add_notok()
-        if (
-            self.bounded_frames.crossed_threshold()
-            and self.bounded_frames.ok + self.bounded_frames.notok > self.time_threshold * fps
-        ):
+        if self.alarm_window.add(ok, timestamp):
             self.trigger_alarm()
 
     def update_time_threshold(self, time_threshold: int) -> None:
@@ -56,6 +46,7 @@ class EyesClosed:
         None
         """
         self.time_threshold = time_threshold
+        self.alarm_window.update_time_threshold(time_threshold)
 
     def reset(self) -> None:
         """
@@ -64,38 +55,26 @@ class EyesClosed:
         Returns:
         None
         """
-        self.bounded_frames.reset()
-        if self.alarm_audio_instance:
-            if self.alarm_audio_instance.is_playing():
-                self.alarm_audio_instance.stop()
-            self.alarm_audio_instance = None
+        self.alarm_window.reset()
+        self.alarm_audio_service.stop_alarm("eyes_closed")
 
     def trigger_alarm(self) -> None:
         """
-        Triggers the alarm by playing the alarm sound.
+        Triggers the alarm by asking the audio service to play the alarm sound, without waiting.
 
         Returns:
         None
         """
-        # play sleepy alaram sound
-        if self.alarm_audio_instance:
-            if self.alarm_audio_instance.is_playing():
-                return
-            else:
-                self.alarm_audio_instance = self.alarm_wav_obj.play()
-        else:
-            self.alarm_audio_instance = self.alarm_wav_obj.play()
+        self.alarm_audio_service.fire("eyes_closed")
 
     def stop_alarm(self) -> None:
         """
-        Stops the alarm if it is currently playing.
+        Stops the alarm if it is currently playing, without waiting.
 
         Returns:
         None
         """
-        if self.alarm_audio_instance:
-            if self.alarm_audio_instance.is_playing():
-                self.alarm_audio_instance.stop()
+        self.alarm_audio_service.stop_alarm("eyes_closed")
 
     def is_playing(self) -> bool:
         """
@@ -104,6 +83,4 @@ class EyesClosed:
         Returns:
         - is_playing (bool): True if the alarm sound is playing, False otherwise.
         """
-        if self.alarm_audio_instance:
-            return self.alarm_audio_instance.is_playing()
-        return False
+        return self.alarm_audio_service.is_playing("eyes_closed")
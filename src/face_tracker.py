@@ -0,0 +1,125 @@
+# FaceTracker Class
+
+import numpy as np
+
+
+class FaceTracker:
+    def __init__(
+        self,
+        max_faces: int,
+        max_distance_ratio: float = 0.5,
+        max_missed_frames: int = 15,
+    ) -> None:
+        """
+        Initializes the FaceTracker object.
+
+        Gives the faces detected in consecutive frames stable IDs, by associating every face
+        with the nearest track (landmark centroid) of the previous frames. Every track owns a
+        slot in [0, max_faces), so per-face state can be kept in arrays indexed by slot.
+
+        Args:
+        - max_faces (int): Maximum number of tracked faces, the number of slots.
+        - max_distance_ratio (float): Maximum centroid movement between two frames, relative to the
+                                      face size, for a face to keep its track.
+        - max_missed_frames (int): Number of consecutive frames a track survives without its face, unless
+                                   its slot is needed for a new face while all the slots are taken.
+
+        Attributes:
+        - max_distance_ratio (float): Maximum centroid movement relative to the face size.
+        - max_missed_frames (int): Number of consecutive frames a track survives without its face.
+        - track_ids (numpy.ndarray): (max_faces,) ID of the track of every slot, -1 for free slots.
+        - centroids (numpy.ndarray): (max_faces, 2) last landmark centroid of every track.
+        - sizes (numpy.ndarray): (max_faces,) last face size (bounding box diagonal) of every track.
+        - missed_frames (numpy.ndarray): (max_faces,) consecutive frames every track missed its face.
+        - next_track_id (int): ID of the next new track.
+        - tracks_lost (int): Number of tracks dropped after missing their face too long, or for a new face.
+        """
+        self.max_distance_ratio: float = max_distance_ratio
+        self.max_missed_frames: int = max_missed_frames
+        self.track_ids = np.full(max_faces, -1, dtype=np.int64)
+        self.centroids = np.zeros((max_faces, 2))
+        self.sizes = np.zeros(max_faces)
+        self.missed_frames = np.zeros(max_faces, dtype=np.int64)
+        self.next_track_id: int = 0
+        self.tracks_lost: int = 0
+
+    def update(self, faces_coordinates):
+        """
+        Associates the faces of a frame with the tracks, creating tracks for new faces.
+
+        Args:
+        - faces_coordinates (numpy.ndarray): (faces, 468, 2) array of landmark coordinates, may be empty.
+
+        Returns:
+        - slots (numpy.ndarray): (faces,) slot of the track of every face, -1 for faces left untracked
+                                 because all the slots are taken.
+        - new_tracks (numpy.ndarray): (faces,) True for faces that started a new track.
+        """
+        num_faces = len(faces_coordinates)
+        slots = np.full(num_faces, -1, dtype=np.int64)
+        new_tracks = np.zeros(num_faces, dtype=bool)
+        centroids = faces_coordinates.mean(axis=1)
+        extents = faces_coordinates.max(axis=1) - faces_coordinates.min(axis=1)
+        sizes = np.hypot(extents[:, 0], extents[:, 1])
+
+        # Greedy nearest centroid association, faces and tracks are few
+        active = self.track_ids >= 0
+        differences = centroids[:, np.newaxis, :] - self.centroids[np.newaxis, :, :]
+        distances = np.hypot(differences[..., 0], differences[..., 1])
+        distances[:, ~active] = np.inf
+        distances[distances > self.max_distance_ratio * self.sizes] = np.inf
+        for _ in range(min(num_faces, int(active.sum()))):
+            face, slot = np.unravel_index(np.argmin(distances), distances.shape)
+            if distances[face, slot] == np.inf:
+                break
+            slots[face] = slot
+            distances[face, :] = np.inf
+            distances[:, slot] = np.inf
+
+        # Tracks that missed their face, freed after max_missed_frames
+        matched = np.zeros(len(self.track_ids), dtype=bool)
+        matched[slots[slots >= 0]] = True
+        missed = active & ~matched
+        self.missed_frames[missed] += 1
+        lost = missed & (self.missed_frames > self.max_missed_frames)
+        self.track_ids[lost] = -1
+        self.tracks_lost += int(np.count_nonzero(lost))
+
+        # New tracks for the unmatched faces, in the free slots, then in the slots of the tracks that
+        # missed their face the longest: a face detected far from its stale track (head turn, camera
+        # bump) must not stay untracked, without alarms, until the track expires
+        free_slots = np.flatnonzero(self.track_ids < 0)
+        unmatched_faces = np.flatnonzero(slots < 0)
+        if len(unmatched_faces) > len(free_slots):
+            missed_slots = np.flatnonzero(missed & ~lost)
+            missed_slots = missed_slots[
+                np.argsort(-self.missed_frames[missed_slots], kind="stable")
+            ]
+            dropped = missed_slots[: len(unmatched_faces) - len(free_slots)]
+            self.track_ids[dropped] = -1
+            self.tracks_lost += len(dropped)
+            free_slots = np.concatenate((free_slots, dropped))
+        unmatched_faces = unmatched_faces[: len(free_slots)]
+        new_slots = free_slots[: len(unmatched_faces)]
+        slots[unmatched_faces] = new_slots
+        new_tracks[unmatched_faces] = True
+        self.track_ids[new_slots] = np.arange(
+            self.next_track_id, self.next_track_id + len(new_slots)
+        )
+        self.next_track_id += len(new_slots)
+
+        tracked = slots >= 0
+        self.centroids[slots[tracked]] = centroids[tracked]
+        self.sizes[slots[tracked]] = sizes[tracked]
+        self.missed_frames[slots[tracked]] = 0
+        return (slots, new_tracks)
+
+    def reset(self) -> None:
+        """
+        Drops all the tracks.
+
+        Returns:
+        None
+        """
+        self.track_ids.fill(-1)
+        self.missed_frames.fill(0)
@@ -1,21 +1,43 @@
-# Frames per Second (FPS) Class
+# Frames per Second (FPS) and Stage Timers Classes
 
+import collections
+import contextlib
+import threading
 import time
+import numpy as np
 
 
 class FPS:
-    def __init__(self) -> None:
+    def __init__(self, window_size: int = 60, smoothing: float = 0.1) -> None:
         """
         Initializes the FPS (Frames Per Second) counter.
 
+        Besides the average rate since start(), reports the instantaneous rate (last frame interval),
+        an exponentially weighted moving average (EWMA) rate and the rate over the last window_size
+        frames, which follow throughput changes and show stalls.
+
+        Args:
+        - window_size (int): Number of frames of the fixed-window rate.
+        - smoothing (float): Weight of the last frame interval in the EWMA, in (0, 1].
+
         Attributes:
-        - _start_time (float): Start time of the FPS measurement.
-        - _stop_time (float): Stop time of the FPS measurement.
+        - _start_time (int): Start time of the FPS measurement in nanoseconds.
+        - _stop_time (int): Stop time of the FPS measurement in nanoseconds.
         - _frames (int): Number of frames processed.
+        - window_size (int): Number of frames of the fixed-window rate.
+        - _smoothing (float): Weight of the last frame interval in the EWMA.
+        - _frame_times (collections.deque): perf_counter_ns() values of the last window_size frames.
+        - _last_interval (int): Nanoseconds between the last two frames, 0 before two frames.
+        - _ewma_interval (float): EWMA of the frame intervals in nanoseconds, 0 before two frames.
         """
-        self._start_time: float = 0
-        self._stop_time: float = 0
+        self._start_time: int = 0
+        self._stop_time: int = 0
         self._frames: int = 0
+        self.window_size: int = window_size
+        self._smoothing: float = smoothing
+        self._frame_times: collections.deque = collections.deque(maxlen=window_size)
+        self._last_interval: int = 0
+        self._ewma_interval: float = 0.0
 
     def start(self) -> None:
         """
@@ -24,7 +46,7 @@ class FPS:
         Returns:
         None
         """
-        self._start_time = time.time()
+        self._start_time = time.perf_counter_ns()
 
     def stop(self) -> None:
         """
@@ -33,16 +55,26 @@ class FPS:
         Returns:
         None
         """
-        self._stop_time = time.time()
+        self._stop_time = time.perf_counter_ns()
 
     def update(self) -> None:
         """
-        Updates the FPS counter by incrementing the frame count.
+        Updates the FPS counter by incrementing the frame count and recording the frame time.
 
         Returns:
         None
         """
         self._frames += 1
+        now = time.perf_counter_ns()
+        if self._frame_times:
+            self._last_interval = now - self._frame_times[-1]
+            if self._ewma_interval:
+                self._ewma_interval += self._smoothing * (
+                    self._last_interval - self._ewma_interval
+                )
+            else:
+                self._ewma_interval = float(self._last_interval)
+        self._frame_times.append(now)
 
     def fps(self) -> float:
         """
@@ -51,4 +83,166 @@ class FPS:
         Returns:
         - fps (float): Frames per second value.
         """
-        return self._frames / (self._stop_time - self._start_time)
+        return self._frames * 1e9 / (self._stop_time - self._start_time)
+
+    def instantaneous_fps(self) -> float:
+        """
+        Returns the rate of the last frame interval.
+
+        Returns:
+        - fps (float): Frames per second value, 0 before two frames.
+        """
+        return 1e9 / self._last_interval if self._last_interval else 0.0
+
+    def ewma_fps(self) -> float:
+        """
+        Returns the rate of the exponentially weighted moving average of the frame intervals.
+
+        Returns:
+        - fps (float): Frames per second value, 0 before two frames.
+        """
+        return 1e9 / self._ewma_interval if self._ewma_interval else 0.0
+
+    def window_fps(self) -> float:
+        """
+        Returns the rate over the last window_size frames.
+
+        Returns:
+        - fps (float): Frames per second value, 0 before two frames.
+        """
+        if len(self._frame_times) < 2:
+            return 0.0
+        return (
+            (len(self._frame_times) - 1)
+            * 1e9
+            / (self._frame_times[-1] - self._frame_times[0])
+        )
+
+
+class StageTimers:
+    def __init__(self, window_size: int = 1000, metrics=None) -> None:
+        """
+        Initializes the StageTimers object.
+
+        Times named stages of the frame processing (e.g. capture, color_convert, inference,
+        ratios, overlay, display), keeping the durations of the last window_size runs of
+        every stage for min/p50/p99 statistics.
+
+        Args:
+        - window_size (int): Number of durations kept per stage.
+        - metrics (Metrics): Metrics whose stage_duration_seconds histogram also records the durations,
+                             None to not export them.
+
+        Attributes:
+        - window_size (int): Number of durations kept per stage.
+        - metrics (Metrics): Metrics recording the durations, None to not export them.
+        - durations (dict): Stage name -> (window_size,) ring buffer of durations in nanoseconds.
+        - counts (dict): Stage name -> number of runs of the stage.
+        - start_times (dict): Stage name -> perf_counter_ns() value at which the running stage started.
+        - lock: Threading lock guarding the addition of stages, stages being timed from several threads.
+        """
+        self.window_size: int = window_size
+        self.metrics = metrics
+        if metrics is not None:
+            metrics.describe(
+                "stage_duration_seconds",
+                "histogram",
+                "Duration of the frame processing stages.",
+            )
+        self.durations: dict = {}
+        self.counts: dict = {}
+        self.start_times: dict = {}
+        self.lock = threading.Lock()
+
+    def start(self, stage: str) -> None:
+        """
+        Starts timing a stage.
+
+        Args:
+        - stage (str): Name of the stage.
+
+        Returns:
+        None
+        """
+        self.start_times[stage] = time.perf_counter_ns()
+
+    def stop(self, stage: str) -> None:
+        """
+        Stops timing a stage, recording its duration.
+
+        Args:
+        - stage (str): Name of the stage, started with start().
+
+        Returns:
+        None
+        """
+        duration = time.perf_counter_ns() - self.start_times[stage]
+        if stage not in self.durations:
+            with self.lock:
+                self.counts[stage] = 0
+                self.durations[stage] = np.zeros(self.window_size, dtype=np.int64)
+        self.durations[stage][self.counts[stage] % self.window_size] = duration
+        self.counts[stage] += 1
+        if self.metrics is not None:
+            self.metrics.observe(
+                "stage_duration_seconds", duration / 1e9, (("stage", stage),)
+            )
+
+    @contextlib.contextmanager
+    def measure(self, stage: str):
+        """
+        Times the code of a with block as a stage.
+
+        Args:
+        - stage (str): Name of the stage.
+
+        Example usage:
+            with stage_timers.measure("inference"):
+                faces_coordinates = detector.detect(frame)
+        """
+        self.start(stage)
+        try:
+            yield
+        finally:
+            self.stop(stage)
+
+    def stats(self) -> dict:
+        """
+        Returns the duration statistics of the stages over their last window_size runs.
+
+        Returns:
+        - stats (dict): Stage name -> dict of count (total runs), min, p50 and p99 (milliseconds).
+        """
+        # Stages are added by the threads timing them while stats are read from others
+        with self.lock:
+            stages = [
+                (stage, durations, self.counts[stage])
+                for stage, durations in self.durations.items()
+            ]
+        stats = {}
+        for stage, durations, count in stages:
+            if count == 0:
+                continue
+            recent = durations[: min(count, self.window_size)] / 1e6
+            p50, p99 = np.percentile(recent, (50, 99))
+            stats[stage] = {
+                "count": count,
+                "min": float(recent.min()),
+                "p50": float(p50),
+                "p99": float(p99),
+            }
+        return stats
+
+    def report(self) -> str:
+        """
+        Formats the statistics of the stages, one line per stage.
+
+        Returns:
+        - report (str): The formatted statistics.
+        """
+        return "\n".join(
+            "{:>14}: min {:8.3f} ms, p50 {:8.3f} ms, p99 {:8.3f} ms ({} runs)".format(
+                stage, stats["min"], stats["p50"], stats["p99"], stats["count"]
+            )
+            for stage, stats in self.stats().items()
+        )
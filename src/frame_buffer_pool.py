@@ -0,0 +1,74 @@
+# Frame Buffer Pool Class
+
+import threading
+import numpy as np
+
+
+class FrameBufferPool:
+    def __init__(self, shape, dtype=np.uint8, size: int = 4) -> None:
+        """
+        Initializes the FrameBufferPool object.
+
+        Args:
+        - shape (tuple): Shape of the frame buffers, e.g. (height, width, 3).
+        - dtype: NumPy dtype of the frame buffers.
+        - size (int): Number of preallocated frame buffers.
+
+        Attributes:
+        - shape (tuple): Shape of the frame buffers.
+        - dtype: NumPy dtype of the frame buffers.
+        - size (int): Number of frame buffers kept by the pool.
+        - free_buffers (list): Frame buffers ready to be acquired.
+        - misses (int): Number of acquires that found the pool empty and allocated a new buffer.
+        - lock: Threading lock guarding the free buffers.
+        """
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.size: int = size
+        self.free_buffers: list = [
+            np.empty(self.shape, self.dtype) for _ in range(size)
+        ]
+        self.misses: int = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Takes a frame buffer out of the pool, the caller owns it until it is released.
+
+        Returns:
+        - buffer (numpy.ndarray): A frame buffer, newly allocated if the pool is empty.
+        """
+        with self.lock:
+            if self.free_buffers:
+                return self.free_buffers.pop()
+            self.misses += 1
+        return np.empty(self.shape, self.dtype)
+
+    def release(self, buffer) -> None:
+        """
+        Gives a frame buffer back to the pool.
+
+        Args:
+        - buffer (numpy.ndarray): The frame buffer, must not be used by the caller afterwards.
+
+        Returns:
+        None
+
+        Notes:
+        - Buffers of another shape or dtype, and buffers beyond the pool size, are left to the garbage collector.
+        """
+        if buffer is None or buffer.shape != self.shape or buffer.dtype != self.dtype:
+            return
+        with self.lock:
+            if len(self.free_buffers) < self.size:
+                self.free_buffers.append(buffer)
+
+    def available(self) -> int:
+        """
+        Returns the number of frame buffers ready to be acquired.
+
+        Returns:
+        - available (int): Number of free frame buffers.
+        """
+        with self.lock:
+            return len(self.free_buffers)
@@ -0,0 +1,423 @@
+# Headless Runner
+#
+# Runs the detection pipeline of main.py as a service, for in-vehicle units
+# without a display: Tkinter, sv_ttk and the HUD are never imported and no
+# OpenCV HighGUI function is called, only capture, inference, decisions and the
+# alarm sounds run. Alarms and periodic stats are logged (to a file with
+# --log-file), the loop metrics are exposed as set in [metrics] of config.toml,
+# and edits of config.toml apply while running. SIGTERM stops it cleanly.
+#
+# Usage:
+#   python src/headless.py                            (first camera of config.toml)
+#   python src/headless.py 0 --log-file drowsy_driver.log
+#   python src/headless.py drive.mp4 --no-audio
+
+import argparse
+import signal
+import sys
+import time
+import cv2 as cv
+
+import config_watcher
+import detection_pipeline
+import fps
+import inference_governor
+import initializer
+import landmark_detectors
+import metrics
+import staged_pipeline
+import video_stream
+from alarm_tracker import AlarmTracker
+from video_sources import parse_source
+
+# Frames waiting between two stages of the processing
+STAGE_QUEUE_SIZE = 2
+
+
+class TimestampedLog:
+    def __init__(self, log_file) -> None:
+        """
+        Initializes the TimestampedLog object, a text stream prefixing every line with the time.
+
+        Replaces sys.stdout and sys.stderr, so that the [INFO], [WARNING] and [ALARM] lines
+        printed by every module end up timestamped in the log file.
+
+        Args:
+        - log_file: Line buffered text file the lines are written to.
+
+        Attributes:
+        - log_file: Text file the lines are written to.
+        - at_line_start (bool): Whether the next character written starts a line.
+        """
+        self.log_file = log_file
+        self.at_line_start: bool = True
+
+    def write(self, text: str) -> int:
+        """
+        Writes text to the log file, prefixing the lines it starts with the local time.
+
+        Args:
+        - text (str): The text to write.
+
+        Returns:
+        - length (int): Number of characters of text.
+        """
+        for line in text.splitlines(keepends=True):
+            if self.at_line_start:
+                self.log_file.write(time.strftime("%Y-%m-%d %H:%M:%S "))
+            self.log_file.write(line)
+            self.at_line_start = line.endswith("\n")
+        return len(text)
+
+    def flush(self) -> None:
+        """
+        Flushes the log file.
+
+        Returns:
+        None
+        """
+        self.log_file.flush()
+
+
+def create_detector(config: dict, detector_name: str, stage_timers=None):
+    """
+    Creates the landmark detector, warmed up.
+
+    Args:
+    - config (dict): Loaded config.toml.
+    - detector_name (str): "mediapipe" or "synthetic".
+    - stage_timers (fps.StageTimers): Optional timers of the detector stages.
+
+    Returns:
+    - detector (LandmarkDetector): The created detector.
+    """
+    if detector_name == "synthetic":
+        return landmark_detectors.SyntheticLandmarkDetector()
+    return landmark_detectors.MediaPipeLandmarkDetector.from_config(
+        config, stage_timers=stage_timers, warm_up=True
+    )
+
+
+def open_stream(source, is_video_file: bool, stage_timers):
+    """
+    Opens and starts the threaded capture of a camera or video.
+
+    Args:
+    - source (int or str): Device index, or path/URL of a video.
+    - is_video_file (bool): Whether the source is a video, processed without dropping frames.
+    - stage_timers (StageTimers): Times the reads of the capture.
+
+    Returns:
+    - stream (VideoStream): The started stream.
+    """
+    # Cameras always process their latest frame, captured until the pipeline starts
+    # Frames are read into pooled buffers: one queued, one being captured, and up to
+    # STAGE_QUEUE_SIZE waiting plus one being processed per stage (inference, decision, logging)
+    return video_stream.VideoStream(
+        source,
+        queue_size=2 if is_video_file else 1,
+        drop_policy="block" if is_video_file else "latest",
+        buffer_pool_size=2 + 3 * (STAGE_QUEUE_SIZE + 1),
+        stage_timers=stage_timers,
+    ).start()
+
+
+def create_alarms(config: dict, play_audio: bool) -> tuple:
+    """
+    Creates the eyes closed and yawn alarms of the pipeline.
+
+    Args:
+    - config (dict): Loaded config.toml.
+    - play_audio (bool): Whether the alarms sound.
+
+    Returns:
+    - alarm_audio_service (AlarmAudioService): Started service playing the sounds, None without audio.
+    - eyes_closed_alarm: EyesClosed object, AlarmTracker without audio.
+    - yawn_alarm: Yawn object, AlarmTracker without audio.
+    """
+    if not play_audio:
+        return (
+            None,
+            AlarmTracker(config["time_thresholds"]["eyes_closed"]),
+            AlarmTracker(config["time_thresholds"]["yawn"]),
+        )
+    # Imported here, so that units without audio do not need simpleaudio
+    import alarm_audio
+    import eyes_closed
+    import yawn
+
+    alarm_audio_service = alarm_audio.AlarmAudioService().start()
+    return (
+        alarm_audio_service,
+        eyes_closed.EyesClosed(
+            time_threshold=config["time_thresholds"]["eyes_closed"],
+            alarm_audio_service=alarm_audio_service,
+        ),
+        yawn.Yawn(
+            time_threshold=config["time_thresholds"]["yawn"],
+            alarm_audio_service=alarm_audio_service,
+        ),
+    )
+
+
+def log_startup(milestone: str, startup_time: float, timestamp: float = None) -> None:
+    """
+    Logs the time a startup milestone was reached at, read by startup_benchmark.py.
+
+    Args:
+    - milestone (str): Name of the milestone.
+    - startup_time (float): time.perf_counter() value at which the startup began.
+    - timestamp (float): time.perf_counter() value at which the milestone was reached, None for now.
+
+    Returns:
+    None
+    """
+    if timestamp is None:
+        timestamp = time.perf_counter()
+    print(f"[INFO] Startup: {milestone} after {timestamp - startup_time:.3f} s")
+
+
+def log_alarms(decisions: dict, alarming: dict) -> None:
+    """
+    Logs the alarms that start on a frame.
+
+    Args:
+    - decisions (dict): Decisions of the frame (see MultiFaceDetectionPipeline.process).
+    - alarming (dict): face_id -> (eyes closed alarming, yawn alarming) of the previous frames,
+                       updated with the frame.
+
+    Returns:
+    None
+    """
+    for face_id, eyes_closed_alarming, yawn_alarming in zip(
+        decisions["face_ids"].tolist(),
+        decisions["eyes_closed_alarming"].tolist(),
+        decisions["yawn_alarming"].tolist(),
+    ):
+        was_eyes_closed_alarming, was_yawn_alarming = alarming.get(
+            face_id, (False, False)
+        )
+        if eyes_closed_alarming and not was_eyes_closed_alarming:
+            print(f"[ALARM] Face {face_id}: eyes closed")
+        if yawn_alarming and not was_yawn_alarming:
+            print(f"[ALARM] Face {face_id}: yawning")
+        alarming[face_id] = (eyes_closed_alarming, yawn_alarming)
+
+
+def run(
+    source,
+    config_file_path: str = "config.toml",
+    play_audio: bool = True,
+    stats_interval: float = 60.0,
+    detector_name: str = "mediapipe",
+    max_frames: int = 0,
+) -> int:
+    """
+    Runs the detection pipeline on a camera or video until it ends or SIGTERM/SIGINT is received.
+
+    Args:
+    - source (int or str): Device index, or path/URL of a video, None for the first camera of config.toml.
+    - config_file_path (str): Configuration file, whose edits are applied while running.
+    - play_audio (bool): Whether to sound the eyes closed and yawn alarms.
+    - stats_interval (float): Seconds between two stats lines.
+    - detector_name (str): "mediapipe", or "synthetic" to run without MediaPipe (smoke tests, benchmarks).
+    - max_frames (int): Number of frames after which to stop, 0 for no limit.
+
+    Returns:
+    - exit_code (int): 0 if stopped or the video ended, 1 if the camera stopped delivering frames.
+    """
+    startup_time = time.perf_counter()
+    config_file_watcher = config_watcher.ConfigWatcher(config_file_path)
+    config = config_file_watcher.config
+    if source is None:
+        source = config["cameras"]["sources"][0]
+    source = parse_source(source)
+    is_video_file = isinstance(source, str)
+    log_startup("config", startup_time)
+
+    pipeline_metrics = metrics.Metrics()
+    stage_timers = fps.StageTimers(metrics=pipeline_metrics)
+
+    # Loading and warming up the model, decoding the alarm sounds and opening the camera
+    # run at the same time
+    startup = initializer.Initializer()
+    startup.add(
+        "detector",
+        create_detector,
+        config,
+        detector_name,
+        stage_timers,
+        cleanup=lambda detector: detector.close(),
+    )
+    startup.add("alarms", create_alarms, config, play_audio)
+    startup.add(
+        "camera",
+        open_stream,
+        source,
+        is_video_file,
+        stage_timers,
+        cleanup=video_stream.VideoStream.close,
+    )
+    initialized = startup.run()
+    for step in startup.steps:
+        log_startup(step, startup_time, startup.end_times[step])
+    print("[INFO] " + startup.report())
+    detector = initialized["detector"]
+    alarm_audio_service, eyes_closed_alarm, yawn_alarm = initialized["alarms"]
+    stream = initialized["camera"]
+
+    pipeline = detection_pipeline.MultiFaceDetectionPipeline.from_config(
+        config, eyes_closed_alarm, yawn_alarm
+    )
+    config_file_watcher.settings.apply(pipeline)
+    governor = inference_governor.InferenceGovernor.from_config(config)
+
+    # Video files are read faster than real time, their frames are timed by the frame rate
+    video_fps = (stream.stream.get(cv.CAP_PROP_FPS) or 30.0) if is_video_file else 0.0
+    frames_per_second = fps.FPS()
+    frames_per_second.start()
+    stages = staged_pipeline.StagedPipeline(
+        stream,
+        detector,
+        pipeline,
+        governor,
+        queue_size=STAGE_QUEUE_SIZE,
+        video_fps=video_fps,
+        stage_timers=stage_timers,
+        settings_source=config_file_watcher,
+    ).start()
+    metrics.register_loop_collectors(
+        pipeline_metrics,
+        pipeline,
+        governor,
+        stream=stream,
+        frames_per_second=frames_per_second,
+        staged_pipeline=stages,
+    )
+    metrics_exporter = metrics.MetricsExporter.from_config(
+        pipeline_metrics, config
+    ).start()
+    config_file_watcher.start()
+
+    def handle_stop_signal(signal_number, stack_frame):
+        print(f"[INFO] Stopping on {signal.Signals(signal_number).name} ...")
+        stages.stop_event.set()
+
+    signal.signal(signal.SIGTERM, handle_stop_signal)
+    signal.signal(signal.SIGINT, handle_stop_signal)
+
+    print(f"[INFO] Processing {source} headless ({stream.width()}x{stream.height()})")
+    alarming = {}
+    faces = 0
+    frames = 0
+    stream_ended = False
+    last_stats_time = time.monotonic()
+    try:
+        while True:
+            result_read_successful, result = stages.read()
+            if not result_read_successful:
+                stream_ended = not stages.stop_event.is_set()
+                break
+            frames_per_second.update()
+            frames += 1
+            if frames == 1:
+                log_startup("first_frame", startup_time, result["capture_timestamp"])
+                log_startup("first_landmarks", startup_time)
+            decisions = result["decisions"]
+            faces = len(decisions["face_ids"])
+            log_alarms(decisions, alarming)
+            stages.release(result)
+            now = time.monotonic()
+            if now - last_stats_time >= stats_interval:
+                last_stats_time = now
+                print(
+                    "[INFO] {:.1f} FPS, {:.0f}% inferred, {} faces, {} eyes closed and {} yawn alarms, {} frames dropped, queues {}".format(
+                        frames_per_second.window_fps(),
+                        governor.stats()["inferred_percentage"],
+                        faces,
+                        pipeline.eyes_closed_alarms.alarms_started_total,
+                        pipeline.yawn_alarms.alarms_started_total,
+                        stream.frames_dropped,
+                        stages.queue_depths(),
+                    )
+                )
+            if max_frames and frames >= max_frames:
+                break
+    finally:
+        frames_per_second.stop()
+        stages.stop()
+        stream.close()
+        detector.close()
+        metrics_exporter.stop()
+        config_file_watcher.stop()
+        if alarm_audio_service is not None:
+            alarm_audio_service.stop()
+
+    print(f"[INFO] VideoStream stats: {stream.stats()}")
+    print(f"[INFO] Inference governor: {governor.stats()}")
+    print(
+        "[INFO] FPS: average {:.1f}, last {} frames {:.1f}, EWMA {:.1f}".format(
+            frames_per_second.fps(),
+            frames_per_second.window_size,
+            frames_per_second.window_fps(),
+            frames_per_second.ewma_fps(),
+        )
+    )
+    print("[INFO] Stage timings:\n" + stage_timers.report())
+    if stream_ended and not is_video_file:
+        print(f"[WARNING] Camera {source} stopped delivering frames")
+        return 1
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Runs the drowsiness detection without a display."
+    )
+    parser.add_argument(
+        "source",
+        nargs="?",
+        help="camera device index or video path (default: first of [cameras] of config.toml)",
+    )
+    parser.add_argument("--config", default="config.toml", help="configuration file")
+    parser.add_argument(
+        "--log-file", help="file the log is appended to (default: standard output)"
+    )
+    parser.add_argument(
+        "--no-audio", action="store_true", help="do not sound the alarms"
+    )
+    parser.add_argument(
+        "--stats-interval",
+        type=float,
+        default=60.0,
+        help="seconds between two stats lines",
+    )
+    parser.add_argument(
+        "--detector",
+        choices=("mediapipe", "synthetic"),
+        default="mediapipe",
+        help="landmark detector, synthetic runs without MediaPipe",
+    )
+    parser.add_argument(
+        "--frames", type=int, default=0, help="frames after which to stop (0: no limit)"
+    )
+    args = parser.parse_args()
+
+    if args.log_file is not None:
+        sys.stdout = sys.stderr = TimestampedLog(
+            open(args.log_file, mode="a", buffering=1)
+        )
+    sys.exit(
+        run(
+            args.source,
+            config_file_path=args.config,
+            play_audio=not args.no_audio,
+            stats_interval=args.stats_interval,
+            detector_name=args.detector,
+            max_frames=args.frames,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+# InferenceGovernor Class
+#
+# Lowers the rate FaceMesh runs at while every face is plainly awake: eye aspect
+# ratios well over their thresholds, mouth aspect ratios well under theirs and no
+# not-ok time building up in the alarm windows. As soon as a ratio gets near its
+# threshold, not-ok time builds up or no face is seen, every frame is inferred
+# again. Skipped frames reuse the landmarks of the last inferred frame.
+#
+# In the staged pipeline, should_infer() runs on the inference thread and
+# update() on the decision thread, so the rate state is guarded by a lock.
+
+import threading
+import numpy as np
+
+
+class InferenceGovernor:
+    def __init__(self, max_interval: int = 4, ratio_margin: float = 0.25) -> None:
+        """
+        Initializes the InferenceGovernor object.
+
+        Args:
+        - max_interval (int): Frames between two inferences while all the faces are calm,
+                              1 infers every frame.
+        - ratio_margin (float): Relative distance the ratios must keep from their thresholds
+                                for a face to be calm, e.g. 0.25 for 25%.
+
+        Attributes:
+        - max_interval (int): Frames between two inferences while all the faces are calm.
+        - ratio_margin (float): Relative distance the ratios must keep from their thresholds.
+        - interval (int): Current number of frames between two inferences.
+        - frames_since_inference (int): Frames skipped since the last inference.
+        - frames (int): Number of frames seen.
+        - inferred_frames (int): Number of frames inferred.
+        - skipped_frames (int): Number of frames skipped.
+        - full_rate_reasons (dict): Reason -> number of inferences after which the rate went (or stayed)
+                                    full: "no_face", "ratios" (near a threshold) and "alarm_windows"
+                                    (not-ok time building up in the alarm windows).
+        - lock: Threading lock guarding the counters and the interval, used from the inference and decision threads.
+        """
+        self.max_interval: int = max_interval
+        self.ratio_margin: float = ratio_margin
+        self.interval: int = 1
+        self.frames_since_inference: int = 0
+        self.frames: int = 0
+        self.inferred_frames: int = 0
+        self.skipped_frames: int = 0
+        self.full_rate_reasons: dict = {"no_face": 0, "ratios": 0, "alarm_windows": 0}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Creates an InferenceGovernor with the settings of config.toml.
+
+        Args:
+        - config (dict): Loaded config.toml.
+
+        Returns:
+        - governor (InferenceGovernor): The created governor, inferring every frame if disabled.
+        """
+        settings = config["inference_governor"]
+        return cls(
+            max_interval=settings["max_interval"] if settings["enabled"] else 1,
+            ratio_margin=settings["ratio_margin"],
+        )
+
+    def should_infer(self) -> bool:
+        """
+        Decides if the current frame is inferred, to be called once per frame.
+
+        Returns:
+        - should_infer (bool): True to run the landmark detector on the frame, False to reuse
+                               the landmarks of the last inferred frame.
+        """
+        with self.lock:
+            self.frames += 1
+            if self.frames_since_inference + 1 >= self.interval:
+                self.frames_since_inference = 0
+                self.inferred_frames += 1
+                return True
+            self.frames_since_inference += 1
+            self.skipped_frames += 1
+            return False
+
+    def update(self, pipeline, decisions, inferred: bool = None) -> None:
+        """
+        Updates the inference rate from the decisions of an inferred frame.
+
+        Args:
+        - pipeline (MultiFaceDetectionPipeline): The pipeline the decisions come from, for its
+                                                 thresholds and alarm windows.
+        - decisions (dict): The decisions returned by pipeline.process, None if no face was detected.
+        - inferred (bool): Whether the frame of the decisions was inferred, None if it is the frame
+                           should_infer() was last called for. Given by pipelined loops, where later
+                           frames may have been read already.
+
+        Returns:
+        None
+        """
+        if inferred is None:
+            with self.lock:
+                inferred = self.frames_since_inference == 0
+        if not inferred:
+            return
+        # Decided from the pipeline state only, out of the lock
+        reason = self.full_rate_reason(pipeline, decisions)
+        with self.lock:
+            if reason is None:
+                self.interval = self.max_interval
+            else:
+                self.interval = 1
+                self.full_rate_reasons[reason] += 1
+
+    def full_rate_reason(self, pipeline, decisions):
+        """
+        Checks if the faces of a frame need every frame inferred.
+
+        Args:
+        - pipeline (MultiFaceDetectionPipeline): The pipeline the decisions come from.
+        - decisions (dict): The decisions returned by pipeline.process, None if no face was detected.
+
+        Returns:
+        - reason (str): "no_face", "ratios" or "alarm_windows", None if all the faces are calm.
+        """
+        if decisions is None or len(decisions["face_ids"]) == 0:
+            return "no_face"
+        eyes_calm = np.all(
+            decisions["left_eye_aspect_ratio"]
+            >= pipeline.left_eye_aspect_ratio_threshold * (1 + self.ratio_margin)
+        ) and np.all(
+            decisions["right_eye_aspect_ratio"]
+            >= pipeline.right_eye_aspect_ratio_threshold * (1 + self.ratio_margin)
+        )
+        mouths_calm = np.all(
+            decisions["mouth_aspect_ratio"]
+            <= pipeline.mouth_aspect_ratio_threshold * (1 - self.ratio_margin)
+        )
+        if not (eyes_calm and mouths_calm):
+            return "ratios"
+        if pipeline.notok_pending():
+            return "alarm_windows"
+        return None
+
+    def stats(self) -> dict:
+        """
+        Returns the decisions of the governor so far.
+
+        Returns:
+        - stats (dict): frames, inferred_frames, skipped_frames, inferred_percentage, interval
+                        and the full_rate_reasons counts.
+        """
+        with self.lock:
+            return {
+                "frames": self.frames,
+                "inferred_frames": self.inferred_frames,
+                "skipped_frames": self.skipped_frames,
+                "inferred_percentage": (
+                    100 * self.inferred_frames / self.frames if self.frames else 100.0
+                ),
+                "interval": self.interval,
+                **self.full_rate_reasons,
+            }
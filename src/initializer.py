@@ -0,0 +1,123 @@
+# Initializer Class
+#
+# Runs the independent startup steps (opening the camera, loading and warming
+# up FaceMesh, decoding the alarm sounds) at the same time on threads of their
+# own, instead of one after the other, and reports how long each one took.
+# These steps mostly wait on drivers, files and native code that releases the
+# GIL, so startup takes about as long as the slowest step instead of the sum of
+# all of them.
+#
+# Usage:
+#   initializer = Initializer()
+#   initializer.add("camera", cv.VideoCapture, 0, cleanup=cv.VideoCapture.release)
+#   initializer.add("detector", MediaPipeLandmarkDetector.from_config, config, warm_up=True)
+#   steps = initializer.run()
+#   print(initializer.report())
+
+import concurrent.futures
+import time
+
+
+class Initializer:
+    def __init__(self) -> None:
+        """
+        Initializes the Initializer object.
+
+        Attributes:
+        - steps (dict): Step name -> (function, args, kwargs) of the steps, in the order added.
+        - cleanups (dict): Step name -> function releasing what the step initialized, for the steps having one.
+        - results (dict): Step name -> value returned by the step, for the steps that succeeded.
+        - durations (dict): Step name -> seconds the step took, once run.
+        - end_times (dict): Step name -> time.perf_counter() value at which the step ended, once run.
+        - duration (float): Seconds all the steps took together, once run.
+        """
+        self.steps: dict = {}
+        self.cleanups: dict = {}
+        self.results: dict = {}
+        self.durations: dict = {}
+        self.end_times: dict = {}
+        self.duration: float = 0.0
+
+    def add(self, name: str, function, *args, cleanup=None, **kwargs) -> None:
+        """
+        Adds a step, independent of the other steps.
+
+        Args:
+        - name (str): Name of the step.
+        - function: Function running the step, returning what it initialized.
+        - args: Positional arguments of the function.
+        - cleanup: Function called with what the step initialized if another step fails
+                   (e.g. to close a camera), None for none.
+        - kwargs: Keyword arguments of the function.
+
+        Returns:
+        None
+        """
+        self.steps[name] = (function, args, kwargs)
+        if cleanup is not None:
+            self.cleanups[name] = cleanup
+
+    def run_step(self, name: str):
+        """
+        Runs a step, timing it.
+
+        Args:
+        - name (str): Name of the step.
+
+        Returns:
+        - result: Value returned by the step.
+        """
+        function, args, kwargs = self.steps[name]
+        start_time = time.perf_counter()
+        try:
+            result = function(*args, **kwargs)
+            self.results[name] = result
+            return result
+        finally:
+            self.end_times[name] = time.perf_counter()
+            self.durations[name] = self.end_times[name] - start_time
+
+    def run(self) -> dict:
+        """
+        Runs all the steps at the same time, waiting for all of them.
+
+        Returns:
+        - results (dict): Step name -> value returned by the step.
+
+        Raises:
+        - RuntimeError: If a step failed, chained to its exception, once all the steps ended
+                        and what the other steps initialized was cleaned up.
+        """
+        start_time = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=max(len(self.steps), 1), thread_name_prefix="initializer"
+        ) as executor:
+            futures = {
+                name: executor.submit(self.run_step, name) for name in self.steps
+            }
+        self.duration = time.perf_counter() - start_time
+        for name, future in futures.items():
+            if future.exception() is not None:
+                for succeeded_name, result in self.results.items():
+                    if succeeded_name in self.cleanups:
+                        self.cleanups[succeeded_name](result)
+                raise RuntimeError(
+                    f"Initialization step {name} failed"
+                ) from future.exception()
+        return dict(self.results)
+
+    def report(self) -> str:
+        """
+        Formats the time taken by the steps.
+
+        Returns:
+        - report (str): The formatted durations.
+        """
+        return "Initialized in {:.3f} s ({})".format(
+            self.duration,
+            ", ".join(
+                f"{name} {self.durations[name]:.3f} s"
+                for name in self.steps
+                if name in self.durations
+            ),
+        )
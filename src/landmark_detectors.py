@@ -0,0 +1,517 @@
+# Landmark Detector Classes
+#
+# Every detector turns a BGR frame into the pixel landmarks of the faces in it,
+# so that the ratio/alarm pipeline does not depend on where landmarks come from:
+# - MediaPipeLandmarkDetector: runs MediaPipe FaceMesh on the frame, or on the region of its faces
+# - ReplayLandmarkDetector: replays landmarks recorded earlier, ignoring the frame
+# - SyntheticLandmarkDetector: generates a face with blinks, eye closures and yawns
+
+import abc
+import contextlib
+import math
+import cv2 as cv
+import numpy as np
+
+import landmarks
+import landmark_recording
+
+
+class LandmarkDetector(abc.ABC):
+    @abc.abstractmethod
+    def detect(self, frame):
+        """
+        Detects the face landmarks of a frame.
+
+        Args:
+        - frame (numpy.ndarray): The BGR video frame.
+
+        Returns:
+        - faces_coordinates (numpy.ndarray): (faces, 468, 2) int array of (x, y) pixel coordinates,
+                                             or None if no face was detected.
+
+        Notes:
+        - The returned array may be reused by the next call, copy it if it must outlive it.
+        """
+
+    def warm_up(self, width: int = 640, height: int = 480) -> None:
+        """
+        Pays the first-call costs of the detector (graph initialization, buffer allocations)
+        on a blank frame, so that the first real frame is detected at the steady-state latency.
+
+        Args:
+        - width (int): Width of the frames to come.
+        - height (int): Height of the frames to come.
+
+        Returns:
+        None
+        """
+        pass
+
+    def skip(self) -> None:
+        """
+        Lets the detector know a frame was not given to it (see inference_governor),
+        so that detectors following a timeline stay in sync with the video stream.
+
+        Returns:
+        None
+        """
+        pass
+
+    def close(self) -> None:
+        """
+        Releases the resources held by the detector.
+
+        Returns:
+        None
+        """
+        pass
+
+
+class MediaPipeLandmarkDetector(LandmarkDetector):
+    def __init__(
+        self,
+        max_num_faces: int = 1,
+        min_detection_confidence: float = 0.5,
+        min_tracking_confidence: float = 0.5,
+        roi: bool = False,
+        roi_padding: float = 0.25,
+        roi_refresh_interval: int = 30,
+        stage_timers=None,
+    ) -> None:
+        """
+        Initializes the MediaPipeLandmarkDetector object.
+
+        In ROI mode, only the region of the frame around the faces of the previous frame
+        is converted to RGB and given to FaceMesh, instead of the whole frame.
+
+        Args:
+        - max_num_faces (int): Maximum number of faces to detect.
+        - min_detection_confidence (float): FaceMesh minimum detection confidence.
+        - min_tracking_confidence (float): FaceMesh minimum tracking confidence.
+        - roi (bool): Whether to process only the region of the faces of the previous frame.
+        - roi_padding (float): Padding of the region on every side, relative to the face size.
+        - roi_refresh_interval (int): Number of frames after which the whole frame is processed again,
+                                      so that faces entering the frame are found.
+        - stage_timers (fps.StageTimers): Optional timers of the color_convert and inference stages.
+
+        Attributes:
+        - face_mesh: MediaPipe FaceMesh object.
+        - landmark_extractor (LandmarkExtractor): Converts FaceMesh results to pixel coordinates.
+        - rgb_frame (numpy.ndarray): RGB frame buffer, reused across frames.
+        - rgb_roi (numpy.ndarray): RGB region buffer, reused while the region keeps its size.
+        - faces_coordinates (numpy.ndarray): Preallocated (max_num_faces, 468, 2) landmarks array.
+        - roi (bool): Whether ROI mode is enabled.
+        - roi_padding (float): Padding of the region relative to the face size.
+        - roi_refresh_interval (int): Number of region frames between two whole frames.
+        - roi_box (tuple): (x0, y0, x1, y1) region processed in the next frame, None to process the whole frame.
+        - roi_margin (int): Distance in pixels the landmarks may get to the edges of the region before it is moved.
+        - roi_frames (int): Number of frames processed in the region since the last whole frame.
+        - measure_stage: Context manager factory timing a stage, a no-op without stage timers.
+        """
+        # Imported here, so that the other detectors work without MediaPipe installed
+        import mediapipe as mp
+
+        self.face_mesh = mp.solutions.face_mesh.FaceMesh(
+            max_num_faces=max_num_faces,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+        )
+        self.landmark_extractor = landmarks.LandmarkExtractor()
+        self.rgb_frame = None
+        self.rgb_roi = None
+        self.faces_coordinates = np.zeros(
+            (max_num_faces, landmarks.NUM_LANDMARKS, 2), dtype=np.int32
+        )
+        self.roi: bool = roi
+        self.roi_padding: float = roi_padding
+        self.roi_refresh_interval: int = roi_refresh_interval
+        self.roi_box = None
+        self.roi_margin: int = 0
+        self.roi_frames: int = 0
+        self.measure_stage = (
+            contextlib.nullcontext if stage_timers is None else stage_timers.measure
+        )
+
+    @classmethod
+    def from_config(cls, config: dict, stage_timers=None, warm_up: bool = False):
+        """
+        Creates a MediaPipeLandmarkDetector with the [face_tracking] settings of config.toml.
+
+        Args:
+        - config (dict): Loaded config.toml.
+        - stage_timers (fps.StageTimers): Optional timers of the color_convert and inference stages.
+        - warm_up (bool): Whether to warm the detector up (see warm_up) before returning it.
+
+        Returns:
+        - detector (MediaPipeLandmarkDetector): The created detector.
+        """
+        detector = cls(
+            max_num_faces=config["face_tracking"]["max_num_faces"],
+            roi=config["face_tracking"]["roi_inference"],
+            roi_padding=config["face_tracking"]["roi_padding"],
+            stage_timers=stage_timers,
+        )
+        if warm_up:
+            detector.warm_up()
+        return detector
+
+    def detect(self, frame):
+        image_height, image_width = frame.shape[:2]
+        num_faces = 0
+        if self.roi_box is not None and self.roi_frames < self.roi_refresh_interval:
+            self.roi_frames += 1
+            x0, y0, x1, y1 = self.roi_box
+            with self.measure_stage("color_convert"):
+                self.rgb_roi = cv.cvtColor(
+                    frame[y0:y1, x0:x1], cv.COLOR_BGR2RGB, dst=self.rgb_roi
+                )
+            num_faces = self.process(self.rgb_roi, x0, y0)
+        if num_faces == 0:
+            # No region yet, time for a whole frame, or the faces left the region
+            self.roi_frames = 0
+            self.roi_box = None
+            with self.measure_stage("color_convert"):
+                self.rgb_frame = cv.cvtColor(
+                    frame, cv.COLOR_BGR2RGB, dst=self.rgb_frame
+                )
+            num_faces = self.process(self.rgb_frame, 0, 0)
+        if num_faces == 0:
+            return None
+        faces_coordinates = self.faces_coordinates[:num_faces]
+        if self.roi:
+            self.update_roi(faces_coordinates, image_width, image_height)
+        return faces_coordinates
+
+    def warm_up(self, width: int = 640, height: int = 480) -> None:
+        # Not timed, so that the stage statistics only hold real frames; the blank frame
+        # has no face, so FaceMesh looks for faces again on the first real frame
+        self.rgb_frame = np.zeros((height, width, 3), dtype=np.uint8)
+        self.face_mesh.process(self.rgb_frame)
+
+    def process(self, rgb_image, x_offset: int, y_offset: int) -> int:
+        """
+        Runs FaceMesh on an RGB image (the whole frame or a region of it), storing the landmarks
+        in faces_coordinates in frame pixel coordinates.
+
+        Args:
+        - rgb_image (numpy.ndarray): The RGB image.
+        - x_offset (int): x coordinate of the image in the frame.
+        - y_offset (int): y coordinate of the image in the frame.
+
+        Returns:
+        - num_faces (int): Number of detected faces.
+        """
+        image_height, image_width = rgb_image.shape[:2]
+        with self.measure_stage("inference"):
+            results = self.face_mesh.process(rgb_image)
+        if not results.multi_face_landmarks:
+            return 0
+        num_faces = len(results.multi_face_landmarks)
+        for face_index in range(num_faces):
+            self.faces_coordinates[face_index] = self.landmark_extractor.extract(
+                results, image_width, image_height, face_index
+            )
+        if x_offset or y_offset:
+            self.faces_coordinates[:num_faces] += (x_offset, y_offset)
+        return num_faces
+
+    def update_roi(self, faces_coordinates, image_width: int, image_height: int):
+        """
+        Moves the region processed in the next frame around the faces, if they got near its edges.
+
+        Args:
+        - faces_coordinates (numpy.ndarray): (faces, 468, 2) landmarks of the current frame.
+        - image_width (int): Width of the frame.
+        - image_height (int): Height of the frame.
+
+        Returns:
+        None
+
+        Notes:
+        - The region is kept as long as the faces stay inside it, so that FaceMesh keeps
+          tracking the faces in the same image and the RGB region buffer is reused.
+        """
+        x_min, y_min = faces_coordinates.min(axis=(0, 1))
+        x_max, y_max = faces_coordinates.max(axis=(0, 1))
+        if self.roi_box is not None:
+            x0, y0, x1, y1 = self.roi_box
+            if (
+                x_min - x0 >= self.roi_margin
+                and y_min - y0 >= self.roi_margin
+                and x1 - x_max >= self.roi_margin
+                and y1 - y_max >= self.roi_margin
+            ):
+                return
+        face_size = max(x_max - x_min, y_max - y_min, 1)
+        padding = int(self.roi_padding * face_size)
+        self.roi_margin = padding // 2
+        self.roi_box = (
+            max(int(x_min) - padding, 0),
+            max(int(y_min) - padding, 0),
+            min(int(x_max) + padding, image_width),
+            min(int(y_max) + padding, image_height),
+        )
+
+    def close(self) -> None:
+        self.face_mesh.close()
+
+
+class ReplayLandmarkDetector(LandmarkDetector):
+    def __init__(
+        self,
+        recorded_coordinates,
+        face_detected=None,
+        timestamps=None,
+        loop: bool = False,
+    ):
+        """
+        Initializes the ReplayLandmarkDetector object.
+
+        Args:
+        - recorded_coordinates (numpy.ndarray): (n_frames, 468, 2) array of recorded pixel coordinates,
+                                                may be memory-mapped.
+        - face_detected (numpy.ndarray): Optional (n_frames,) bool array, False for frames without a face.
+        - timestamps (numpy.ndarray): Optional (n_frames,) array of recorded timestamps in seconds.
+        - loop (bool): Whether to start over after the last recorded frame.
+
+        Attributes:
+        - recorded_coordinates (numpy.ndarray): Recorded pixel coordinates.
+        - face_detected (numpy.ndarray): Frames with a face, None if all of them have one.
+        - timestamps (numpy.ndarray): Recorded timestamps, None if they were not recorded.
+        - loop (bool): Whether to start over after the last recorded frame.
+        - frame_index (int): Index of the next recorded frame to replay.
+        - frame_timestamp (float): Recorded timestamp of the last replayed frame, None if unknown.
+        - faces_coordinates (numpy.ndarray): Preallocated (1, 468, 2) landmarks array.
+        """
+        self.recorded_coordinates = recorded_coordinates
+        self.face_detected = face_detected
+        self.timestamps = timestamps
+        self.loop: bool = loop
+        self.frame_index: int = 0
+        self.frame_timestamp = None
+        self.faces_coordinates = np.zeros(
+            (1, landmarks.NUM_LANDMARKS, 2), dtype=np.int32
+        )
+
+    @classmethod
+    def from_recording(cls, recording, loop: bool = False):
+        """
+        Creates a ReplayLandmarkDetector replaying a landmark recording.
+
+        Args:
+        - recording (landmark_recording.LandmarkRecording): The memory-mapped recording.
+        - loop (bool): Whether to start over after the last recorded frame.
+
+        Returns:
+        - detector (ReplayLandmarkDetector): The created detector.
+        """
+        return cls(
+            recording.coordinates,
+            face_detected=recording.face_detected,
+            timestamps=recording.timestamps,
+            loop=loop,
+        )
+
+    @classmethod
+    def from_file(cls, path: str, loop: bool = False):
+        """
+        Creates a ReplayLandmarkDetector from a landmark recording directory (see landmark_recording),
+        or from a .npy file of (n_frames, 468, 2) pixel coordinates.
+
+        The files are memory-mapped, not loaded into memory.
+
+        Args:
+        - path (str): Path of the recording directory or of the .npy file.
+        - loop (bool): Whether to start over after the last recorded frame.
+
+        Returns:
+        - detector (ReplayLandmarkDetector): The created detector.
+        """
+        if landmark_recording.is_recording(path):
+            return cls.from_recording(
+                landmark_recording.LandmarkRecording(path), loop=loop
+            )
+        return cls(np.load(path, mmap_mode="r"), loop=loop)
+
+    def exhausted(self) -> bool:
+        """
+        Checks if all the recorded frames have been replayed.
+
+        Returns:
+        - exhausted (bool): True if there are no frames left to replay, False otherwise.
+        """
+        return not self.loop and self.frame_index >= len(self.recorded_coordinates)
+
+    def skip(self) -> None:
+        self.frame_index += 1
+        if self.loop and self.frame_index >= len(self.recorded_coordinates):
+            self.frame_index = 0
+
+    def detect(self, frame):
+        if self.frame_index >= len(self.recorded_coordinates):
+            if not self.loop:
+                return None
+            self.frame_index = 0
+        frame_index = self.frame_index
+        self.frame_index += 1
+        if self.timestamps is not None:
+            self.frame_timestamp = float(self.timestamps[frame_index])
+        if self.face_detected is not None and not self.face_detected[frame_index]:
+            return None
+        self.faces_coordinates[0] = self.recorded_coordinates[frame_index]
+        return self.faces_coordinates
+
+
+class SyntheticLandmarkDetector(LandmarkDetector):
+    # Relative heights of the 7 eye heights, from the outer to the inner ones
+    EYE_HEIGHT_PROFILE = np.array([0.5, 0.8, 0.95, 1.0, 0.95, 0.8, 0.5])
+    # Relative heights of the 9 mouth heights
+    MOUTH_HEIGHT_PROFILE = np.array([0.4, 0.6, 0.8, 0.95, 1.0, 0.95, 0.8, 0.6, 0.4])
+
+    def __init__(
+        self,
+        fps: float = 30.0,
+        open_eye_aspect_ratio: float = 0.3,
+        closed_eye_aspect_ratio: float = 0.05,
+        normal_mouth_aspect_ratio: float = 0.15,
+        yawn_mouth_aspect_ratio: float = 0.8,
+        blink_period: float = 4.0,
+        eyes_closed_period: float = 60.0,
+        eyes_closed_duration: float = 4.0,
+        yawn_period: float = 45.0,
+        yawn_duration: float = 5.0,
+        seed: int = 0,
+    ) -> None:
+        """
+        Initializes the SyntheticLandmarkDetector object.
+
+        Generates the landmarks of a single, slightly moving face whose eyes blink every blink_period
+        seconds, close for eyes_closed_duration seconds every eyes_closed_period seconds, and whose
+        mouth yawns for yawn_duration seconds every yawn_period seconds. Time is counted in frames at fps.
+
+        Args:
+        - fps (float): Frame rate the schedule is generated at.
+        - open_eye_aspect_ratio (float): Eye aspect ratio of open eyes.
+        - closed_eye_aspect_ratio (float): Eye aspect ratio of closed eyes.
+        - normal_mouth_aspect_ratio (float): Mouth aspect ratio of a closed mouth.
+        - yawn_mouth_aspect_ratio (float): Mouth aspect ratio of a yawning mouth.
+        - blink_period (float): Seconds between blinks.
+        - eyes_closed_period (float): Seconds between long eye closures.
+        - eyes_closed_duration (float): Seconds the eyes stay closed.
+        - yawn_period (float): Seconds between yawns.
+        - yawn_duration (float): Seconds a yawn lasts.
+        - seed (int): Seed of the random landmark jitter.
+
+        Attributes:
+        - frame_index (int): Index of the next generated frame.
+        - rng (numpy.random.Generator): Random generator of the landmark jitter.
+        - base_coordinates (numpy.ndarray): (468, 2) normalized face landmarks, eyes and mouth excluded.
+        - faces_coordinates (numpy.ndarray): Preallocated (1, 468, 2) landmarks array.
+        """
+        self.fps: float = fps
+        self.open_eye_aspect_ratio: float = open_eye_aspect_ratio
+        self.closed_eye_aspect_ratio: float = closed_eye_aspect_ratio
+        self.normal_mouth_aspect_ratio: float = normal_mouth_aspect_ratio
+        self.yawn_mouth_aspect_ratio: float = yawn_mouth_aspect_ratio
+        self.blink_period: float = blink_period
+        self.eyes_closed_period: float = eyes_closed_period
+        self.eyes_closed_duration: float = eyes_closed_duration
+        self.yawn_period: float = yawn_period
+        self.yawn_duration: float = yawn_duration
+        self.frame_index: int = 0
+        self.rng = np.random.default_rng(seed)
+        # Landmarks spread over an ellipse, in face-relative units
+        angles = self.rng.uniform(0, 2 * math.pi, landmarks.NUM_LANDMARKS)
+        radii = np.sqrt(self.rng.uniform(0, 1, landmarks.NUM_LANDMARKS))
+        self.base_coordinates = np.stack(
+            (0.5 * radii * np.cos(angles), 0.65 * radii * np.sin(angles)), axis=1
+        )
+        self.faces_coordinates = np.zeros(
+            (1, landmarks.NUM_LANDMARKS, 2), dtype=np.int32
+        )
+
+    def in_episode(self, seconds: float, period: float, duration: float) -> bool:
+        """
+        Checks if a periodic episode (blink, eye closure, yawn) is going on.
+
+        Args:
+        - seconds (float): Current time in seconds.
+        - period (float): Seconds between the starts of two episodes.
+        - duration (float): Seconds an episode lasts.
+
+        Returns:
+        - in_episode (bool): True if an episode is going on, False otherwise.
+        """
+        return seconds > period and seconds % period < duration
+
+    def feature_coordinates(self, center, width, aspect_ratio, height_profile):
+        """
+        Generates the landmarks of an eye or the mouth with the given aspect ratio.
+
+        Args:
+        - center (numpy.ndarray): (x, y) center of the feature.
+        - width (float): Width of the feature.
+        - aspect_ratio (float): Aspect ratio the landmarks must have, as computed by ratio_utils.
+        - height_profile (numpy.ndarray): Relative heights of the feature.
+
+        Returns:
+        - feature_coordinates (numpy.ndarray): (2 + 2 * len(height_profile), 2) array, ordered as in mesh_indices.
+        """
+        num_heights = len(height_profile)
+        # ratio_utils divides the sum of heights by 7 times the width
+        heights = aspect_ratio * 7.0 * width * height_profile / height_profile.sum()
+        xs = center[0] + width * (
+            np.arange(1, num_heights + 1) / (num_heights + 1) - 0.5
+        )
+        feature_coordinates = np.empty((2 + 2 * num_heights, 2))
+        feature_coordinates[0] = (center[0] - width / 2, center[1])
+        feature_coordinates[1] = (center[0] + width / 2, center[1])
+        feature_coordinates[2::2, 0] = xs
+        feature_coordinates[2::2, 1] = center[1] - heights / 2
+        feature_coordinates[3::2, 0] = xs
+        feature_coordinates[3::2, 1] = center[1] + heights / 2
+        return feature_coordinates
+
+    def skip(self) -> None:
+        self.frame_index += 1
+
+    def detect(self, frame):
+        image_height, image_width = frame.shape[:2]
+        seconds = self.frame_index / self.fps
+        self.frame_index += 1
+
+        eye_aspect_ratio = self.open_eye_aspect_ratio
+        if self.in_episode(seconds, self.blink_period, 0.15) or self.in_episode(
+            seconds, self.eyes_closed_period, self.eyes_closed_duration
+        ):
+            eye_aspect_ratio = self.closed_eye_aspect_ratio
+        mouth_aspect_ratio = self.normal_mouth_aspect_ratio
+        if self.in_episode(seconds, self.yawn_period, self.yawn_duration):
+            mouth_aspect_ratio = self.yawn_mouth_aspect_ratio
+
+        # Face slowly swaying around the center of the frame
+        face_size = 0.4 * min(image_width, image_height)
+        face_center = np.array(
+            (
+                image_width / 2 + 0.05 * image_width * math.sin(seconds / 3),
+                image_height / 2 + 0.03 * image_height * math.sin(seconds / 5),
+            )
+        )
+        coordinates = face_center + face_size * self.base_coordinates
+        eye_width = 0.2 * face_size
+        for eye_indices, side in ((landmarks.LEFT_EYE, 1), (landmarks.RIGHT_EYE, -1)):
+            coordinates[eye_indices] = self.feature_coordinates(
+                face_center + (side * 0.2 * face_size, -0.1 * face_size),
+                eye_width,
+                eye_aspect_ratio,
+                self.EYE_HEIGHT_PROFILE,
+            )
+        coordinates[landmarks.MOUTH] = self.feature_coordinates(
+            face_center + (0, 0.25 * face_size),
+            0.35 * face_size,
+            mouth_aspect_ratio,
+            self.MOUTH_HEIGHT_PROFILE,
+        )
+        coordinates += self.rng.normal(0, 0.3, coordinates.shape)
+        np.copyto(self.faces_coordinates[0], coordinates, casting="unsafe")
+        return self.faces_coordinates
@@ -0,0 +1,205 @@
+# Landmark Recording Classes
+#
+# Records the per-frame landmarks of a session once, so that it can be replayed
+# many times (e.g. while tuning thresholds) without running FaceMesh again.
+#
+# A recording is a directory holding:
+# - meta.toml: format version, frame size and frame rate
+# - landmarks.bin: (frames, 468, 2) int16 (x, y) pixel coordinates, zeros for frames without a face
+# - timestamps.bin: (frames,) float64 seconds since the start of the recording
+# - face_detected.bin: (frames,) bool, False for frames without a face
+#
+# The binaries are raw C-order arrays: frames are appended to them while recording,
+# and np.memmap reads them back without loading multi-hour sessions into memory.
+# The number of frames is derived from the file sizes, so a recording that was
+# not closed properly (e.g. the process was killed) stays readable.
+
+import os
+import tomli
+import tomli_w
+import numpy as np
+
+import landmarks
+
+FORMAT_VERSION = 1
+
+META_FILE_NAME = "meta.toml"
+LANDMARKS_FILE_NAME = "landmarks.bin"
+TIMESTAMPS_FILE_NAME = "timestamps.bin"
+FACE_DETECTED_FILE_NAME = "face_detected.bin"
+
+LANDMARKS_DTYPE = np.dtype(np.int16)
+TIMESTAMPS_DTYPE = np.dtype(np.float64)
+FACE_DETECTED_DTYPE = np.dtype(np.bool_)
+
+
+class LandmarkRecorder:
+    def __init__(
+        self, directory: str, frame_width: int, frame_height: int, fps: float
+    ) -> None:
+        """
+        Initializes the LandmarkRecorder object, creating the recording directory.
+
+        Args:
+        - directory (str): Directory of the recording, created if needed.
+        - frame_width (int): Width of the recorded frames.
+        - frame_height (int): Height of the recorded frames.
+        - fps (float): Frame rate of the recorded video stream.
+
+        Attributes:
+        - directory (str): Directory of the recording.
+        - frames (int): Number of frames recorded so far.
+        - landmarks_file: Open landmarks.bin file.
+        - timestamps_file: Open timestamps.bin file.
+        - face_detected_file: Open face_detected.bin file.
+        - frame_coordinates (numpy.ndarray): (468, 2) int16 buffer a frame is converted into before writing.
+
+        Raises:
+        - ValueError: If the frame size does not fit the int16 coordinates.
+        """
+        if max(frame_width, frame_height) > np.iinfo(LANDMARKS_DTYPE).max:
+            raise ValueError(
+                f"Frame size {frame_width}x{frame_height} does not fit int16 coordinates"
+            )
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, META_FILE_NAME), mode="wb") as meta_file:
+            tomli_w.dump(
+                {
+                    "version": FORMAT_VERSION,
+                    "frame_width": frame_width,
+                    "frame_height": frame_height,
+                    "fps": float(fps),
+                },
+                meta_file,
+            )
+        self.directory: str = directory
+        self.frames: int = 0
+        self.landmarks_file = open(os.path.join(directory, LANDMARKS_FILE_NAME), "wb")
+        self.timestamps_file = open(os.path.join(directory, TIMESTAMPS_FILE_NAME), "wb")
+        self.face_detected_file = open(
+            os.path.join(directory, FACE_DETECTED_FILE_NAME), "wb"
+        )
+        self.frame_coordinates = np.zeros(
+            (landmarks.NUM_LANDMARKS, 2), dtype=LANDMARKS_DTYPE
+        )
+
+    def add_frame(self, mesh_coordinates, timestamp: float) -> None:
+        """
+        Appends the landmarks of a frame to the recording.
+
+        Args:
+        - mesh_coordinates (numpy.ndarray): (468, 2) array of pixel coordinates, as returned by
+                                            landmarks_detection, or None if no face was detected.
+        - timestamp (float): Seconds since the start of the recording.
+
+        Returns:
+        None
+        """
+        if mesh_coordinates is None:
+            self.frame_coordinates.fill(0)
+        else:
+            np.copyto(self.frame_coordinates, mesh_coordinates, casting="unsafe")
+        self.landmarks_file.write(self.frame_coordinates.tobytes())
+        self.timestamps_file.write(TIMESTAMPS_DTYPE.type(timestamp).tobytes())
+        self.face_detected_file.write(
+            FACE_DETECTED_DTYPE.type(mesh_coordinates is not None).tobytes()
+        )
+        self.frames += 1
+
+    def close(self) -> None:
+        """
+        Closes the recording files.
+
+        Returns:
+        None
+        """
+        self.landmarks_file.close()
+        self.timestamps_file.close()
+        self.face_detected_file.close()
+
+
+class LandmarkRecording:
+    def __init__(self, directory: str) -> None:
+        """
+        Initializes the LandmarkRecording object, memory-mapping a recording.
+
+        Args:
+        - directory (str): Directory of the recording.
+
+        Attributes:
+        - directory (str): Directory of the recording.
+        - frame_width (int): Width of the recorded frames.
+        - frame_height (int): Height of the recorded frames.
+        - fps (float): Frame rate of the recorded video stream.
+        - frames (int): Number of complete recorded frames.
+        - coordinates (numpy.memmap): (frames, 468, 2) int16 pixel coordinates.
+        - timestamps (numpy.memmap): (frames,) float64 timestamps in seconds.
+        - face_detected (numpy.memmap): (frames,) bool, False for frames without a face.
+
+        Raises:
+        - ValueError: If the recording was written by a newer, unknown format version.
+        """
+        with open(os.path.join(directory, META_FILE_NAME), mode="rb") as meta_file:
+            meta = tomli.load(meta_file)
+        if meta["version"] > FORMAT_VERSION:
+            raise ValueError(
+                f"Unsupported landmark recording version {meta['version']} in {directory}"
+            )
+        self.directory: str = directory
+        self.frame_width: int = meta["frame_width"]
+        self.frame_height: int = meta["frame_height"]
+        self.fps: float = meta["fps"]
+
+        frame_shape = (landmarks.NUM_LANDMARKS, 2)
+        landmarks_path = os.path.join(directory, LANDMARKS_FILE_NAME)
+        timestamps_path = os.path.join(directory, TIMESTAMPS_FILE_NAME)
+        face_detected_path = os.path.join(directory, FACE_DETECTED_FILE_NAME)
+        # Frames whose three parts were all written
+        self.frames: int = min(
+            os.path.getsize(landmarks_path)
+            // (LANDMARKS_DTYPE.itemsize * frame_shape[0] * frame_shape[1]),
+            os.path.getsize(timestamps_path) // TIMESTAMPS_DTYPE.itemsize,
+            os.path.getsize(face_detected_path) // FACE_DETECTED_DTYPE.itemsize,
+        )
+        self.coordinates = self.memmap(
+            landmarks_path, LANDMARKS_DTYPE, (self.frames, *frame_shape)
+        )
+        self.timestamps = self.memmap(timestamps_path, TIMESTAMPS_DTYPE, (self.frames,))
+        self.face_detected = self.memmap(
+            face_detected_path, FACE_DETECTED_DTYPE, (self.frames,)
+        )
+
+    def memmap(self, path: str, dtype, shape):
+        """
+        Memory-maps a recording file read-only.
+
+        Args:
+        - path (str): Path of the file.
+        - dtype: NumPy dtype of the file.
+        - shape (tuple): Shape of the array to map.
+
+        Returns:
+        - array (numpy.ndarray): The memory-mapped array, an empty array for an empty recording.
+
+        Notes:
+        - np.memmap cannot map zero bytes, hence the empty array.
+        """
+        if shape[0] == 0:
+            return np.zeros(shape, dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+    def __len__(self) -> int:
+        return self.frames
+
+
+def is_recording(path: str) -> bool:
+    """
+    Checks if a path is a landmark recording directory.
+
+    Args:
+    - path (str): Path to check.
+
+    Returns:
+    - is_recording (bool): True if the path holds a landmark recording, False otherwise.
+    """
+    return os.path.isfile(os.path.join(path, META_FILE_NAME))
@@ -0,0 +1,141 @@
+# Landmark utility functions
+
+import numpy as np
+
+import mesh_indices
+
+# Number of landmarks in a MediaPipe FaceMesh face
+NUM_LANDMARKS = 468
+
+# Precomputed index arrays, so that eye and mouth subsets
+# are a single fancy-index gather on the landmarks array
+LEFT_EYE = np.array(mesh_indices.left_eye, dtype=np.intp)
+RIGHT_EYE = np.array(mesh_indices.right_eye, dtype=np.intp)
+MOUTH = np.array(mesh_indices.mouth, dtype=np.intp)
+EYES = np.stack((LEFT_EYE, RIGHT_EYE))
+
+
+class LandmarkExtractor:
+    def __init__(self, num_landmarks: int = NUM_LANDMARKS) -> None:
+        """
+        Initializes the LandmarkExtractor object.
+
+        Args:
+        - num_landmarks (int): Number of landmarks per face.
+
+        Attributes:
+        - num_landmarks (int): Number of landmarks per face.
+        - normalized_coordinates (numpy.ndarray): Preallocated (num_landmarks, 2) float array holding
+                                                  the normalized landmark coordinates of the last frame.
+        - mesh_coordinates (numpy.ndarray): Preallocated (num_landmarks, 2) int array holding
+                                            the pixel landmark coordinates of the last frame.
+        """
+        self.num_landmarks: int = num_landmarks
+        self.normalized_coordinates = np.zeros((num_landmarks, 2), dtype=np.float64)
+        self.mesh_coordinates = np.zeros((num_landmarks, 2), dtype=np.int32)
+
+    def extract(
+        self, results, image_width: int, image_height: int, face_index: int = 0
+    ):
+        """
+        Converts the FaceMesh results of a frame into pixel coordinates.
+
+        Args:
+        - results: The facial landmark detection results from the Mediapipe library.
+        - image_width (int): Width of the processed frame in pixels.
+        - image_height (int): Height of the processed frame in pixels.
+        - face_index (int): Index of the face in results.multi_face_landmarks.
+
+        Returns:
+        - mesh_coordinates (numpy.ndarray): (num_landmarks, 2) int array of (x, y) pixel coordinates,
+                                            or None if no face was detected.
+
+        Notes:
+        - The returned array is reused across frames, copy it if it must outlive the next call.
+        """
+        if not results.multi_face_landmarks:
+            return None
+        landmark = results.multi_face_landmarks[face_index].landmark
+        self.normalized_coordinates.reshape(-1)[:] = np.fromiter(
+            (value for point in landmark for value in (point.x, point.y)),
+            dtype=np.float64,
+            count=2 * self.num_landmarks,
+        )
+        return self.from_normalized(
+            self.normalized_coordinates, image_width, image_height
+        )
+
+    def from_normalized(
+        self, normalized_coordinates, image_width: int, image_height: int
+    ):
+        """
+        Converts normalized (x, y) landmark coordinates into pixel coordinates.
+
+        Args:
+        - normalized_coordinates (numpy.ndarray): (num_landmarks, 2) array of coordinates in the [0, 1] range.
+        - image_width (int): Width of the processed frame in pixels.
+        - image_height (int): Height of the processed frame in pixels.
+
+        Returns:
+        - mesh_coordinates (numpy.ndarray): (num_landmarks, 2) int array of (x, y) pixel coordinates.
+        """
+        # Casting truncates towards zero, same as int() did per point
+        np.multiply(
+            normalized_coordinates,
+            (image_width, image_height),
+            out=self.mesh_coordinates,
+            casting="unsafe",
+        )
+        return self.mesh_coordinates
+
+
+def left_eye(mesh_coordinates):
+    """
+    Gathers the left eye landmarks, in mesh_indices.left_eye order.
+
+    Args:
+    - mesh_coordinates (numpy.ndarray): (..., 468, 2) array of landmark coordinates.
+
+    Returns:
+    - eye_mesh_coordinates (numpy.ndarray): (..., 16, 2) array of left eye landmark coordinates.
+    """
+    return mesh_coordinates[..., LEFT_EYE, :]
+
+
+def right_eye(mesh_coordinates):
+    """
+    Gathers the right eye landmarks, in mesh_indices.right_eye order.
+
+    Args:
+    - mesh_coordinates (numpy.ndarray): (..., 468, 2) array of landmark coordinates.
+
+    Returns:
+    - eye_mesh_coordinates (numpy.ndarray): (..., 16, 2) array of right eye landmark coordinates.
+    """
+    return mesh_coordinates[..., RIGHT_EYE, :]
+
+
+def eyes(mesh_coordinates):
+    """
+    Gathers the left and right eye landmarks in one go.
+
+    Args:
+    - mesh_coordinates (numpy.ndarray): (..., 468, 2) array of landmark coordinates.
+
+    Returns:
+    - eyes_mesh_coordinates (numpy.ndarray): (..., 2, 16, 2) array of (left, right) eye landmark coordinates.
+    """
+    return mesh_coordinates[..., EYES, :]
+
+
+def mouth(mesh_coordinates):
+    """
+    Gathers the mouth landmarks, in mesh_indices.mouth order.
+
+    Args:
+    - mesh_coordinates (numpy.ndarray): (..., 468, 2) array of landmark coordinates.
+
+    Returns:
+    - mouth_mesh_coordinates (numpy.ndarray): (..., 20, 2) array of mouth landmark coordinates.
+    """
+    return mesh_coordinates[..., MOUTH, :]
@@ -1,27 +1,33 @@
 import tkinter as tk
 from tkinter import ttk
 import sv_ttk
-import tomli
 import cv2 as cv
-import mediapipe as mp
 import threading
 
 import colors
-import mesh_indices
-import ratio_utils
+import landmarks
+import landmark_detectors
+import detection_pipeline
+import inference_governor
+import initializer
+import staged_pipeline
+import video_stream
+import metrics
 import drawing_utils
+import alarm_audio
 import eyes_closed
 import yawn
 import fps
 import modified_eye_aspect_ratio_calibrator
-import configuration_writer
-
+import settings
+import config_watcher
 
 """
     Loading Config
 """
-config_file = open("config.toml", mode="rb")
-config = tomli.load(config_file)
+# Watched once the GUI is up, so that edits of config.toml reach the sliders and the processing
+config_file_watcher = config_watcher.ConfigWatcher("config.toml")
+config = config_file_watcher.config
 
 
 """
@@ -102,6 +108,364 @@ tk_var_eyes_closed = tk.IntVar(
 )
 tk_var_yawn = tk.IntVar(master=app_window, value=config["time_thresholds"]["yawn"])
 
+# Snapshot of the settings read by the processing worker thread, republished by the Tk thread
+# whenever one of these variables changes, so the worker never reads the variables itself
+settings_publisher = settings.SettingsPublisher(
+    {
+        "ratio_to_use": tk_var_ratio_to_use,
+        "deamonize": tk_var_deamonize_processing_thread,
+        "draw_resolution": tk_var_draw_resolution,
+        "draw_fps": tk_var_draw_fps,
+        "draw_face_landmarks": tk_var_draw_face_landmarks,
+        "draw_eye_landmarks": tk_var_draw_eye_landmarks,
+        "draw_mouth_landmarks": tk_var_draw_mouth_landmarks,
+        "eye_aspect_ratio_threshold": tk_var_eye_aspect_ratio,
+        "modified_eye_aspect_ratio_left_threshold": tk_var_modified_eye_aspect_ratio_left,
+        "modified_eye_aspect_ratio_right_threshold": tk_var_modified_eye_aspect_ratio_right,
+        "mouth_aspect_ratio_threshold": tk_var_mouth_aspect_ratio,
+        "show_eye_aspect_ratio": tk_var_draw_eye_aspect_ratio,
+        "show_mouth_aspect_ratio": tk_var_draw_mouth_aspect_ratio,
+        "eyes_closed_time_threshold": tk_var_eyes_closed,
+        "yawn_time_threshold": tk_var_yawn,
+    }
+)
+
+
+"""
+    Real Processing
+"""
+
+
+# Frames waiting between two stages of the processing
+STAGE_QUEUE_SIZE = 2
+
+quit_processing: bool = False
+
+
+def on_tk_thread(function):
+    # The calibrators call back from the worker thread, the Tk variables and widgets are only
+    # touched by the Tk thread, to which the calls are posted
+    def post(*args):
+        app_window.after(0, function, *args)
+
+    return post
+
+
+@on_tk_thread
+def update_calibrated_modified_eye_aspect_ratio_left(calibrated_m_ear):
+    tk_var_modified_eye_aspect_ratio_left.set(float("{:.2f}".format(calibrated_m_ear)))
+    ratios_frame_modified_aspect_frame_ratio_calibrate_button.state(["!disabled"])
+    print(
+        "[DEBUG] Calibrated: Modified Eye Aspect Ratio (Left Eye): {:.2f}".format(
+            calibrated_m_ear
+        )
+    )
+
+
+@on_tk_thread
+def live_update_calibration_left(calibration_value):
+    tk_var_modified_eye_aspect_ratio_left.set(float("{:.8f}".format(calibration_value)))
+
+
+@on_tk_thread
+def update_calibrated_modified_eye_aspect_ratio_right(calibrated_m_ear):
+    tk_var_modified_eye_aspect_ratio_right.set(float("{:.2f}".format(calibrated_m_ear)))
+    ratios_frame_modified_aspect_frame_ratio_calibrate_button.state(["!disabled"])
+    print(
+        "[DEBUG] Calibrated: Modified Eye Aspect Ratio (Right Eye): {:.2f}".format(
+            calibrated_m_ear
+        )
+    )
+
+
+@on_tk_thread
+def live_update_calibration_right(calibration_value):
+    tk_var_modified_eye_aspect_ratio_right.set(
+        float("{:.8f}".format(calibration_value))
+    )
+
+
+def process():
+    # Counters, gauges and histograms of the loop, exposed as set in [metrics] of config.toml
+    pipeline_metrics = metrics.Metrics()
+
+    # Per-stage timings (min/p50/p99), printed on exit
+    stage_timers = fps.StageTimers(metrics=pipeline_metrics)
+
+    # Loading and warming up the model, starting threaded video capture (keeping only the
+    # latest frame) and decoding the alarm sounds run at the same time, while the Tk thread
+    # builds the widgets
+    # Frames are read into pooled buffers: one queued, one being captured, and up to
+    # STAGE_QUEUE_SIZE waiting plus one being processed per stage (inference, decision, render)
+    startup = initializer.Initializer()
+    startup.add(
+        "detector",
+        landmark_detectors.MediaPipeLandmarkDetector.from_config,
+        config,
+        stage_timers=stage_timers,
+        warm_up=True,
+        cleanup=lambda detector: detector.close(),
+    )
+    startup.add(
+        "camera",
+        lambda: video_stream.VideoStream(
+            drop_policy="latest",
+            buffer_pool_size=2 + 3 * (STAGE_QUEUE_SIZE + 1),
+            stage_timers=stage_timers,
+        ).start(),
+        cleanup=video_stream.VideoStream.close,
+    )
+    startup.add("alarms", alarm_audio.AlarmAudioService)
+    initialized = startup.run()
+    print("[INFO] " + startup.report())
+    detector = initialized["detector"]
+    stream = initialized["camera"]
+
+    # Plays the alarm sounds off the processing thread
+    alarm_audio_service = initialized["alarms"].start()
+    current_settings = settings_publisher.settings
+    eyes_closed_alarm = eyes_closed.EyesClosed(
+        time_threshold=current_settings.eyes_closed_time_threshold,
+        alarm_audio_service=alarm_audio_service,
+    )
+    yawn_alarm = yawn.Yawn(
+        time_threshold=current_settings.yawn_time_threshold,
+        alarm_audio_service=alarm_audio_service,
+    )
+    max_num_faces = config["face_tracking"]["max_num_faces"]
+    pipeline = detection_pipeline.MultiFaceDetectionPipeline(
+        eyes_closed_alarm,
+        yawn_alarm,
+        *current_settings.eye_aspect_ratio_thresholds(),
+        current_settings.mouth_aspect_ratio_threshold,
+        max_faces=max_num_faces,
+        alarm_all_faces=config["face_tracking"]["alarm_all_faces"],
+    )
+
+    width = stream.width()
+    height = stream.height()
+    print(f"Video Resolution: ({width}, {height})")
+
+    # FPS Counter
+    frames_per_second = fps.FPS()
+    frames_per_second.start()
+
+    # HUD items of a frame, drawn in one pass before displaying it
+    hud = drawing_utils.HUDCompositor()
+
+    # Skips inference while every face is plainly awake
+    governor = inference_governor.InferenceGovernor.from_config(config)
+
+    # Inference and decisions (eyes open/closed and mouth yawning/normal of every face, feeding
+    # the alarms) run on their own threads, so a frame is inferred while the previous ones are
+    # decided and rendered here
+    stages = staged_pipeline.StagedPipeline(
+        stream,
+        detector,
+        pipeline,
+        governor,
+        queue_size=STAGE_QUEUE_SIZE,
+        stage_timers=stage_timers,
+        settings_source=settings_publisher,
+    ).start()
+
+    # Served from background threads, the loop only updates the stage timers
+    metrics.register_loop_collectors(
+        pipeline_metrics,
+        pipeline,
+        governor,
+        stream=stream,
+        frames_per_second=frames_per_second,
+        staged_pipeline=stages,
+    )
+    metrics_exporter = metrics.MetricsExporter.from_config(
+        pipeline_metrics, config
+    ).start()
+
+    # Whether the video window is open
+    window_shown = False
+
+    # Processing loop (render stage)
+    while not quit_processing:
+        result_read_successful, result = stages.read()
+        if not result_read_successful:
+            break
+        frame = result["frame"]
+        faces_coordinates = result["faces_coordinates"]
+        decisions = result["decisions"]
+
+        frames_per_second.update()
+
+        # Calculating FPS
+        frames_per_second.stop()
+        frames_per_second_value = frames_per_second.window_fps()
+
+        # Settings published by the GUI, one attribute load per frame
+        current_settings = settings_publisher.settings
+
+        stage_timers.start("overlay")
+        if len(decisions["face_ids"]):
+            # Face tracked the longest, the driver's usually
+            mesh_coordinates = faces_coordinates[decisions["coordinates_indices"][0]]
+
+            # Drawing landmarks
+            for coordinates_index in decisions["coordinates_indices"]:
+                drawing_utils.face_landmarks(
+                    frame,
+                    faces_coordinates[coordinates_index],
+                    face=current_settings.draw_face_landmarks,
+                    eye=current_settings.draw_eye_landmarks,
+                    mouth=current_settings.draw_mouth_landmarks,
+                )
+
+            # Calibrator updation
+            calibrator_left.update(
+                eye_mesh_coordinates=landmarks.left_eye(mesh_coordinates),
+                callback=update_calibrated_modified_eye_aspect_ratio_left,
+                live_update_callback=live_update_calibration_left,
+                show_update_logs=True,
+            )
+            calibrator_right.update(
+                eye_mesh_coordinates=landmarks.right_eye(mesh_coordinates),
+                callback=update_calibrated_modified_eye_aspect_ratio_right,
+                live_update_callback=live_update_calibration_right,
+                show_update_logs=True,
+            )
+
+            # Drawing Video Resolutiom
+            if current_settings.draw_resolution:
+                hud.text(f"Resolution: {width} x {height}", (width - 180, 0))
+
+            # Drawing FPS
+            if current_settings.draw_fps:
+                hud.text(f"FPS: {round(frames_per_second_value, 2)}", (width - 90, 23))
+
+            # Drawing ratios (of the face tracked the longest)
+            if current_settings.show_eye_aspect_ratio:
+                hud.text_with_background(
+                    f"(Left, Right) Eye Aspect Ratios: ({round(decisions['left_eye_aspect_ratio'][0],3)}, {round(decisions['right_eye_aspect_ratio'][0],3)})",
+                    (0, 0),
+                    text_color=colors.GREEN,
+                    background_color=colors.BLACK,
+                    background_opacity=0.8,
+                )
+            if current_settings.show_mouth_aspect_ratio:
+                hud.text_with_background(
+                    f"Mouth Aspect Ratio: {round(decisions['mouth_aspect_ratio'][0], 3)}",
+                    (0, 23),
+                    text_color=colors.GREEN,
+                    background_color=colors.BLACK,
+                    background_opacity=0.8,
+                )
+
+            # Drawing eyes and mouth states
+            if decisions["eyes_open"][0]:
+                hud.text_with_background(
+                    "Eyes: OPEN",
+                    (0, 46),
+                    text_color=colors.BLACK,
+                    background_color=colors.GREEN,
+                    background_opacity=0.8,
+                )
+            else:
+                hud.text_with_background(
+                    "Eyes: CLOSE",
+                    (0, 46),
+                    text_color=colors.WHITE,
+                    background_color=colors.RED,
+                    background_opacity=0.8,
+                )
+            if decisions["mouth_normal"][0]:
+                hud.text_with_background(
+                    "Mouth: NORMAL",
+                    (0, 69),
+                    text_color=colors.BLACK,
+                    background_color=colors.GREEN,
+                    background_opacity=0.8,
+                )
+            else:
+                hud.text_with_background(
+                    "Mouth: YAWNING",
+                    (0, 69),
+                    text_color=colors.WHITE,
+                    background_color=colors.RED,
+                    background_opacity=0.8,
+                )
+
+            # Labeling the faces, red while their alarm sounds
+            if max_num_faces > 1:
+                for i, face_id in enumerate(decisions["face_ids"]):
+                    face_x, face_y = faces_coordinates[
+                        decisions["coordinates_indices"][i]
+                    ].min(axis=0)
+                    alarming = (
+                        decisions["eyes_closed_alarming"][i]
+                        or decisions["yawn_alarming"][i]
+                    )
+                    hud.text_with_background(
+                        f"Face {face_id}",
+                        (int(face_x), max(int(face_y) - 23, 0)),
+                        text_color=colors.WHITE if alarming else colors.BLACK,
+                        background_color=colors.RED if alarming else colors.GREEN,
+                        background_opacity=0.8,
+                    )
+
+        if not current_settings.deamonize:
+            hud.compose(frame)
+            stage_timers.stop("overlay")
+            stage_timers.start("display")
+            cv.imshow("Drowsy Driver", frame)
+            cv.waitKey(1)
+            stage_timers.stop("display")
+            window_shown = True
+        else:
+            hud.clear()
+            stage_timers.stop("overlay")
+            # Only when daemonizing starts, not on every frame
+            if window_shown:
+                cv.destroyAllWindows()
+                window_shown = False
+        stages.release(result)
+
+    # Cleaning up resources used
+    cv.destroyAllWindows()
+    stages.stop()
+    stream.close()
+    detector.close()
+    metrics_exporter.stop()
+    alarm_audio_service.stop()
+    print(f"[INFO] Inference governor: {governor.stats()}")
+    print(
+        "[INFO] FPS: average {:.1f}, last {} frames {:.1f}, EWMA {:.1f}".format(
+            frames_per_second.fps(),
+            frames_per_second.window_size,
+            frames_per_second.window_fps(),
+            frames_per_second.ewma_fps(),
+        )
+    )
+    print("[INFO] Stage timings:\n" + stage_timers.report())
+
+
+def apply_reloaded_config(reloaded_config):
+    # On the Tk thread, the written variables are published as one snapshot
+    reloaded_settings = settings.Settings.from_config(reloaded_config)
+    with settings_publisher.hold():
+        for name, variable in settings_publisher.variables.items():
+            variable.set(getattr(reloaded_settings, name))
+    update_eyes_closed_label()
+    update_yawn_label()
+
+
+config_file_watcher.on_reload = lambda reloaded_config: app_window.after(
+    0, apply_reloaded_config, reloaded_config
+)
+# Started once the Tk loop runs, as on_reload posts to it
+app_window.after(0, config_file_watcher.start)
+
+# Started before the widgets are built, so the camera opens and the model loads meanwhile
+worker_thread = threading.Thread(target=process, args=(), daemon=True)
+worker_thread.start()
+
 
 """
     Initializing UI Widgets
@@ -185,7 +549,7 @@ ratios_frame_eye_aspect_frame = ttk.LabelFrame(
 )
 ratios_frame_eye_aspect_frame_ratio_scale = ttk.Scale(
     master=ratios_frame_eye_aspect_frame,
-    from_=0.0,
+    from_=config_watcher.MIN_RATIO_THRESHOLD,
     to=1.0,
     variable=tk_var_eye_aspect_ratio,
     length=400,
@@ -200,7 +564,7 @@ ratios_frame_mouth_aspect_frame = ttk.LabelFrame(
 )
 ratios_frame_mouth_aspect_frame_ratio_scale = ttk.Scale(
     master=ratios_frame_mouth_aspect_frame,
-    from_=0.0,
+    from_=config_watcher.MIN_RATIO_THRESHOLD,
     to=1.0,
     variable=tk_var_mouth_aspect_ratio,
     length=400,
@@ -230,7 +594,7 @@ ratios_frame_modified_eye_aspect_frame_right = ttk.Labelframe(
 )
 ratios_frame_modified_aspect_frame_left_ratio_scale = ttk.Scale(
     master=ratios_frame_modified_eye_aspect_frame_left,
-    from_=0.0,
+    from_=config_watcher.MIN_RATIO_THRESHOLD,
     to=1.0,
     variable=tk_var_modified_eye_aspect_ratio_left,
     length=300,
@@ -241,7 +605,7 @@ ratios_frame_modified_aspect_frame_left_ratio_label = ttk.Label(
 )
 ratios_frame_modified_aspect_frame_right_ratio_scale = ttk.Scale(
     master=ratios_frame_modified_eye_aspect_frame_right,
-    from_=0.0,
+    from_=config_watcher.MIN_RATIO_THRESHOLD,
     to=1.0,
     variable=tk_var_modified_eye_aspect_ratio_right,
     length=300,
@@ -311,9 +675,6 @@ def update_eyes_closed_label(*args):
     times_frame_eyes_closed_frame_label.configure(
         text="{:.0f}".format(tk_var_eyes_closed.get())
     )
-    eyes_closed_alarm.update_time_threshold(
-        int("{:.0f}".format(tk_var_eyes_closed.get()))
-    )
     print(
         "[DEBUG] Updated: EyesClosed time threshold: {:.0f}".format(
             tk_var_eyes_closed.get()
@@ -341,7 +702,6 @@ times_frame_yawn_frame = ttk.LabelFrame(
 
 def update_yawn_label(*args):
     times_frame_yawn_frame_label.configure(text="{:.0f}".format(tk_var_yawn.get()))
-    yawn_alarm.update_time_threshold(int("{:.0f}".format(tk_var_yawn.get())))
     print("[DEBUG] Updated: Yawn time threshold: {:.0f}".format(tk_var_yawn.get()))
 
 
@@ -369,7 +729,17 @@ deamonize_checkbutton = ttk.Checkbutton(
 )
 
 
+def clamped_ratio_threshold(tk_var) -> float:
+    # Calibration sets thresholds the sliders cannot, saved in the range config_watcher accepts
+    return min(max(tk_var.get(), config_watcher.MIN_RATIO_THRESHOLD), 1.0)
+
+
 def handle_save_button_click():
+    # Imported on the first save, not at startup
+    import configuration_writer
+
+    # Startup-only sections as last loaded, so edits of the file made meanwhile are kept
+    config = config_file_watcher.config
     config_writer = configuration_writer.ConfigurationWriter()
     config_writer.write(
         ratio_to_use=tk_var_ratio_to_use.get(),
@@ -379,14 +749,36 @@ def handle_save_button_click():
         draw_landmarks__face=tk_var_draw_face_landmarks.get(),
         draw_landmarks__eye=tk_var_draw_eye_landmarks.get(),
         draw_landmarks__mouth=tk_var_draw_mouth_landmarks.get(),
-        ratio_thresholds__eye_aspect_ratio=tk_var_eye_aspect_ratio.get(),
-        ratio_thresholds__modified_eye_aspect_ratio_left=tk_var_modified_eye_aspect_ratio_left.get(),
-        ratio_thresholds__modified_eye_aspect_ratio_right=tk_var_modified_eye_aspect_ratio_right.get(),
-        ratio_thresholds__mouth_aspect_ratio=tk_var_mouth_aspect_ratio.get(),
+        ratio_thresholds__eye_aspect_ratio=clamped_ratio_threshold(
+            tk_var_eye_aspect_ratio
+        ),
+        ratio_thresholds__modified_eye_aspect_ratio_left=clamped_ratio_threshold(
+            tk_var_modified_eye_aspect_ratio_left
+        ),
+        ratio_thresholds__modified_eye_aspect_ratio_right=clamped_ratio_threshold(
+            tk_var_modified_eye_aspect_ratio_right
+        ),
+        ratio_thresholds__mouth_aspect_ratio=clamped_ratio_threshold(
+            tk_var_mouth_aspect_ratio
+        ),
         time_thresholds__eyes_closed=tk_var_eyes_closed.get(),
         time_thresholds__yawn=tk_var_yawn.get(),
         show_ratios__eye_aspect_ratio=tk_var_draw_eye_aspect_ratio.get(),
         show_ratios__mouth_aspect_ratio=tk_var_draw_mouth_aspect_ratio.get(),
+        face_tracking__max_num_faces=config["face_tracking"]["max_num_faces"],
+        face_tracking__alarm_all_faces=config["face_tracking"]["alarm_all_faces"],
+        face_tracking__roi_inference=config["face_tracking"]["roi_inference"],
+        face_tracking__roi_padding=config["face_tracking"]["roi_padding"],
+        inference_governor__enabled=config["inference_governor"]["enabled"],
+        inference_governor__max_interval=config["inference_governor"]["max_interval"],
+        inference_governor__ratio_margin=config["inference_governor"]["ratio_margin"],
+        cameras__sources=config["cameras"]["sources"],
+        cameras__audio_cameras=config["cameras"]["audio_cameras"],
+        metrics__enabled=config["metrics"]["enabled"],
+        metrics__host=config["metrics"]["host"],
+        metrics__port=config["metrics"]["port"],
+        metrics__file_path=config["metrics"]["file_path"],
+        metrics__dump_interval=config["metrics"]["dump_interval"],
     )
 
 
@@ -400,287 +792,6 @@ deamonize_checkbutton.pack(side="right", anchor="e", padx=10, pady=10)
 sv_ttk.set_theme("dark")
 
 
-"""
-    Real Processing
-"""
-
-
-def landmarks_detection(
-    image, results, draw_detection_points=False, color=colors.GREEN
-):
-    image_height, image_width = image.shape[:2]
-    if results.multi_face_landmarks:
-        mesh_coordinates = [
-            (int(point.x * image_width), int(point.y * image_height))
-            for point in results.multi_face_landmarks[0].landmark
-        ]
-    else:
-        return None
-    if draw_detection_points:
-        for point in mesh_coordinates:
-            cv.circle(image, point, 2, color)
-    return mesh_coordinates
-
-
-quit_processing: bool = False
-eyes_closed_alarm = eyes_closed.EyesClosed(
-    time_threshold=tk_var_eyes_closed.get(),
-    alarm_wav_file_path="assets/audios/eyes_closed.wav",
-)
-yawn_alarm = yawn.Yawn(
-    time_threshold=tk_var_yawn.get(), alarm_wav_file_path="assets/audios/yawn.wav"
-)
-
-
-def update_calibrated_modified_eye_aspect_ratio_left(calibrated_m_ear):
-    tk_var_modified_eye_aspect_ratio_left.set(float("{:.2f}".format(calibrated_m_ear)))
-    ratios_frame_modified_aspect_frame_ratio_calibrate_button.state(["!disabled"])
-    print(
-        "[DEBUG] Calibrated: Modified Eye Aspect Ratio (Left Eye): {:.2f}".format(
-            calibrated_m_ear
-        )
-    )
-
-
-def live_update_calibration_left(calibration_value):
-    tk_var_modified_eye_aspect_ratio_left.set(float("{:.8f}".format(calibration_value)))
-
-
-def update_calibrated_modified_eye_aspect_ratio_right(calibrated_m_ear):
-    tk_var_modified_eye_aspect_ratio_right.set(float("{:.2f}".format(calibrated_m_ear)))
-    ratios_frame_modified_aspect_frame_ratio_calibrate_button.state(["!disabled"])
-    print(
-        "[DEBUG] Calibrated: Modified Eye Aspect Ratio (Right Eye): {:.2f}".format(
-            calibrated_m_ear
-        )
-    )
-
-
-def live_update_calibration_right(calibration_value):
-    tk_var_modified_eye_aspect_ratio_right.set(
-        float("{:.8f}".format(calibration_value))
-    )
-
-
-def process():
-    face_mesh = mp.solutions.face_mesh.FaceMesh(
-        min_detection_confidence=0.5, min_tracking_confidence=0.5
-    )
-
-    # Starting video capture
-    # Use threaded video capture (VideoStream) here for multithreading
-    camera = cv.VideoCapture(0)
-    width = int(camera.get(cv.CAP_PROP_FRAME_WIDTH))  # 3
-    height = int(camera.get(cv.CAP_PROP_FRAME_HEIGHT))  # 4
-    print(f"Video Resolution: ({width}, {height})")
-
-    # FPS Counter
-    frames_per_second = fps.FPS()
-    frames_per_second.start()
-
-    # Processing loop
-    while not quit_processing:
-        frame_read_successful, frame = camera.read()
-        if not frame_read_successful:
-            break
-
-        frames_per_second.update()
-
-        rgb_frame = cv.cvtColor(frame, cv.COLOR_BGR2RGB)
-        results = face_mesh.process(rgb_frame)
-        if results.multi_face_landmarks:
-            mesh_coordinates = landmarks_detection(
-                frame, results, draw_detection_points=False
-            )
-
-            # Drawing landmarks
-            if tk_var_draw_face_landmarks.get():
-                for point in mesh_coordinates:
-                    cv.circle(frame, point, 1, colors.CYAN, -1, cv.LINE_AA)
-            if tk_var_draw_eye_landmarks.get():
-                for index in mesh_indices.left_eye:
-                    cv.circle(
-                        frame, mesh_coordinates[index], 1, colors.GREEN, -1, cv.LINE_AA
-                    )
-                for index in mesh_indices.right_eye:
-                    cv.circle(
-                        frame, mesh_coordinates[index], 1, colors.GREEN, -1, cv.LINE_AA
-                    )
-            if tk_var_draw_mouth_landmarks.get():
-                for index in mesh_indices.mouth:
-                    cv.circle(
-                        frame,
-                        mesh_coordinates[index],
-                        1,
-                        colors.MAGNETA,
-                        -1,
-                        cv.LINE_AA,
-                    )
-
-            # Calibrator updation
-            calibrator_left.update(
-                eye_mesh_coordinates=[
-                    mesh_coordinates[index] for index in mesh_indices.left_eye
-                ],
-                callback=update_calibrated_modified_eye_aspect_ratio_left,
-                live_update_callback=live_update_calibration_left,
-                show_update_logs=True,
-            )
-            calibrator_right.update(
-                eye_mesh_coordinates=[
-                    mesh_coordinates[index] for index in mesh_indices.right_eye
-                ],
-                callback=update_calibrated_modified_eye_aspect_ratio_right,
-                live_update_callback=live_update_calibration_right,
-                show_update_logs=True,
-            )
-
-            # Calculating eye aspect ratios
-            left_eye_aspect_ratio = ratio_utils.eye_aspect_ratio(
-                [mesh_coordinates[index] for index in mesh_indices.left_eye]
-            )
-            right_eye_aspect_ratio = ratio_utils.eye_aspect_ratio(
-                [mesh_coordinates[index] for index in mesh_indices.right_eye]
-            )
-
-            # Calculating mouth aspect ratio
-            mouth_aspect_ratio = ratio_utils.mouth_aspect_ratio(
-                [mesh_coordinates[index] for index in mesh_indices.mouth]
-            )
-
-            # Calculating FPS
-            frames_per_second.stop()
-            frames_per_second_value = frames_per_second.fps()
-
-            # Drawing Video Resolutiom
-            if tk_var_draw_resolution.get():
-                frame = drawing_utils.text(
-                    frame, f"Resolution: {width} x {height}", (width - 180, 0)
-                )
-
-            # Drawing FPS
-            if tk_var_draw_fps.get():
-                frame = drawing_utils.text(
-                    frame, f"FPS: {round(frames_per_second_value, 2)}", (width - 90, 23)
-                )
-
-            # Drawing ratios
-            if tk_var_draw_eye_aspect_ratio.get():
-                frame = drawing_utils.text_with_background(
-                    frame,
-                    f"(Left, Right) Eye Aspect Ratios: ({round(left_eye_aspect_ratio,3)}, {round(right_eye_aspect_ratio,3)})",
-                    (0, 0),
-                    text_color=colors.GREEN,
-                    background_color=colors.BLACK,
-                    background_opacity=0.8,
-                )
-            if tk_var_mouth_aspect_ratio.get():
-                frame = drawing_utils.text_with_background(
-                    frame,
-                    f"Mouth Aspect Ratio: {round(mouth_aspect_ratio, 3)}",
-                    (0, 23),
-                    text_color=colors.GREEN,
-                    background_color=colors.BLACK,
-                    background_opacity=0.8,
-                )
-
-            # Deciding eyes open or closed
-            if tk_var_ratio_to_use.get() == "modified_eye_aspect_ratio":
-                if (
-                    left_eye_aspect_ratio >= tk_var_modified_eye_aspect_ratio_left.get()
-                    or right_eye_aspect_ratio
-                    >= tk_var_modified_eye_aspect_ratio_right.get()
-                ):
-                    frame = drawing_utils.text_with_background(
-                        frame,
-                        "Eyes: OPEN",
-                        (0, 46),
-                        text_color=colors.BLACK,
-                        background_color=colors.GREEN,
-                        background_opacity=0.8,
-                    )
-                    eyes_closed_alarm.add_bounded_frame(
-                        ok=True, fps=frames_per_second_value
-                    )
-                else:
-                    frame = drawing_utils.text_with_background(
-                        frame,
-                        "Eyes: CLOSE",
-                        (0, 46),
-                        text_color=colors.WHITE,
-                        background_color=colors.RED,
-                        background_opacity=0.8,
-                    )
-                    eyes_closed_alarm.add_bounded_frame(
-                        ok=False, fps=frames_per_second_value
-                    )
-            else:
-                if (
-                    left_eye_aspect_ratio >= tk_var_eye_aspect_ratio.get()
-                    or right_eye_aspect_ratio >= tk_var_eye_aspect_ratio.get()
-                ):
-                    frame = drawing_utils.text_with_background(
-                        frame,
-                        "Eyes: OPEN",
-                        (0, 46),
-                        text_color=colors.BLACK,
-                        background_color=colors.GREEN,
-                        background_opacity=0.8,
-                    )
-                    eyes_closed_alarm.add_bounded_frame(
-                        ok=True, fps=frames_per_second_value
-                    )
-                    # eyes_closed_alarm.reset()
-                else:
-                    frame = drawing_utils.text_with_background(
-                        frame,
-                        "Eyes: CLOSE",
-                        (0, 46),
-                        text_color=colors.WHITE,
-                        background_color=colors.RED,
-                        background_opacity=0.8,
-                    )
-                    eyes_closed_alarm.add_bounded_frame(
-                        ok=False, fps=frames_per_second_value
-                    )
-
-            # Deciding mouth yawning or normal
-            if mouth_aspect_ratio <= tk_var_mouth_aspect_ratio.get():
-                frame = drawing_utils.text_with_background(
-                    frame,
-                    "Mouth: NORMAL",
-                    (0, 69),
-                    text_color=colors.BLACK,
-                    background_color=colors.GREEN,
-                    background_opacity=0.8,
-                )
-                yawn_alarm.add_bounded_frame(ok=True, fps=frames_per_second_value)
-            else:
-                frame = drawing_utils.text_with_background(
-                    frame,
-                    "Mouth: YAWNING",
-                    (0, 69),
-                    text_color=colors.WHITE,
-                    background_color=colors.RED,
-                    background_opacity=0.8,
-                )
-                yawn_alarm.add_bounded_frame(ok=False, fps=frames_per_second_value)
-
-        if not tk_var_deamonize_processing_thread.get():
-            cv.imshow("Drowsy Driver", frame)
-            cv.waitKey(1)
-        else:
-            cv.destroyAllWindows()
-
-    # Cleaning up resources used
-    cv.destroyAllWindows()
-    camera.release()
-
-
-worker_thread = threading.Thread(target=process, args=(), daemon=True)
-worker_thread.start()
-
-
 def handle_window_close_event():
     quit_processing = True
     app_window.destroy()
@@ -0,0 +1,539 @@
+# Metrics Classes
+#
+# Counters, gauges and histograms of the processing loop, exposed in the
+# Prometheus text format by a local HTTP endpoint and/or a file dumped
+# periodically, both served from background threads. Updating a metric takes a
+# lock and a dict update, and what other objects already count (inference
+# governor, face tracker, alarms, VideoStream) is only read when the metrics are
+# scraped, through collectors, so the processing loop barely pays for them.
+#
+# Usage:
+#   metrics = Metrics()
+#   stage_timers = fps.StageTimers(metrics=metrics)
+#   register_loop_collectors(metrics, pipeline, governor)
+#   exporter = MetricsExporter.from_config(metrics, config).start()
+#   ...
+#   exporter.stop()
+#
+#   curl http://127.0.0.1:9108/metrics
+
+import bisect
+import os
+import threading
+
+# Upper bounds of the latency histogram buckets in seconds
+LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+)
+
+
+def format_labels(labels: tuple) -> str:
+    """
+    Formats labels for the Prometheus text format.
+
+    Args:
+    - labels (tuple): (name, value) pairs.
+
+    Returns:
+    - labels (str): e.g. '{stage="inference"}', empty without labels.
+    """
+    if not labels:
+        return ""
+    return (
+        "{"
+        + ",".join(
+            '{}="{}"'.format(
+                name,
+                str(value)
+                .replace("\\", "\\\\")
+                .replace('"', '\\"')
+                .replace("\n", "\\n"),
+            )
+            for name, value in labels
+        )
+        + "}"
+    )
+
+
+def format_value(value) -> str:
+    """
+    Formats a sample value for the Prometheus text format.
+
+    Args:
+    - value (int or float): The value, numpy scalars included.
+
+    Returns:
+    - value (str): The formatted value.
+    """
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metrics:
+    def __init__(
+        self, namespace: str = "drowsy_driver", buckets: tuple = LATENCY_BUCKETS
+    ) -> None:
+        """
+        Initializes the Metrics object.
+
+        Args:
+        - namespace (str): Prefix of the metric names.
+        - buckets (tuple): Sorted upper bounds of the histogram buckets.
+
+        Attributes:
+        - namespace (str): Prefix of the metric names.
+        - buckets (tuple): Sorted upper bounds of the histogram buckets.
+        - lock: Threading lock guarding the values, the loop updates them while the exporter reads them.
+        - types (dict): Metric name -> "counter", "gauge" or "histogram".
+        - helps (dict): Metric name -> help text.
+        - values (dict): Counter/gauge name -> dict of labels -> value.
+        - histograms (dict): Histogram name -> dict of labels -> [bucket counts, sum, count].
+        - collectors (dict): Metric name -> function returning its value (or a dict of labels -> value)
+                             when the metrics are rendered.
+        """
+        self.namespace: str = namespace
+        self.buckets: tuple = buckets
+        self.lock = threading.Lock()
+        self.types: dict = {}
+        self.helps: dict = {}
+        self.values: dict = {}
+        self.histograms: dict = {}
+        self.collectors: dict = {}
+
+    def describe(self, name: str, metric_type: str, help_text: str) -> None:
+        """
+        Declares the type and help text of a metric.
+
+        Args:
+        - name (str): Name of the metric, without the namespace.
+        - metric_type (str): "counter", "gauge" or "histogram".
+        - help_text (str): Description of the metric.
+
+        Returns:
+        None
+        """
+        with self.lock:
+            self.types[name] = metric_type
+            self.helps[name] = help_text
+
+    def inc(self, name: str, value: float = 1, labels: tuple = ()) -> None:
+        """
+        Increments a counter.
+
+        Args:
+        - name (str): Name of the counter.
+        - value (float): Amount to add.
+        - labels (tuple): (name, value) pairs of the labels.
+
+        Returns:
+        None
+        """
+        with self.lock:
+            samples = self.values.setdefault(name, {})
+            samples[labels] = samples.get(labels, 0) + value
+
+    def set(self, name: str, value: float, labels: tuple = ()) -> None:
+        """
+        Sets a gauge.
+
+        Args:
+        - name (str): Name of the gauge.
+        - value (float): The value.
+        - labels (tuple): (name, value) pairs of the labels.
+
+        Returns:
+        None
+        """
+        with self.lock:
+            self.values.setdefault(name, {})[labels] = value
+
+    def observe(self, name: str, value: float, labels: tuple = ()) -> None:
+        """
+        Records an observation (e.g. a duration in seconds) in a histogram.
+
+        Args:
+        - name (str): Name of the histogram.
+        - value (float): The observed value.
+        - labels (tuple): (name, value) pairs of the labels.
+
+        Returns:
+        None
+        """
+        bucket = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            samples = self.histograms.setdefault(name, {})
+            histogram = samples.get(labels)
+            if histogram is None:
+                histogram = samples[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            histogram[0][bucket] += 1
+            histogram[1] += value
+            histogram[2] += 1
+
+    def collect(self, name: str, metric_type: str, help_text: str, function) -> None:
+        """
+        Registers a metric whose value is read when the metrics are rendered.
+
+        Args:
+        - name (str): Name of the metric.
+        - metric_type (str): "counter" or "gauge".
+        - help_text (str): Description of the metric.
+        - function: Function without arguments returning the value, or a dict of labels -> value.
+
+        Returns:
+        None
+        """
+        self.describe(name, metric_type, help_text)
+        with self.lock:
+            self.collectors[name] = function
+
+    def render(self) -> str:
+        """
+        Renders all the metrics in the Prometheus text exposition format (version 0.0.4).
+
+        Returns:
+        - text (str): The rendered metrics.
+        """
+        with self.lock:
+            types = dict(self.types)
+            helps = dict(self.helps)
+            values = {name: dict(samples) for name, samples in self.values.items()}
+            histograms = {
+                name: {
+                    labels: (list(histogram[0]), histogram[1], histogram[2])
+                    for labels, histogram in samples.items()
+                }
+                for name, samples in self.histograms.items()
+            }
+            collectors = dict(self.collectors)
+        # Collectors read other objects, outside the lock
+        for name, function in collectors.items():
+            collected = function()
+            if collected is None:
+                continue
+            values[name] = collected if isinstance(collected, dict) else {(): collected}
+
+        lines = []
+        for name in sorted(set(values) | set(histograms)):
+            full_name = f"{self.namespace}_{name}"
+            if name in helps:
+                lines.append(f"# HELP {full_name} {helps[name]}")
+            metric_type = types.get(
+                name, "histogram" if name in histograms else "gauge"
+            )
+            lines.append(f"# TYPE {full_name} {metric_type}")
+            for labels, value in values.get(name, {}).items():
+                lines.append(
+                    f"{full_name}{format_labels(labels)} {format_value(value)}"
+                )
+            for labels, (bucket_counts, total, count) in histograms.get(
+                name, {}
+            ).items():
+                cumulative_count = 0
+                for upper_bound, bucket_count in zip(
+                    self.buckets + ("+Inf",), bucket_counts
+                ):
+                    cumulative_count += bucket_count
+                    lines.append(
+                        "{}_bucket{} {}".format(
+                            full_name,
+                            format_labels(labels + (("le", upper_bound),)),
+                            cumulative_count,
+                        )
+                    )
+                lines.append(f"{full_name}_sum{format_labels(labels)} {repr(total)}")
+                lines.append(f"{full_name}_count{format_labels(labels)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+def register_loop_collectors(
+    metrics: Metrics,
+    pipeline,
+    governor,
+    stream=None,
+    frames_per_second=None,
+    staged_pipeline=None,
+) -> None:
+    """
+    Registers the collectors of the counters a processing loop already keeps.
+
+    Args:
+    - metrics (Metrics): The metrics to register the collectors in.
+    - pipeline (MultiFaceDetectionPipeline): Pipeline of the loop, for the tracked and lost faces and the alarms.
+    - governor (InferenceGovernor): Inference governor of the loop, for the inferred and skipped frames.
+    - stream (VideoStream): Threaded capture of the loop, for the captured and dropped frames and
+                            its queue depth, None if the loop reads the camera itself.
+    - frames_per_second (FPS): FPS counter of the loop, None to not export the frame rate.
+    - staged_pipeline (StagedPipeline): Stages of the loop, for the depths of their queues, None if the
+                                        loop is not staged.
+
+    Returns:
+    None
+    """
+    if stream is None:
+        # Every frame read is given to the governor
+        metrics.collect(
+            "frames_captured_total",
+            "counter",
+            "Frames captured from the camera.",
+            lambda: governor.frames,
+        )
+    else:
+        metrics.collect(
+            "frames_captured_total",
+            "counter",
+            "Frames captured from the camera.",
+            lambda: stream.stats()["frames_captured"],
+        )
+        metrics.collect(
+            "frames_dropped_total",
+            "counter",
+            "Captured frames dropped before being processed.",
+            lambda: stream.stats()["frames_dropped"],
+        )
+    if staged_pipeline is not None:
+        metrics.collect(
+            "queue_depth",
+            "gauge",
+            "Frames waiting in the queues, per stage they wait for.",
+            lambda: {
+                (("queue", stage),): depth
+                for stage, depth in staged_pipeline.queue_depths().items()
+            },
+        )
+    elif stream is not None:
+        metrics.collect(
+            "queue_depth",
+            "gauge",
+            "Frames waiting in the queues.",
+            lambda: {(("queue", "capture"),): stream.stats()["queue_depth"]},
+        )
+    metrics.collect(
+        "frames_inferred_total",
+        "counter",
+        "Frames the landmark detector ran on.",
+        lambda: governor.inferred_frames,
+    )
+    metrics.collect(
+        "frames_skipped_total",
+        "counter",
+        "Frames that reused the landmarks of the last inferred frame.",
+        lambda: governor.skipped_frames,
+    )
+    metrics.collect(
+        "inference_interval_frames",
+        "gauge",
+        "Current number of frames between two inferences.",
+        lambda: governor.interval,
+    )
+    metrics.collect(
+        "faces_tracked",
+        "gauge",
+        "Faces currently tracked.",
+        lambda: int((pipeline.face_tracker.track_ids >= 0).sum()),
+    )
+    metrics.collect(
+        "faces_lost_total",
+        "counter",
+        "Face tracks dropped after missing their face for too long.",
+        lambda: pipeline.face_tracker.tracks_lost,
+    )
+    metrics.collect(
+        "alarms_fired_total",
+        "counter",
+        "Alarms started, per alarm.",
+        lambda: {
+            (
+                ("alarm", "eyes_closed"),
+            ): pipeline.eyes_closed_alarms.alarms_started_total,
+            (("alarm", "yawn"),): pipeline.yawn_alarms.alarms_started_total,
+        },
+    )
+    if frames_per_second is not None:
+        metrics.collect(
+            "frames_per_second",
+            "gauge",
+            "Frame rate over the last frames.",
+            frames_per_second.window_fps,
+        )
+
+
+def metrics_request_handler_class():
+    """
+    Creates the request handler class of the HTTP endpoint, importing http.server (tens of
+    milliseconds) only when an endpoint is started, so that startup does not pay for it.
+
+    Returns:
+    - handler_class: BaseHTTPRequestHandler subclass serving the metrics of the server's Metrics object.
+    """
+    import http.server
+
+    class MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+        """
+        Serves the metrics of the server's Metrics object on GET /metrics.
+        """
+
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            body = self.server.metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args) -> None:
+            # Scrapes are not worth a line on the console
+            pass
+
+    return MetricsRequestHandler
+
+
+class MetricsExporter:
+    def __init__(
+        self,
+        metrics: Metrics,
+        host: str = "127.0.0.1",
+        port: int = None,
+        file_path: str = None,
+        dump_interval: float = 10.0,
+    ) -> None:
+        """
+        Initializes the MetricsExporter object.
+
+        Args:
+        - metrics (Metrics): The metrics to expose.
+        - host (str): Address the HTTP endpoint listens on, local only by default.
+        - port (int): Port of the HTTP endpoint, None for no endpoint.
+        - file_path (str): File the metrics are dumped to every dump_interval seconds, None for no dump.
+        - dump_interval (float): Seconds between two dumps.
+
+        Attributes:
+        - metrics (Metrics): The metrics to expose.
+        - host (str): Address the HTTP endpoint listens on.
+        - port (int): Port of the HTTP endpoint, None for no endpoint.
+        - file_path (str): File the metrics are dumped to, None for no dump.
+        - dump_interval (float): Seconds between two dumps.
+        - server: ThreadingHTTPServer of the endpoint, None if not started.
+        - threads (list): Threads of the endpoint and the file dump.
+        - stop_event: Threading event set to stop the file dump.
+        """
+        self.metrics: Metrics = metrics
+        self.host: str = host
+        self.port: int = port
+        self.file_path: str = file_path
+        self.dump_interval: float = dump_interval
+        self.server = None
+        self.threads: list = []
+        self.stop_event = threading.Event()
+
+    @classmethod
+    def from_config(cls, metrics: Metrics, config: dict):
+        """
+        Creates a MetricsExporter with the settings of config.toml.
+
+        Args:
+        - metrics (Metrics): The metrics to expose.
+        - config (dict): Loaded config.toml.
+
+        Returns:
+        - exporter (MetricsExporter): The created exporter, exporting nothing if disabled.
+        """
+        settings = config["metrics"]
+        if not settings["enabled"]:
+            return cls(metrics)
+        return cls(
+            metrics,
+            host=settings["host"],
+            port=settings["port"],
+            file_path=settings["file_path"] or None,
+            dump_interval=settings["dump_interval"],
+        )
+
+    def start(self):
+        """
+        Starts the HTTP endpoint and the file dump threads.
+
+        Returns:
+        - self (MetricsExporter): The started exporter.
+        """
+        if self.port is not None:
+            import http.server
+
+            self.server = http.server.ThreadingHTTPServer(
+                (self.host, self.port), metrics_request_handler_class()
+            )
+            self.server.daemon_threads = True
+            self.server.metrics = self.metrics
+            self.threads.append(
+                threading.Thread(
+                    target=self.server.serve_forever, name="metrics-http", daemon=True
+                )
+            )
+            print(
+                "[INFO] Serving metrics on http://{}:{}/metrics".format(
+                    self.host, self.server.server_address[1]
+                )
+            )
+        if self.file_path is not None:
+            self.threads.append(
+                threading.Thread(
+                    target=self.dump_loop, name="metrics-file", daemon=True
+                )
+            )
+            print(f"[INFO] Dumping metrics to {self.file_path}")
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def dump_loop(self) -> None:
+        """
+        Dumps the metrics to the file every dump_interval seconds until stopped.
+
+        Returns:
+        None
+        """
+        while not self.stop_event.wait(self.dump_interval):
+            self.dump()
+
+    def dump(self) -> None:
+        """
+        Writes the metrics to the file, replacing it at once so readers never see a partial dump.
+
+        Returns:
+        None
+        """
+        temporary_file_path = self.file_path + ".tmp"
+        with open(temporary_file_path, mode="w") as metrics_file:
+            metrics_file.write(self.metrics.render())
+        os.replace(temporary_file_path, self.file_path)
+
+    def stop(self) -> None:
+        """
+        Stops the HTTP endpoint and the file dump, dumping the metrics a last time.
+
+        Returns:
+        None
+        """
+        self.stop_event.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        if self.file_path is not None:
+            self.dump()
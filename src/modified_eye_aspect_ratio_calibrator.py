@@ -1,6 +1,24 @@
-import math
+# ModifiedEyeAspectRatioCalibrator Class
+#
+# Calibrates the modified eye aspect ratio threshold from the 8 eye distances
+# (width, then 7 heights) of the frames of the calibration: the closed eye ratio
+# uses the LOW_QUANTILE of the heights over the HIGH_QUANTILE of the width, the
+# open eye ratio the HIGH_QUANTILE of the heights over the LOW_QUANTILE of the
+# width. Quantiles are estimated while streaming (see QuantileEstimatorArray),
+# so a few mis-detected frames do not skew the threshold as minimums and
+# maximums did.
+
 import time
+import numpy as np
 import ratio_utils
+from quantile_estimator import QuantileEstimatorArray
+
+# Quantiles of the distances taken for the closed and open eye
+LOW_QUANTILE = 0.05
+HIGH_QUANTILE = 0.95
+
+# Number of eye distances: width, then 7 heights
+NUM_DISTANCES = 8
 
 
 class ModifiedEyeAspectRatioCalibrator:
@@ -12,35 +30,22 @@ class ModifiedEyeAspectRatioCalibrator:
         - calibrating (bool): Flag indicating if calibration is in progress.
         - calibration_time (int): Duration of the calibration process in seconds.
         - calibration_start_time (float): Time when calibration started.
-        - min_width (float): Minimum horizontal distance between eye landmarks.
-        - max_width (float): Maximum horizontal distance between eye landmarks.
-        - min_height1 to min_height7 (float): Minimum vertical distances between eye landmarks.
-        - max_height1 to max_height7 (float): Maximum vertical distances between eye landmarks.
+        - distance_quantiles (QuantileEstimatorArray): Estimators of the LOW_QUANTILE (first row) and
+                                                       HIGH_QUANTILE (second row) of the 8 eye distances.
         """
         self.calibrating: bool = False
         self.calibration_time: int = 7
         self.calibration_start_time: float = 0
-        self.min_width: float = math.inf
-        self.max_width: float = -math.inf
-        self.min_height1: float = math.inf
-        self.max_height1: float = -math.inf
-        self.min_height2: float = math.inf
-        self.max_height2: float = -math.inf
-        self.min_height3: float = math.inf
-        self.max_height3: float = -math.inf
-        self.min_height4: float = math.inf
-        self.max_height4: float = -math.inf
-        self.min_height5: float = math.inf
-        self.max_height5: float = -math.inf
-        self.min_height6: float = math.inf
-        self.max_height6: float = -math.inf
-        self.min_height7: float = math.inf
-        self.max_height7: float = -math.inf
+        self.distance_quantiles = QuantileEstimatorArray(
+            np.repeat([[LOW_QUANTILE], [HIGH_QUANTILE]], NUM_DISTANCES, axis=1)
+        )
 
     def start_calibration(self) -> None:
         """
-        Starts the calibration process by setting the calibration flag and start time.
+        Starts the calibration process by setting the calibration flag and start time,
+        forgetting the distances of previous calibrations.
         """
+        self.reset_quantiles()
         self.calibrating = True
         self.calibration_start_time = time.perf_counter()
 
@@ -90,36 +95,18 @@ class ModifiedEyeAspectRatioCalibrator:
                 if callback:
                     callback(self.get_calibrated_ratio())
                 return
-            width = ratio_utils.eye_landmarks_horizontal_distance(eye_mesh_coordinates)
-            height1 = ratio_utils.eye_landmarks_vertical_distance1(eye_mesh_coordinates)
-            height2 = ratio_utils.eye_landmarks_vertical_distance2(eye_mesh_coordinates)
-            height3 = ratio_utils.eye_landmarks_vertical_distance3(eye_mesh_coordinates)
-            height4 = ratio_utils.eye_landmarks_vertical_distance4(eye_mesh_coordinates)
-            height5 = ratio_utils.eye_landmarks_vertical_distance5(eye_mesh_coordinates)
-            height6 = ratio_utils.eye_landmarks_vertical_distance6(eye_mesh_coordinates)
-            height7 = ratio_utils.eye_landmarks_vertical_distance7(eye_mesh_coordinates)
-            self.min_width = min(self.min_width, width)
-            self.max_width = max(self.max_width, width)
-            self.min_height1 = min(self.min_height1, height1)
-            self.max_height1 = max(self.max_height1, height1)
-            self.min_height2 = min(self.min_height2, height2)
-            self.max_height2 = max(self.max_height2, height2)
-            self.min_height3 = min(self.min_height3, height3)
-            self.max_height3 = max(self.max_height3, height3)
-            self.min_height4 = min(self.min_height4, height4)
-            self.max_height4 = max(self.max_height4, height4)
-            self.min_height5 = min(self.min_height5, height5)
-            self.max_height5 = max(self.max_height5, height5)
-            self.min_height6 = min(self.min_height6, height6)
-            self.max_height6 = max(self.max_height6, height6)
-            self.min_height7 = min(self.min_height7, height7)
-            self.max_height7 = max(self.max_height7, height7)
+            self.distance_quantiles.add(
+                ratio_utils.pair_distances(eye_mesh_coordinates)
+            )
+            if not (live_update_callback or show_update_logs):
+                return
+            calibrated_ratio = self.get_calibrated_ratio()
             if live_update_callback:
-                live_update_callback(self.get_calibrated_ratio())
+                live_update_callback(calibrated_ratio)
             if show_update_logs:
                 print(
                     "[LOG] Updated Calibration: Modified Eye Aspect Ratio: {:.5f}".format(
-                        self.get_calibrated_ratio()
+                        calibrated_ratio
                     )
                 )
 
@@ -152,45 +139,15 @@ class ModifiedEyeAspectRatioCalibrator:
         Calculates the calibrated eye aspect ratio based on the calibration results.
 
         Returns:
-        - calibrated_ratio (float): Calibrated eye aspect ratio.
-        """
-        ear_closed = (
-            self.min_height1
-            + self.min_height2
-            + self.min_height3
-            + self.min_height4
-            + self.min_height5
-            + self.min_height6
-            + self.min_height7
-        ) / (7 * self.max_width)
-        ear_open = (
-            self.max_height1
-            + self.max_height2
-            + self.max_height3
-            + self.max_height4
-            + self.max_height5
-            + self.max_height6
-            + self.max_height7
-        ) / (7 * self.min_width)
+        - calibrated_ratio (float): Calibrated eye aspect ratio, NaN before any frame.
+        """
+        low, high = self.distance_quantiles.estimates().tolist()
+        ear_closed = sum(low[1:]) / (7 * high[0])
+        ear_open = sum(high[1:]) / (7 * low[0])
         return (ear_closed + ear_open) / 2
 
-    def reset_min_max_values(self) -> None:
-        """
-        Resets the minimum and maximum values used during calibration.
-        """
-        self.min_width: float = math.inf
-        self.max_width: float = -math.inf
-        self.min_height1: float = math.inf
-        self.max_height1: float = -math.inf
-        self.min_height2: float = math.inf
-        self.max_height2: float = -math.inf
-        self.min_height3: float = math.inf
-        self.max_height3: float = -math.inf
-        self.min_height4: float = math.inf
-        self.max_height4: float = -math.inf
-        self.min_height5: float = math.inf
-        self.max_height5: float = -math.inf
-        self.min_height6: float = math.inf
-        self.max_height6: float = -math.inf
-        self.min_height7: float = math.inf
-        self.max_height7: float = -math.inf
+    def reset_quantiles(self) -> None:
+        """
+        Resets the distance quantiles estimated during calibration.
+        """
+        self.distance_quantiles.reset()
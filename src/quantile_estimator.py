@@ -0,0 +1,165 @@
+# QuantileEstimatorArray Class
+#
+# Estimates quantiles of streams of values without keeping the values, with the
+# P² algorithm (Jain & Chlamtac, 1985): every stream keeps 5 markers whose
+# heights approximate its minimum, p/2, p, (1+p)/2 quantiles and maximum, and
+# adjusts them with a piecewise-parabolic interpolation on every value. Memory
+# and time per value are constant, whatever the number of values. Like
+# AlarmWindowArray, the streams are the elements of arrays, all updated at once.
+#
+# The 3 middle markers of all the streams are adjusted together from the marker
+# state before the value, instead of one after the other: a marker waits one
+# more value where the move of its lower neighbour would otherwise take its
+# place. This keeps a value to a few array operations, whatever the number of
+# streams. Values far out of the middle markers are clipped first, so that a
+# single outlier does not drag the estimates as it would in plain P².
+
+import math
+import numpy as np
+
+# Number of markers of a stream
+NUM_MARKERS = 5
+
+
+class QuantileEstimatorArray:
+    def __init__(self, quantiles) -> None:
+        """
+        Initializes the QuantileEstimatorArray object.
+
+        Args:
+        - quantiles (numpy.ndarray): Quantile estimated for each stream, in (0, 1), of any shape
+                                     (e.g. (2, 8) for 2 quantiles of 8 streams of values).
+
+        Attributes:
+        - quantiles (numpy.ndarray): Quantile estimated for each stream.
+        - count (int): Number of values added to every stream.
+        - heights (numpy.ndarray): (5, *quantiles.shape) heights of the markers of every stream, the
+                                   first values as they came until 5 values were added.
+        - positions (numpy.ndarray): (5, *quantiles.shape) positions of the markers, 0 being the first value.
+        - desired_positions (numpy.ndarray): (5, *quantiles.shape) positions the markers should be at.
+        - desired_position_increments (numpy.ndarray): (5, *quantiles.shape) increments of the desired
+                                                       positions per value.
+        """
+        self.quantiles = np.asarray(quantiles, dtype=np.float64)
+        shape = (NUM_MARKERS,) + self.quantiles.shape
+        self.count: int = 0
+        self.heights = np.zeros(shape, dtype=np.float64)
+        self.positions = np.zeros(shape, dtype=np.float64)
+        self.desired_positions = np.zeros(shape, dtype=np.float64)
+        self.desired_position_increments = np.stack(
+            (
+                np.zeros_like(self.quantiles),
+                self.quantiles / 2,
+                self.quantiles,
+                (1 + self.quantiles) / 2,
+                np.ones_like(self.quantiles),
+            )
+        )
+        self.reset()
+
+    def add(self, values) -> None:
+        """
+        Adds a value to every stream.
+
+        Args:
+        - values (numpy.ndarray): Value of each stream, broadcastable to the shape of quantiles
+                                  (e.g. (8,) values for quantiles of shape (2, 8)).
+
+        Returns:
+        None
+        """
+        if self.count < NUM_MARKERS:
+            self.heights[self.count] = values
+            self.count += 1
+            if self.count == NUM_MARKERS:
+                self.heights.sort(axis=0)
+            return
+        self.count += 1
+        heights = self.heights
+        positions = self.positions
+        # Values beyond the middle markers by more than their spread are clipped, which keeps the
+        # order of the values and so the positions, but keeps a single outlier from becoming the
+        # extreme marker the middle markers are interpolated towards
+        spread = heights[3] - heights[1]
+        values = np.minimum(
+            np.maximum(values, heights[1] - spread), heights[3] + spread
+        )
+        # Extreme markers follow the minimum and maximum
+        np.minimum(heights[0], values, out=heights[0])
+        np.maximum(heights[4], values, out=heights[4])
+        # Markers above the value move one position up, the last one always
+        positions[1:4] += values < heights[1:4]
+        positions[4] += 1
+        self.desired_positions += self.desired_position_increments
+        self.adjust()
+
+    def adjust(self) -> None:
+        """
+        Moves the middle markers of the streams by one position where they are off their desired
+        position by one or more, updating their heights by parabolic (or, if out of order, linear)
+        interpolation.
+
+        Returns:
+        None
+        """
+        heights = self.heights
+        positions = self.positions
+        offset = self.desired_positions[1:4] - positions[1:4]
+        gaps = positions[1:] - positions[:-1]
+        gap_below, gap_above = gaps[0:3], gaps[1:4]
+        move_up = (offset >= 1) & (gap_above > 1)
+        # A marker does not move down onto the place its lower neighbour moves up to
+        free_below = gap_below.copy()
+        free_below[1:] -= move_up[:-1]
+        direction = np.subtract(
+            move_up, (offset <= -1) & (free_below > 1), dtype=np.float64
+        )
+        if not direction.any():
+            return
+        middle = heights[1:4]
+        slopes = (heights[1:] - heights[:-1]) / gaps
+        slope_below, slope_above = slopes[0:3], slopes[1:4]
+        parabolic = middle + direction / (gap_above + gap_below) * (
+            (gap_below + direction) * slope_above
+            + (gap_above - direction) * slope_below
+        )
+        linear = middle + direction * np.where(move_up, slope_above, slope_below)
+        in_order = (heights[0:3] < parabolic) & (parabolic < heights[2:5])
+        # Markers not moving have a direction of 0, both interpolations keep their height
+        heights[1:4] = np.where(in_order, parabolic, linear)
+        positions[1:4] += direction
+
+    def estimates(self):
+        """
+        Returns the estimated quantiles of the streams.
+
+        Returns:
+        - estimates (numpy.ndarray): Estimated quantile of each stream, of the shape of quantiles, exact
+                                     (as numpy.quantile) until 5 values were added, NaN before any.
+        """
+        if self.count == 0:
+            return np.full(self.quantiles.shape, math.nan)
+        if self.count < NUM_MARKERS:
+            first_values = np.sort(self.heights[: self.count], axis=0)
+            rank = self.quantiles * (self.count - 1)
+            lower_rank = np.floor(rank).astype(np.int64)
+            upper_rank = np.minimum(lower_rank + 1, self.count - 1)
+            lower = np.take_along_axis(first_values, lower_rank[None], axis=0)[0]
+            upper = np.take_along_axis(first_values, upper_rank[None], axis=0)[0]
+            return lower + (rank - lower_rank) * (upper - lower)
+        return self.heights[2].copy()
+
+    def reset(self) -> None:
+        """
+        Forgets the values added to the streams.
+
+        Returns:
+        None
+        """
+        self.count = 0
+        self.heights.fill(0.0)
+        self.positions[:] = np.arange(NUM_MARKERS, dtype=np.float64).reshape(
+            (NUM_MARKERS,) + (1,) * self.quantiles.ndim
+        )
+        # Desired positions of the first 5 values: 0, 2p, 4p, 2 + 2p and 4
+        np.multiply(self.desired_position_increments, 4, out=self.desired_positions)
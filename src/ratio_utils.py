@@ -1,6 +1,7 @@
 # Ratio utility functions
 
 import math
+import numpy as np
 
 
 def euclidean_distance(point1, point2) -> float:
@@ -104,17 +105,7 @@ def eye_aspect_ratio(eye_mesh_coordinates):
           to the width of the eye, as defined by the distance between two specific landmark points on the eye.
         - The eye aspect ratio (EAR) is commonly used in eye tracking and drowsiness detection applications.
     """
-    eye_width = euclidean_distance(eye_mesh_coordinates[0], eye_mesh_coordinates[1])
-    eye_height_sum = 0
-    i = 2
-    while i < 16:
-        eye_height_sum += euclidean_distance(
-            eye_mesh_coordinates[i], eye_mesh_coordinates[i + 1]
-        )
-        i += 2
-    if eye_width == 0:
-        return 1.0
-    return (1.0 * eye_height_sum) / (7.0 * eye_width)
+    return float(eye_aspect_ratios(np.asarray(eye_mesh_coordinates)[np.newaxis])[0])
 
 
 def mouth_aspect_ratio(mouth_mesh_coordinates):
@@ -150,19 +141,7 @@ def mouth_aspect_ratio(mouth_mesh_coordinates):
         - The mouth aspect ratio is used in facial expression recognition and speech analysis applications as a measure of
           mouth openness or lip movement.
     """
-    mouth_width = euclidean_distance(
-        mouth_mesh_coordinates[0], mouth_mesh_coordinates[1]
-    )
-    mouth_heights_sum = 0
-    i = 2
-    while i < 20:
-        mouth_heights_sum += euclidean_distance(
-            mouth_mesh_coordinates[i], mouth_mesh_coordinates[i + 1]
-        )
-        i += 2
-    if mouth_width == 0:
-        return 1.0
-    return (1.0 * mouth_heights_sum) / (7.0 * mouth_width)
+    return float(mouth_aspect_ratios(np.asarray(mouth_mesh_coordinates)[np.newaxis])[0])
 
 
 def magic_ratio(eye_mesh_coordinates):
@@ -202,30 +181,117 @@ def magic_ratio(eye_mesh_coordinates):
           based on their deviation from a normal range of heights. Points with higher deviation are assigned higher weightages.
         - The magic ratio is used in eye tracking and drowsiness detection applications as a measure of eye openness.
     """
-    eye_width = euclidean_distance(eye_mesh_coordinates[0], eye_mesh_coordinates[1])
-    eye_height1 = euclidean_distance(eye_mesh_coordinates[2], eye_mesh_coordinates[3])
-    eye_height2 = euclidean_distance(eye_mesh_coordinates[4], eye_mesh_coordinates[5])
-    eye_height3 = euclidean_distance(eye_mesh_coordinates[6], eye_mesh_coordinates[7])
-    eye_height4 = euclidean_distance(eye_mesh_coordinates[8], eye_mesh_coordinates[9])
-    eye_height5 = euclidean_distance(eye_mesh_coordinates[10], eye_mesh_coordinates[11])
-    eye_height6 = euclidean_distance(eye_mesh_coordinates[12], eye_mesh_coordinates[13])
-    eye_height7 = euclidean_distance(eye_mesh_coordinates[14], eye_mesh_coordinates[15])
-    # heights: 4 will have maximum weightage
-    # heights: 3, 5 will have second maximum weightage
-    # heights: 2, 6 will have third maximum weightage
-    # heights: 1, 7 will have least weightage
-    # As we need to reflect even the smallest change, so
-    # we need to give more weightage to those heights which
-    # change more dramatically, giving higher deviation in output
-    if eye_width == 0:
-        return 1.0
-    return (
-        (
-            4.0 * eye_height4
-            + 3.0 * (eye_height3 + eye_height5)
-            + 2.0 * (eye_height2 + eye_height6)
-            + (eye_height1 + eye_height7)
-        )
-        / 16.0
-        * eye_width
+    return float(magic_ratios(np.asarray(eye_mesh_coordinates)[np.newaxis])[0])
+
+
+# Batched ratio functions
+# These take a (N, K, 2) array of landmark subsets (N frames or faces,
+# K landmarks in the same order as mesh_indices) and compute the ratios
+# of all N subsets at once.
+
+# Weightages of eye heights 1 to 7 in the magic ratio
+# heights: 4 will have maximum weightage
+# heights: 3, 5 will have second maximum weightage
+# heights: 2, 6 will have third maximum weightage
+# heights: 1, 7 will have least weightage
+# As we need to reflect even the smallest change, so
+# we need to give more weightage to those heights which
+# change more dramatically, giving higher deviation in output
+MAGIC_RATIO_HEIGHT_WEIGHTS = np.array([1.0, 2.0, 3.0, 4.0, 3.0, 2.0, 1.0])
+
+
+def pair_distances(mesh_coordinates_batch):
+    """
+    Calculates the Euclidean distances between consecutive landmark pairs (0, 1), (2, 3), ... of a batch.
+
+    Args:
+        mesh_coordinates_batch (numpy.ndarray): The (N, K, 2) array of landmark coordinates, K being even.
+
+    Returns:
+        numpy.ndarray: The (N, K / 2) array of distances. Column 0 is the width, the remaining columns are the heights.
+
+    Raises:
+        None.
+
+    Example usage:
+        # Distances of the left eye landmarks of all recorded frames
+        eye_distances = pair_distances(mesh_coordinates[:, landmarks.LEFT_EYE])
+    """
+    mesh_coordinates_batch = np.asarray(mesh_coordinates_batch, dtype=np.float64)
+    difference = (
+        mesh_coordinates_batch[..., 0::2, :] - mesh_coordinates_batch[..., 1::2, :]
     )
+    return np.hypot(difference[..., 0], difference[..., 1])
+
+
+def _safe_ratio(numerator, denominator):
+    # Ratios of zero width subsets are 1.0, as in the scalar functions
+    ratio = np.ones(np.shape(numerator), dtype=np.float64)
+    np.divide(numerator, denominator, out=ratio, where=denominator != 0)
+    return ratio
+
+
+def eye_aspect_ratios(eye_mesh_coordinates_batch):
+    """
+    Calculates the eye aspect ratios (EAR) for a batch of eye landmark coordinates.
+
+    Args:
+        eye_mesh_coordinates_batch (numpy.ndarray): The (N, 16, 2) array of eye landmark coordinates.
+
+    Returns:
+        numpy.ndarray: The (N,) array of eye aspect ratio (EAR) values.
+
+    Raises:
+        None.
+
+    Note:
+        - Computes the same values as eye_aspect_ratio(), for all N subsets in one pass.
+    """
+    distances = pair_distances(eye_mesh_coordinates_batch)
+    eye_width = distances[..., 0]
+    eye_height_sum = distances[..., 1:8].sum(axis=-1)
+    return _safe_ratio(eye_height_sum, 7.0 * eye_width)
+
+
+def mouth_aspect_ratios(mouth_mesh_coordinates_batch):
+    """
+    Calculates the mouth aspect ratios for a batch of mouth landmark coordinates.
+
+    Args:
+        mouth_mesh_coordinates_batch (numpy.ndarray): The (N, 20, 2) array of mouth landmark coordinates.
+
+    Returns:
+        numpy.ndarray: The (N,) array of mouth aspect ratio values.
+
+    Raises:
+        None.
+
+    Note:
+        - Computes the same values as mouth_aspect_ratio(), for all N subsets in one pass.
+    """
+    distances = pair_distances(mouth_mesh_coordinates_batch)
+    mouth_width = distances[..., 0]
+    mouth_heights_sum = distances[..., 1:10].sum(axis=-1)
+    return _safe_ratio(mouth_heights_sum, 7.0 * mouth_width)
+
+
+def magic_ratios(eye_mesh_coordinates_batch):
+    """
+    Calculates the magic ratios for a batch of eye landmark coordinates.
+
+    Args:
+        eye_mesh_coordinates_batch (numpy.ndarray): The (N, 16, 2) array of eye landmark coordinates.
+
+    Returns:
+        numpy.ndarray: The (N,) array of magic ratio values.
+
+    Raises:
+        None.
+
+    Note:
+        - Computes the same values as magic_ratio(), for all N subsets in one pass.
+    """
+    distances = pair_distances(eye_mesh_coordinates_batch)
+    eye_width = distances[..., 0]
+    weighted_heights = distances[..., 1:8] @ MAGIC_RATIO_HEIGHT_WEIGHTS
+    return np.where(eye_width == 0, 1.0, weighted_heights / 16.0 * eye_width)
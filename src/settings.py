@@ -0,0 +1,180 @@
+# Settings Classes
+#
+# Immutable snapshot of the settings the processing loop reads every frame. The
+# GUI builds a new snapshot whenever one of its Tkinter variables is written
+# (variable trace callbacks, on the Tk thread) and publishes it by rebinding a
+# single reference, so the worker thread reads all of its settings with one
+# attribute load instead of calling into the Tcl interpreter a dozen times per
+# frame, and never waits for the GUI while a slider is dragged. Without a GUI,
+# ConfigWatcher publishes the snapshots of config.toml the same way.
+
+import contextlib
+import typing
+
+
+class Settings(typing.NamedTuple):
+    """
+    Snapshot of the settings of the processing loop.
+
+    Attributes:
+    - ratio_to_use (str): "eye_aspect_ratio" or "modified_eye_aspect_ratio".
+    - deamonize (bool): Whether to process without showing the video.
+    - draw_resolution (bool): Whether to draw the video resolution.
+    - draw_fps (bool): Whether to draw the FPS.
+    - draw_face_landmarks (bool): Whether to draw the face landmarks.
+    - draw_eye_landmarks (bool): Whether to draw the eye landmarks.
+    - draw_mouth_landmarks (bool): Whether to draw the mouth landmarks.
+    - eye_aspect_ratio_threshold (float): Eye aspect ratio under which an eye is closed.
+    - modified_eye_aspect_ratio_left_threshold (float): Modified eye aspect ratio under which the left eye is closed.
+    - modified_eye_aspect_ratio_right_threshold (float): Modified eye aspect ratio under which the right eye is closed.
+    - mouth_aspect_ratio_threshold (float): Mouth aspect ratio over which the mouth is yawning.
+    - show_eye_aspect_ratio (bool): Whether to draw the eye aspect ratios.
+    - show_mouth_aspect_ratio (bool): Whether to draw the mouth aspect ratio.
+    - eyes_closed_time_threshold (int): Seconds the eyes must be closed for the alarm.
+    - yawn_time_threshold (int): Seconds the mouth must be yawning for the alarm.
+    """
+
+    ratio_to_use: str
+    deamonize: bool
+    draw_resolution: bool
+    draw_fps: bool
+    draw_face_landmarks: bool
+    draw_eye_landmarks: bool
+    draw_mouth_landmarks: bool
+    eye_aspect_ratio_threshold: float
+    modified_eye_aspect_ratio_left_threshold: float
+    modified_eye_aspect_ratio_right_threshold: float
+    mouth_aspect_ratio_threshold: float
+    show_eye_aspect_ratio: bool
+    show_mouth_aspect_ratio: bool
+    eyes_closed_time_threshold: int
+    yawn_time_threshold: int
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        Creates the Settings of config.toml.
+
+        Args:
+        - config (dict): Loaded config.toml.
+
+        Returns:
+        - settings (Settings): The settings.
+        """
+        return cls(
+            ratio_to_use=config["ratio_to_use"],
+            deamonize=config["deamonize"],
+            draw_resolution=config["draw_info"]["resolution"],
+            draw_fps=config["draw_info"]["fps"],
+            draw_face_landmarks=config["draw_landmarks"]["face"],
+            draw_eye_landmarks=config["draw_landmarks"]["eye"],
+            draw_mouth_landmarks=config["draw_landmarks"]["mouth"],
+            eye_aspect_ratio_threshold=config["ratio_thresholds"]["eye_aspect_ratio"],
+            modified_eye_aspect_ratio_left_threshold=config["ratio_thresholds"][
+                "modified_eye_aspect_ratio_left"
+            ],
+            modified_eye_aspect_ratio_right_threshold=config["ratio_thresholds"][
+                "modified_eye_aspect_ratio_right"
+            ],
+            mouth_aspect_ratio_threshold=config["ratio_thresholds"][
+                "mouth_aspect_ratio"
+            ],
+            show_eye_aspect_ratio=config["show_ratios"]["eye_aspect_ratio"],
+            show_mouth_aspect_ratio=config["show_ratios"]["mouth_aspect_ratio"],
+            eyes_closed_time_threshold=config["time_thresholds"]["eyes_closed"],
+            yawn_time_threshold=config["time_thresholds"]["yawn"],
+        )
+
+    def eye_aspect_ratio_thresholds(self):
+        """
+        Returns the (left, right) eye aspect ratio thresholds of the ratio to use.
+
+        Returns:
+        - thresholds (tuple): (left, right) eye aspect ratio thresholds.
+        """
+        if self.ratio_to_use == "modified_eye_aspect_ratio":
+            return (
+                self.modified_eye_aspect_ratio_left_threshold,
+                self.modified_eye_aspect_ratio_right_threshold,
+            )
+        return (self.eye_aspect_ratio_threshold, self.eye_aspect_ratio_threshold)
+
+    def apply(self, pipeline) -> None:
+        """
+        Sets the ratio thresholds of a pipeline and the time thresholds of its alarms.
+
+        Args:
+        - pipeline (MultiFaceDetectionPipeline): The pipeline, between two frames.
+
+        Returns:
+        None
+        """
+        pipeline.update_thresholds(
+            *self.eye_aspect_ratio_thresholds(), self.mouth_aspect_ratio_threshold
+        )
+        if pipeline.eyes_closed_alarm.time_threshold != self.eyes_closed_time_threshold:
+            pipeline.eyes_closed_alarm.update_time_threshold(
+                self.eyes_closed_time_threshold
+            )
+        if pipeline.yawn_alarm.time_threshold != self.yawn_time_threshold:
+            pipeline.yawn_alarm.update_time_threshold(self.yawn_time_threshold)
+
+
+class SettingsPublisher:
+    def __init__(self, variables: dict) -> None:
+        """
+        Initializes the SettingsPublisher object, publishing a first snapshot.
+
+        Must be created on the Tk thread, the trace callbacks run there.
+
+        Args:
+        - variables (dict): Settings field name -> Tkinter variable holding it, for all the fields.
+
+        Attributes:
+        - variables (dict): Settings field name -> Tkinter variable holding it.
+        - settings (Settings): The latest snapshot, replaced (never modified) when a variable is written.
+        - versions (int): Number of snapshots published.
+        - held (bool): Whether publishing waits for the end of hold().
+        """
+        self.variables: dict = variables
+        self.settings: Settings = None
+        self.versions: int = 0
+        self.held: bool = False
+        self.publish()
+        for variable in variables.values():
+            variable.trace_add("write", self.publish)
+
+    def publish(self, *trace_args) -> None:
+        """
+        Reads the Tkinter variables into a new snapshot and publishes it, trace callback of the variables.
+
+        Args:
+        - trace_args: Variable name, index and operation given by Tkinter, unused.
+
+        Returns:
+        None
+        """
+        if self.held:
+            return
+        # Rebinding the reference is atomic, readers get the old or the new snapshot
+        self.settings = Settings(
+            **{name: variable.get() for name, variable in self.variables.items()}
+        )
+        self.versions += 1
+
+    @contextlib.contextmanager
+    def hold(self):
+        """
+        Publishes the variables written in a with block as one snapshot, at its end.
+
+        Example usage:
+            with settings_publisher.hold():
+                tk_var_eye_aspect_ratio.set(0.2)
+                tk_var_mouth_aspect_ratio.set(0.5)
+        """
+        self.held = True
+        try:
+            yield
+        finally:
+            self.held = False
+            self.publish()
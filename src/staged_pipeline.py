@@ -0,0 +1,278 @@
+# StagedPipeline Class
+#
+# Runs the processing loop as stages on their own threads, connected by bounded
+# queues, so that frame N+1 is inferred while frame N is decided and rendered:
+#
+#   capture (VideoStream) -> inference -> decision -> render (caller's thread)
+#
+# FaceMesh and OpenCV release the GIL while they run, so the stages keep several
+# cores busy and the throughput is bounded by the slowest stage instead of the
+# sum of all of them. Rendering stays on the caller's thread, where the OpenCV
+# windows are. When a stage falls behind, the queues before it fill up and a
+# camera stream with the "latest" drop policy keeps only its newest frame, so
+# the latency stays bounded.
+
+import contextlib
+import queue
+import threading
+
+# Put in the queues after the last frame
+END_OF_STREAM = None
+
+
+class StagedPipeline:
+    def __init__(
+        self,
+        stream,
+        detector,
+        pipeline,
+        governor,
+        queue_size: int = 2,
+        video_fps: float = 0.0,
+        stage_timers=None,
+        settings_source=None,
+    ) -> None:
+        """
+        Initializes the StagedPipeline object.
+
+        Args:
+        - stream (VideoStream): Started video stream the frames are captured by.
+        - detector (LandmarkDetector): Landmark detector, only used by the inference stage.
+        - pipeline (MultiFaceDetectionPipeline): Detection pipeline, only used by the decision stage.
+        - governor (InferenceGovernor): Decides which frames are inferred.
+        - queue_size (int): Maximum number of frames waiting between two stages.
+        - video_fps (float): Frame rate frames of video files are timed at, 0 to use the capture
+                             timestamps (cameras).
+        - stage_timers (StageTimers): Times the capture_wait (inference waiting for a captured frame)
+                                      and ratios stages, None to not time them.
+        - settings_source (SettingsPublisher or ConfigWatcher): Publishes the Settings applied to the
+                                                                pipeline between two frames, None to
+                                                                keep its thresholds.
+
+        Attributes:
+        - stream (VideoStream): Video stream the frames are captured by.
+        - detector (LandmarkDetector): Landmark detector of the inference stage.
+        - pipeline (MultiFaceDetectionPipeline): Detection pipeline of the decision stage.
+        - governor (InferenceGovernor): Decides which frames are inferred.
+        - video_fps (float): Frame rate frames of video files are timed at, 0 for capture timestamps.
+        - measure_stage: Context manager factory timing a stage, a no-op without stage timers.
+        - settings_source (SettingsPublisher or ConfigWatcher): Publishes the Settings of the pipeline, None for none.
+        - applied_settings (Settings): The Settings last applied to the pipeline, None if none.
+        - decision_queue (queue.Queue): Inferred frames waiting for the decision stage.
+        - render_queue (queue.Queue): Decided frames waiting for the caller.
+        - stop_event: Threading event set to stop the stages.
+        - threads (list): Threads of the inference and decision stages.
+        - error (BaseException): Exception that stopped a stage, None if none did.
+        """
+        self.stream = stream
+        self.detector = detector
+        self.pipeline = pipeline
+        self.governor = governor
+        self.video_fps: float = video_fps
+        self.measure_stage = (
+            contextlib.nullcontext if stage_timers is None else stage_timers.measure
+        )
+        self.decision_queue = queue.Queue(maxsize=queue_size)
+        self.render_queue = queue.Queue(maxsize=queue_size)
+        self.settings_source = settings_source
+        self.applied_settings = None
+        self.stop_event = threading.Event()
+        self.threads: list = []
+        self.error = None
+
+    def start(self):
+        """
+        Starts the inference and decision stages.
+
+        Returns:
+        - self (StagedPipeline): The started pipeline.
+        """
+        self.threads = [
+            threading.Thread(target=self.inference_loop, name="inference", daemon=True),
+            threading.Thread(target=self.decision_loop, name="decision", daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def put(self, stage_queue: queue.Queue, item) -> bool:
+        """
+        Puts an item in the queue of the next stage, waiting while it is full.
+
+        Args:
+        - stage_queue (queue.Queue): Queue of the next stage.
+        - item (dict): The frame and what the stages found out about it, or END_OF_STREAM.
+
+        Returns:
+        - put (bool): True if the item was put, False if the pipeline was stopped meanwhile.
+        """
+        while not self.stop_event.is_set():
+            try:
+                stage_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def inference_loop(self) -> None:
+        """
+        Inference stage: reads the captured frames and runs the landmark detector on the
+        frames the governor picks, skipped frames reusing the landmarks of the last inferred one.
+
+        Returns:
+        None
+        """
+        faces_coordinates = None
+        try:
+            while not self.stop_event.is_set():
+                # Waiting for the capture thread, which times the reads as "capture"
+                with self.measure_stage("capture_wait"):
+                    (
+                        frame_read_successful,
+                        frame,
+                        sequence_number,
+                        capture_timestamp,
+                    ) = self.stream.read(timeout=0.1)
+                if not frame_read_successful:
+                    if self.stream.stream_ended:
+                        break
+                    continue
+                inferred = self.governor.should_infer()
+                if inferred:
+                    detected = self.detector.detect(frame)
+                    # The detector reuses its landmarks array, the next frame would overwrite them
+                    faces_coordinates = None if detected is None else detected.copy()
+                else:
+                    self.detector.skip()
+                item = {
+                    "frame": frame,
+                    "sequence_number": sequence_number,
+                    "capture_timestamp": capture_timestamp,
+                    "inferred": inferred,
+                    "faces_coordinates": faces_coordinates,
+                }
+                if not self.put(self.decision_queue, item):
+                    self.stream.release(frame)
+        except BaseException as error:
+            self.error = error
+        finally:
+            self.put(self.decision_queue, END_OF_STREAM)
+
+    def decision_loop(self) -> None:
+        """
+        Decision stage: turns the landmarks of the frames into eyes/mouth states and alarm
+        updates, and updates the inference rate from the decisions of the inferred frames.
+
+        Returns:
+        None
+        """
+        try:
+            while not self.stop_event.is_set():
+                try:
+                    item = self.decision_queue.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                if item is END_OF_STREAM:
+                    break
+                # Applied on this thread, so a frame is decided with the old or the new settings only
+                if self.settings_source is not None:
+                    settings = self.settings_source.settings
+                    if settings is not self.applied_settings:
+                        settings.apply(self.pipeline)
+                        self.applied_settings = settings
+                with self.measure_stage("ratios"):
+                    item["decisions"] = self.pipeline.process(
+                        item["faces_coordinates"],
+                        (
+                            item["sequence_number"] / self.video_fps
+                            if self.video_fps
+                            else item["capture_timestamp"]
+                        ),
+                    )
+                    self.governor.update(
+                        self.pipeline, item["decisions"], inferred=item["inferred"]
+                    )
+                if not self.put(self.render_queue, item):
+                    self.stream.release(item["frame"])
+        except BaseException as error:
+            self.error = error
+        finally:
+            self.put(self.render_queue, END_OF_STREAM)
+
+    def read(self):
+        """
+        Reads the next decided frame, waiting for one.
+
+        Returns:
+        - result_read_successful (bool): False once the stream ended or the pipeline stopped.
+        - result (dict): frame, sequence_number, capture_timestamp, inferred, faces_coordinates
+                         ((faces, 468, 2) array or None) and decisions (see
+                         MultiFaceDetectionPipeline.process), None if no result was read.
+
+        Raises:
+        - RuntimeError: If a stage failed, chained to its exception.
+
+        Notes:
+        - The caller owns the frame of the result, and gives it back with release() when done with it.
+        """
+        while True:
+            try:
+                result = self.render_queue.get(timeout=0.1)
+                break
+            except queue.Empty:
+                if self.stop_event.is_set():
+                    return False, None
+        if result is END_OF_STREAM:
+            if self.error is not None:
+                raise RuntimeError(
+                    "A stage of the StagedPipeline failed"
+                ) from self.error
+            return False, None
+        return True, result
+
+    def release(self, result: dict) -> None:
+        """
+        Gives the frame of a result back to the stream's buffer pool.
+
+        Args:
+        - result (dict): The result returned by read(), its frame must not be used afterwards.
+
+        Returns:
+        None
+        """
+        self.stream.release(result["frame"])
+
+    def queue_depths(self) -> dict:
+        """
+        Returns the number of frames waiting before every stage.
+
+        Returns:
+        - queue_depths (dict): Stage -> number of frames waiting: inference (captured frames),
+                               decision and render.
+        """
+        return {
+            "inference": len(self.stream.frames),
+            "decision": self.decision_queue.qsize(),
+            "render": self.render_queue.qsize(),
+        }
+
+    def stop(self) -> None:
+        """
+        Stops the stages and the stream, giving the frames still queued back to the buffer pool.
+
+        Returns:
+        None
+        """
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        for stage_queue in (self.decision_queue, self.render_queue):
+            while True:
+                try:
+                    item = stage_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not END_OF_STREAM:
+                    self.stream.release(item["frame"])
+        self.stream.end()
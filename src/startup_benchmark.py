@@ -0,0 +1,197 @@
+# Startup Benchmark
+#
+# Measures how long the headless runner takes to be live after it is launched,
+# as on a unit power-cycled with the ignition: every run starts a fresh
+# interpreter, which processes one frame and exits. The time since launch is
+# reported for every startup milestone: imports (interpreter and modules), then
+# config, detector, alarms, camera, first_frame and first_landmarks as logged
+# by the runner, so model loading and opening the camera count. Optionally lists
+# the slowest imports of the runner (python -X importtime).
+#
+# Usage:
+#   python src/startup_benchmark.py                        (first camera of config.toml)
+#   python src/startup_benchmark.py drive.mp4 --runs 10
+#   python src/startup_benchmark.py drive.mp4 --detector synthetic --imports 15
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+SOURCE_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+# Startup milestone lines of headless.py
+STARTUP_LINE = re.compile(r"\[INFO\] Startup: (\w+) after ([0-9.]+) s")
+
+# Lines of python -X importtime: self and cumulative microseconds, indented module name
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)")
+
+
+def time_startup(
+    source=None,
+    config_file_path: str = "config.toml",
+    detector_name: str = "mediapipe",
+    play_audio: bool = False,
+    timeout: float = 60.0,
+) -> dict:
+    """
+    Launches headless.py for one frame and times its startup milestones.
+
+    Args:
+    - source (int or str): Device index, or path/URL of a video, None for the first camera of config.toml.
+    - config_file_path (str): Configuration file.
+    - detector_name (str): "mediapipe" or "synthetic".
+    - play_audio (bool): Whether the alarm sounds are loaded too.
+    - timeout (float): Seconds after which the run is killed.
+
+    Returns:
+    - milestones (dict): Milestone -> seconds since launch, in the order reached, ending with exit.
+
+    Raises:
+    - RuntimeError: If the run fails or times out, with its output.
+    """
+    command = [
+        sys.executable,
+        "-u",
+        os.path.join(SOURCE_DIRECTORY, "headless.py"),
+        "--config",
+        config_file_path,
+        "--detector",
+        detector_name,
+        "--frames",
+        "1",
+    ]
+    if source is not None:
+        command.append(str(source))
+    if not play_audio:
+        command.append("--no-audio")
+    launch_time = time.perf_counter()
+    process = subprocess.Popen(
+        command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True
+    )
+    watchdog = threading.Timer(timeout, process.kill)
+    watchdog.start()
+    milestones = {}
+    output = []
+    try:
+        for line in process.stdout:
+            arrival_time = time.perf_counter() - launch_time
+            output.append(line)
+            match = STARTUP_LINE.search(line)
+            if not match:
+                continue
+            # The runner times its milestones from the end of its imports, which the
+            # arrival of its first milestone line tells (first_frame is logged late)
+            if not milestones:
+                milestones["imports"] = arrival_time - float(match.group(2))
+            milestones[match.group(1)] = milestones["imports"] + float(match.group(2))
+        process.wait()
+    finally:
+        watchdog.cancel()
+    milestones["exit"] = time.perf_counter() - launch_time
+    if process.returncode != 0 or "first_landmarks" not in milestones:
+        raise RuntimeError(
+            "Startup run failed (exit code {}):\n{}".format(
+                process.returncode, "".join(output[-20:])
+            )
+        )
+    return milestones
+
+
+def import_profile(module: str = "headless", count: int = 10) -> list:
+    """
+    Times the imports of an entry point in a fresh interpreter (python -X importtime).
+
+    Args:
+    - module (str): Name of the entry point module, in the source directory.
+    - count (int): Number of imports to return.
+
+    Returns:
+    - imports (list): (module name, cumulative milliseconds) of the direct imports of the
+                      entry point, slowest first, preceded by the entry point itself.
+    """
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SOURCE_DIRECTORY,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = []
+    total = None
+    for match in IMPORT_TIME_LINE.finditer(completed.stderr):
+        _, cumulative, indentation, name = match.groups()
+        if not indentation and name == module:
+            total = (name, int(cumulative) / 1e3)
+        elif len(indentation) == 2:
+            imports.append((name, int(cumulative) / 1e3))
+    imports.sort(key=lambda item: item[1], reverse=True)
+    return [total] + imports[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Measures the time from launch to the first frame and landmarks."
+    )
+    parser.add_argument(
+        "source",
+        nargs="?",
+        help="camera device index or video path (default: first of [cameras] of config.toml)",
+    )
+    parser.add_argument("--config", default="config.toml", help="configuration file")
+    parser.add_argument("--runs", type=int, default=5, help="number of launches")
+    parser.add_argument(
+        "--detector",
+        choices=("mediapipe", "synthetic"),
+        default="mediapipe",
+        help="landmark detector of the runs",
+    )
+    parser.add_argument(
+        "--audio", action="store_true", help="also load the alarm sounds"
+    )
+    parser.add_argument(
+        "--imports",
+        type=int,
+        default=0,
+        help="also list this many of the slowest imports of headless.py",
+    )
+    args = parser.parse_args()
+
+    runs = []
+    for run_index in range(args.runs):
+        milestones = time_startup(
+            args.source,
+            config_file_path=args.config,
+            detector_name=args.detector,
+            play_audio=args.audio,
+        )
+        print(
+            "[INFO] Run {}: first frame {:.3f} s, first landmarks {:.3f} s".format(
+                run_index + 1, milestones["first_frame"], milestones["first_landmarks"]
+            )
+        )
+        runs.append(milestones)
+
+    print(f"\nSeconds since launch over {args.runs} runs:")
+    print("{:>16} {:>8} {:>8} {:>8}".format("milestone", "min", "median", "max"))
+    for milestone in runs[0]:
+        times = [milestones[milestone] for milestones in runs]
+        print(
+            "{:>16} {:8.3f} {:8.3f} {:8.3f}".format(
+                milestone, min(times), statistics.median(times), max(times)
+            )
+        )
+
+    if args.imports:
+        (module, total), *imports = import_profile("headless", args.imports)
+        print(f"\nImport of {module}: {total:.1f} ms, slowest imports:")
+        for name, cumulative in imports:
+            print(f"{name:>24} {cumulative:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
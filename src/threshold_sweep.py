@@ -0,0 +1,355 @@
+# Threshold Sweep
+#
+# Evaluates many (eye aspect ratio threshold, mouth aspect ratio threshold,
+# eyes closed seconds, yawn seconds) combinations over landmark recordings
+# (see landmark_recording) at once, reporting the alarm count and the mean
+# alarm latency of every combination.
+#
+# The alarms are exactly the ones EyesClosed/Yawn (and AlarmTracker) decide
+# with their AlarmWindow, for the frames with a face, at the recorded
+# timestamps: the "notok" time of the sliding windows is computed for whole
+# sessions and all thresholds with NumPy prefix sums instead of frame by frame.
+# The eyes and mouth alarms are independent, so each is swept over its own
+# (ratio threshold, seconds) grid and the two grids are combined in the report.
+#
+# Usage:
+#   python src/threshold_sweep.py results/*.landmarks --ear 0.10:0.30:0.01 \
+#       --mar 0.3:0.8:0.02 --eyes-closed-seconds 1,2,3,4,5 --yawn-seconds 2,3,4,5,6
+
+import argparse
+import csv
+import numpy as np
+
+import alarm_window
+import landmarks
+import landmark_recording
+import ratio_utils
+
+# Number of frames whose ratios are computed together
+CHUNK_SIZE = 4096
+
+# Maximum number of (threshold, frame) elements swept together, bounds memory use
+BLOCK_ELEMENTS = 1 << 23
+
+
+def recording_ratios(recording) -> dict:
+    """
+    Computes the ratios of the frames with a face of a landmark recording, streaming it in chunks.
+
+    Args:
+    - recording (landmark_recording.LandmarkRecording): The memory-mapped recording.
+
+    Returns:
+    - ratios (dict): (face_frames,) arrays of left_eye_aspect_ratio, right_eye_aspect_ratio,
+                     mouth_aspect_ratio and timestamps.
+    """
+    face_frames = int(np.count_nonzero(recording.face_detected))
+    ratios = {
+        "left_eye_aspect_ratio": np.empty(face_frames),
+        "right_eye_aspect_ratio": np.empty(face_frames),
+        "mouth_aspect_ratio": np.empty(face_frames),
+        "timestamps": np.empty(face_frames),
+    }
+    face_frame_index = 0
+    for chunk_start in range(0, len(recording), CHUNK_SIZE):
+        chunk = slice(chunk_start, chunk_start + CHUNK_SIZE)
+        face_detected = np.asarray(recording.face_detected[chunk])
+        coordinates = np.asarray(recording.coordinates[chunk])[face_detected]
+        chunk_face_frames = slice(face_frame_index, face_frame_index + len(coordinates))
+        eye_aspect_ratios = ratio_utils.eye_aspect_ratios(landmarks.eyes(coordinates))
+        ratios["left_eye_aspect_ratio"][chunk_face_frames] = eye_aspect_ratios[:, 0]
+        ratios["right_eye_aspect_ratio"][chunk_face_frames] = eye_aspect_ratios[:, 1]
+        ratios["mouth_aspect_ratio"][chunk_face_frames] = (
+            ratio_utils.mouth_aspect_ratios(landmarks.mouth(coordinates))
+        )
+        ratios["timestamps"][chunk_face_frames] = recording.timestamps[chunk][
+            face_detected
+        ]
+        face_frame_index += len(coordinates)
+    return ratios
+
+
+def window_starts(timestamps, time_threshold: float, percentage_threshold: int):
+    """
+    Locates the sliding window of AlarmWindow at every frame of a session.
+
+    Args:
+    - timestamps (numpy.ndarray): (frames,) nondecreasing timestamps of the frames in nanoseconds.
+    - time_threshold (float): Time threshold in seconds.
+    - percentage_threshold (int): Percentage threshold of the windows.
+
+    Returns:
+    - window_start_times (numpy.ndarray): (frames,) start of the window of every frame in nanoseconds.
+    - first_entries (numpy.ndarray): (frames,) index of the first frame whose entry is in the window
+                                     of every frame.
+    """
+    window_start_times = timestamps - alarm_window.window_nanoseconds(
+        time_threshold, percentage_threshold
+    )
+    return (
+        window_start_times,
+        np.searchsorted(timestamps, window_start_times, side="right"),
+    )
+
+
+def sweep_alarms(
+    notok_frames,
+    time_thresholds,
+    timestamps,
+    percentage_threshold: int = alarm_window.PERCENTAGE_THRESHOLD,
+    max_frame_gap: float = alarm_window.MAX_FRAME_GAP,
+):
+    """
+    Counts the alarms that EyesClosed/Yawn would start, for many frame sequences and time thresholds at once.
+
+    The "notok" time of the window of every frame is the prefix sum of the "notok" durations
+    at the frame minus the one before the window, the first entry of the window being trimmed
+    to the window start, as AlarmWindow does incrementally.
+
+    Args:
+    - notok_frames (numpy.ndarray): (thresholds, frames) bool array, True for "notok" frames.
+    - time_thresholds (numpy.ndarray): (times,) time thresholds in seconds.
+    - timestamps (numpy.ndarray): (frames,) timestamps of the frames in seconds.
+    - percentage_threshold (int): Percentage threshold of the windows.
+    - max_frame_gap (float): Seconds between two frames after which the windows are emptied.
+
+    Returns:
+    - alarms (numpy.ndarray): (thresholds, times) number of alarms started.
+    - latencies (numpy.ndarray): (thresholds, times) sum of the alarm latencies in seconds, the latency
+                                 of an alarm being the time from the first "notok" time of its window
+                                 to the alarm.
+
+    Notes:
+    - An alarm starts on a frame where the alarm condition holds and did not hold on the previous frame,
+      as in AlarmTracker. EyesClosed/Yawn play the alarm sound again while the condition keeps holding.
+    """
+    time_thresholds = np.asarray(time_thresholds, dtype=np.float64)
+    num_thresholds, num_frames = notok_frames.shape
+    alarms = np.zeros((num_thresholds, len(time_thresholds)), dtype=np.int64)
+    latencies = np.zeros((num_thresholds, len(time_thresholds)))
+    if num_frames == 0:
+        return (alarms, latencies)
+
+    # Durations of the frames, zero for the frames that empty the windows
+    timestamps = alarm_window.to_nanoseconds(np.asarray(timestamps, dtype=np.float64))
+    durations = np.zeros(num_frames, dtype=np.int64)
+    durations[1:] = np.diff(timestamps)
+    frame_indices = np.arange(num_frames)
+    restarted = (durations < 0) | (
+        durations > alarm_window.to_nanoseconds(max_frame_gap)
+    )
+    restarted[0] = True
+    durations[restarted] = 0
+    last_restarts = np.maximum.accumulate(np.where(restarted, frame_indices, 0))
+    entry_starts = timestamps - durations
+
+    block_size = max(1, BLOCK_ELEMENTS // num_frames)
+    for block_start in range(0, num_thresholds, block_size):
+        block = slice(block_start, block_start + block_size)
+        notok = notok_frames[block]
+        rows = np.arange(notok.shape[0])[:, np.newaxis]
+        # Prefix sums with a leading zero, notok_durations[:, i] sums the frames before i
+        notok_durations = np.zeros((notok.shape[0], num_frames + 1), dtype=np.int64)
+        np.cumsum(notok * durations, axis=1, out=notok_durations[:, 1:])
+        # First "notok" frame at or after every frame, num_frames if none
+        next_notok_frames = np.where(notok, frame_indices, num_frames)
+        next_notok_frames = np.minimum.accumulate(next_notok_frames[:, ::-1], axis=1)[
+            :, ::-1
+        ]
+        for time_index, time_threshold in enumerate(time_thresholds):
+            window_start_times, first_entries = window_starts(
+                timestamps, time_threshold, percentage_threshold
+            )
+            first_entries = np.maximum(first_entries, last_restarts)
+            trimmed = np.maximum(window_start_times - entry_starts[first_entries], 0)
+            window_notok_durations = (
+                notok_durations[:, 1:]
+                - notok_durations[:, first_entries]
+                - notok[:, first_entries] * trimmed
+            )
+            alarming = (
+                window_notok_durations * 100
+                > percentage_threshold
+                * alarm_window.window_nanoseconds(time_threshold, percentage_threshold)
+            )
+            started = alarming.copy()
+            started[:, 1:] &= ~alarming[:, :-1]
+            threshold_indices, alarm_frames = np.nonzero(started)
+            alarms[block, time_index] = np.bincount(
+                threshold_indices, minlength=started.shape[0]
+            )
+            first_notok_frames = next_notok_frames[
+                threshold_indices, first_entries[alarm_frames]
+            ]
+            first_notok_times = np.maximum(
+                entry_starts[first_notok_frames], window_start_times[alarm_frames]
+            )
+            latencies[block, time_index] = np.bincount(
+                threshold_indices,
+                weights=(timestamps[alarm_frames] - first_notok_times) / 1e9,
+                minlength=started.shape[0],
+            )
+    return (alarms, latencies)
+
+
+def sweep_ratios(
+    ratios: dict,
+    eye_aspect_ratio_thresholds,
+    mouth_aspect_ratio_thresholds,
+    eyes_closed_times,
+    yawn_times,
+) -> dict:
+    """
+    Sweeps the thresholds over the ratios of a session.
+
+    Args:
+    - ratios (dict): Ratios of the frames with a face, as returned by recording_ratios.
+    - eye_aspect_ratio_thresholds (numpy.ndarray): Eye aspect ratio thresholds, used for both eyes.
+    - mouth_aspect_ratio_thresholds (numpy.ndarray): Mouth aspect ratio thresholds.
+    - eyes_closed_times (numpy.ndarray): Eyes closed time thresholds in seconds.
+    - yawn_times (numpy.ndarray): Yawn time thresholds in seconds.
+
+    Returns:
+    - results (dict): eyes_closed_alarms and eyes_closed_latencies (eye thresholds, eyes closed times) arrays,
+                      yawn_alarms and yawn_latencies (mouth thresholds, yawn times) arrays, see sweep_alarms.
+    """
+    # Eyes are closed when neither of them is open
+    eye_aspect_ratios = np.maximum(
+        ratios["left_eye_aspect_ratio"], ratios["right_eye_aspect_ratio"]
+    )
+    eyes_closed_alarms, eyes_closed_latencies = sweep_alarms(
+        eye_aspect_ratios[np.newaxis, :]
+        < np.asarray(eye_aspect_ratio_thresholds)[:, np.newaxis],
+        eyes_closed_times,
+        ratios["timestamps"],
+    )
+    yawn_alarms, yawn_latencies = sweep_alarms(
+        ratios["mouth_aspect_ratio"][np.newaxis, :]
+        > np.asarray(mouth_aspect_ratio_thresholds)[:, np.newaxis],
+        yawn_times,
+        ratios["timestamps"],
+    )
+    return {
+        "eyes_closed_alarms": eyes_closed_alarms,
+        "eyes_closed_latencies": eyes_closed_latencies,
+        "yawn_alarms": yawn_alarms,
+        "yawn_latencies": yawn_latencies,
+    }
+
+
+def parse_values(text: str):
+    """
+    Parses a list of values, given either as "start:stop:step" (stop included) or as "a,b,c".
+
+    Args:
+    - text (str): The values.
+
+    Returns:
+    - values (numpy.ndarray): The parsed values.
+    """
+    if ":" in text:
+        start, stop, step = (float(value) for value in text.split(":"))
+        count = int(round((stop - start) / step)) + 1
+        return np.round(start + step * np.arange(count), 10)
+    return np.array([float(value) for value in text.split(",")])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Sweeps ratio and time thresholds over landmark recordings."
+    )
+    parser.add_argument("recordings", nargs="+", help="landmark recording directories")
+    parser.add_argument(
+        "--ear", default="0.10:0.30:0.01", help="eye aspect ratio thresholds"
+    )
+    parser.add_argument(
+        "--mar", default="0.30:0.80:0.02", help="mouth aspect ratio thresholds"
+    )
+    parser.add_argument(
+        "--eyes-closed-seconds", default="1:10:1", help="eyes closed time thresholds"
+    )
+    parser.add_argument("--yawn-seconds", default="1:10:1", help="yawn time thresholds")
+    parser.add_argument(
+        "--output", default="threshold_sweep.csv", help="CSV file of the results"
+    )
+    args = parser.parse_args()
+
+    eye_aspect_ratio_thresholds = parse_values(args.ear)
+    mouth_aspect_ratio_thresholds = parse_values(args.mar)
+    eyes_closed_times = parse_values(args.eyes_closed_seconds)
+    yawn_times = parse_values(args.yawn_seconds)
+
+    totals = None
+    for recording_directory in args.recordings:
+        recording = landmark_recording.LandmarkRecording(recording_directory)
+        ratios = recording_ratios(recording)
+        results = sweep_ratios(
+            ratios,
+            eye_aspect_ratio_thresholds,
+            mouth_aspect_ratio_thresholds,
+            eyes_closed_times,
+            yawn_times,
+        )
+        print(
+            "[INFO] Swept {}: {} frames, {} with a face".format(
+                recording_directory, len(recording), len(ratios["timestamps"])
+            )
+        )
+        if totals is None:
+            totals = results
+        else:
+            for key in totals:
+                totals[key] += results[key]
+
+    # Mean latencies, NaN for combinations without alarms
+    with np.errstate(invalid="ignore", divide="ignore"):
+        eyes_closed_mean_latencies = (
+            totals["eyes_closed_latencies"] / totals["eyes_closed_alarms"]
+        )
+        yawn_mean_latencies = totals["yawn_latencies"] / totals["yawn_alarms"]
+
+    with open(args.output, "w", newline="") as output_file:
+        writer = csv.writer(output_file)
+        writer.writerow(
+            [
+                "eye_aspect_ratio",
+                "mouth_aspect_ratio",
+                "eyes_closed_seconds",
+                "yawn_seconds",
+                "eyes_closed_alarms",
+                "eyes_closed_mean_latency",
+                "yawn_alarms",
+                "yawn_mean_latency",
+            ]
+        )
+        for i, eye_aspect_ratio_threshold in enumerate(eye_aspect_ratio_thresholds):
+            for j, mouth_aspect_ratio_threshold in enumerate(
+                mouth_aspect_ratio_thresholds
+            ):
+                for k, eyes_closed_time in enumerate(eyes_closed_times):
+                    for l, yawn_time in enumerate(yawn_times):
+                        writer.writerow(
+                            [
+                                f"{eye_aspect_ratio_threshold:g}",
+                                f"{mouth_aspect_ratio_threshold:g}",
+                                f"{eyes_closed_time:g}",
+                                f"{yawn_time:g}",
+                                totals["eyes_closed_alarms"][i, k],
+                                f"{eyes_closed_mean_latencies[i, k]:.3f}",
+                                totals["yawn_alarms"][j, l],
+                                f"{yawn_mean_latencies[j, l]:.3f}",
+                            ]
+                        )
+    print(
+        "[INFO] Wrote {} combinations to {}".format(
+            len(eye_aspect_ratio_thresholds)
+            * len(mouth_aspect_ratio_thresholds)
+            * len(eyes_closed_times)
+            * len(yawn_times),
+            args.output,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,36 +1,40 @@
 # Imports
-# import time
-import tomli
+import time
 import cv2 as cv
-import mediapipe as mp
 
 import colors
-import mesh_indices
-import ratio_utils
+import landmark_detectors
+import detection_pipeline
+import inference_governor
+import initializer
+import metrics
 import drawing_utils
+import alarm_audio
 import eyes_closed
 import yawn
 import fps
+import config_watcher
 
 
 # Detection utility functions
 def landmarks_detection(
-    image, results, draw_detection_points=False, color=colors.GREEN
+    image, detector, draw_detection_points=False, color=colors.GREEN
 ):
     """
     Detects facial landmarks on an input image using a pre-trained facial landmark detection model.
 
     Args:
         image (numpy.ndarray): The input image as a NumPy array.
-        results (mediapipe.FaceLandmark): The facial landmark detection results from the Mediapipe library.
+        detector (landmark_detectors.LandmarkDetector): The landmark detector to run on the image.
         draw_detection_points (bool, optional): Whether to draw the detected landmark points on the image.
                                                 Defaults to False.
         color (tuple, optional): The color of the drawn landmark points, specified as a tuple of (B, G, R) values.
                                  Defaults to color.GREEN.
 
     Returns:
-        list of tuple: A list of tuples representing the coordinates of the detected facial landmarks in the format (x, y),
-                       where x is the horizontal coordinate and y is the vertical coordinate.
+        numpy.ndarray: A (faces, 468, 2) array of the coordinates of the detected facial landmarks in the format
+                       (x, y), where x is the horizontal coordinate and y is the vertical coordinate, or None if
+                       no face was detected.
 
     Raises:
         None.
@@ -39,199 +43,241 @@ def landmarks_detection(
         # Load an image
         image = cv.imread('face_image.jpg')
 
-        # Detect facial landmarks
-        face_mesh = mediapipe_face_mesh(image)
+        # Create a landmark detector
+        detector = landmark_detectors.MediaPipeLandmarkDetector()
 
         # Extract facial landmark coordinates
-        landmark_coordinates = landmarks_detection(image, face_mesh, draw_detection_points=True)
+        landmark_coordinates = landmarks_detection(image, detector, draw_detection_points=True)
 
     Note:
-        - The function assumes that the input image has already been preprocessed, resized, and passed through a face
-          detection model to obtain the facial landmark detection results.
-        - The function only extracts the coordinates of the facial landmarks for the first detected face in the image.
-          If there are multiple faces, only the landmarks of the first face will be returned.
-        - The facial landmarks are represented as a list of tuples, where each tuple contains the (x, y) coordinates
-          of a single facial landmark point. The coordinates are normalized to the image size, with (0,0) at the top-left
-          corner of the image and (1,1) at the bottom-right corner of the image.
+        - The input image is the BGR frame, the detector converts it to whatever its model needs.
+        - The landmarks of up to the detector's max_num_faces faces are returned, in no particular order.
+        - The facial landmarks of a face are represented as a (468, 2) array, where each row contains the (x, y) pixel
+          coordinates of a single facial landmark point, with (0,0) at the top-left corner of the image.
+        - The returned array is preallocated and reused across frames by the detector.
         - If the `draw_detection_points` parameter is set to True, the detected facial landmarks will be drawn on the
           input image using circles with the specified `color` parameter.
     """
-    image_height, image_width = image.shape[:2]
-    if results.multi_face_landmarks:
-        mesh_coordinates = [
-            (int(point.x * image_width), int(point.y * image_height))
-            for point in results.multi_face_landmarks[0].landmark
-        ]
-    else:
+    faces_coordinates = detector.detect(image)
+    if faces_coordinates is None:
         return None
     if draw_detection_points:
-        for point in mesh_coordinates:
-            cv.circle(image, point, 2, color)
-    return mesh_coordinates
+        for mesh_coordinates in faces_coordinates:
+            drawing_utils.points(image, mesh_coordinates, color, radius=2, thickness=1)
+    return faces_coordinates
 
 
-# Face Mesh
-face_mesh = mp.solutions.face_mesh.FaceMesh(
-    min_detection_confidence=0.5, min_tracking_confidence=0.5
-)
-
-# Start capturing video
-camera = cv.VideoCapture(0)
-width = int(camera.get(cv.CAP_PROP_FRAME_WIDTH))  # 3
-height = int(camera.get(cv.CAP_PROP_FRAME_HEIGHT))  # 4
-print(f"Video Resolution: ({width}, {height})")
-
 # FPS Counter
 frames_per_second = fps.FPS()
 frames_per_second.start()
 
-# Loading config
-config_file = open("config.toml", mode="rb")
-config = tomli.load(config_file)
+# Counters, gauges and histograms of the loop, exposed as set in [metrics] of config.toml
+pipeline_metrics = metrics.Metrics()
+
+# Per-stage timings (min/p50/p99), printed on exit
+stage_timers = fps.StageTimers(metrics=pipeline_metrics)
+
+# HUD items of a frame, drawn in one pass before displaying it
+hud = drawing_utils.HUDCompositor()
+
+# Loading config, reloaded when config.toml is edited
+config_file_watcher = config_watcher.ConfigWatcher("config.toml").start()
+config = config_file_watcher.config
+# Thresholds of ratio_to_use, as the pipeline applies them
 print(
-    "Eye Aspect Ratio Threshold: " + str(config["ratio_thresholds"]["eye_aspect_ratio"])
+    "Eye Aspect Ratio Thresholds (left, right): "
+    + str(config_file_watcher.settings.eye_aspect_ratio_thresholds())
 )
 print(
     "Mouth Aspect Ratio Threshold: "
-    + str(config["ratio_thresholds"]["mouth_aspect_ratio"])
+    + str(config_file_watcher.settings.mouth_aspect_ratio_threshold)
 )
 
-# Ratio Thresholds
-EYE_ASPECT_RATIO_THRESHOLD = config["ratio_thresholds"]["eye_aspect_ratio"]
-MOUTH_ASPECT_RATIO_THRESHOLD = config["ratio_thresholds"]["mouth_aspect_ratio"]
-
 # Time Thresholds
 EYES_CLOSED_TIME_THRESHOLD = config["time_thresholds"]["eyes_closed"]
 YAWN_TIME_THRESHOLD = config["time_thresholds"]["yawn"]
 
+# Opening the camera, loading and warming up the landmark detector and decoding the
+# alarm sounds run at the same time
+startup = initializer.Initializer()
+startup.add("camera", cv.VideoCapture, 0, cleanup=cv.VideoCapture.release)
+startup.add(
+    "detector",
+    landmark_detectors.MediaPipeLandmarkDetector.from_config,
+    config,
+    stage_timers=stage_timers,
+    warm_up=True,
+    cleanup=lambda detector: detector.close(),
+)
+startup.add("alarms", alarm_audio.AlarmAudioService)
+initialized = startup.run()
+print("[INFO] " + startup.report())
+
+# Start capturing video
+camera = initialized["camera"]
+width = int(camera.get(cv.CAP_PROP_FRAME_WIDTH))  # 3
+height = int(camera.get(cv.CAP_PROP_FRAME_HEIGHT))  # 4
+print(f"Video Resolution: ({width}, {height})")
+
+# Landmark Detector
+detector = initialized["detector"]
+
+# Plays the alarm sounds off the processing loop
+alarm_audio_service = initialized["alarms"].start()
 eyes_closed_alarm = eyes_closed.EyesClosed(
-    time_threshold=EYES_CLOSED_TIME_THRESHOLD,
-    alarm_wav_file_path="assets/audios/eyes_closed.wav",
+    time_threshold=EYES_CLOSED_TIME_THRESHOLD, alarm_audio_service=alarm_audio_service
 )
 yawn_alarm = yawn.Yawn(
-    time_threshold=YAWN_TIME_THRESHOLD, alarm_wav_file_path="assets/audios/yawn.wav"
+    time_threshold=YAWN_TIME_THRESHOLD, alarm_audio_service=alarm_audio_service
 )
 
+# Maximum number of tracked faces (driver and passengers)
+MAX_NUM_FACES = config["face_tracking"]["max_num_faces"]
+
+# Ratios -> eyes/mouth states -> alarms, for every tracked face
+pipeline = detection_pipeline.MultiFaceDetectionPipeline.from_config(
+    config, eyes_closed_alarm, yawn_alarm
+)
+
+# Skips inference while every face is plainly awake
+governor = inference_governor.InferenceGovernor.from_config(config)
+
+# Served from background threads, the loop only updates the stage timers
+metrics.register_loop_collectors(
+    pipeline_metrics, pipeline, governor, frames_per_second=frames_per_second
+)
+metrics_exporter = metrics.MetricsExporter.from_config(pipeline_metrics, config).start()
+
+# Frame buffer, reused across frames
+frame_buffer = None
+
+# Landmarks of the last inferred frame, reused by the skipped frames
+faces_coordinates = None
+
+# Settings applied to the pipeline, None until the first frame
+applied_settings = None
+
 # Main loop
 while True:
-    frame_read_successful, frame = camera.read()
+    stage_timers.start("capture")
+    frame_read_successful, frame_buffer = camera.read(frame_buffer)
+    capture_timestamp = time.perf_counter()
+    stage_timers.stop("capture")
+    frame = frame_buffer
     if not frame_read_successful:
         break
     frames_per_second.update()
 
-    rgb_frame = cv.cvtColor(frame, cv.COLOR_BGR2RGB)
-    results = face_mesh.process(rgb_frame)
-
-    if results.multi_face_landmarks:
-        mesh_coordinates = landmarks_detection(
-            frame, results, draw_detection_points=False
-        )
-        if config["draw_landmarks"]["face"]:
-            for point in mesh_coordinates:
-                cv.circle(frame, point, 1, colors.CYAN, -1, cv.LINE_AA)
-        if config["draw_landmarks"]["eye"]:
-            for index in mesh_indices.left_eye:
-                cv.circle(
-                    frame, mesh_coordinates[index], 1, colors.GREEN, -1, cv.LINE_AA
-                )
-            for index in mesh_indices.right_eye:
-                cv.circle(
-                    frame, mesh_coordinates[index], 1, colors.GREEN, -1, cv.LINE_AA
-                )
-        if config["draw_landmarks"]["mouth"]:
-            for index in mesh_indices.mouth:
-                cv.circle(
-                    frame, mesh_coordinates[index], 1, colors.MAGNETA, -1, cv.LINE_AA
-                )
-        # Calculating eye aspect ratios
-        left_eye_aspect_ratio = ratio_utils.eye_aspect_ratio(
-            [mesh_coordinates[index] for index in mesh_indices.left_eye]
-        )
-        right_eye_aspect_ratio = ratio_utils.eye_aspect_ratio(
-            [mesh_coordinates[index] for index in mesh_indices.right_eye]
+    if governor.should_infer():
+        faces_coordinates = landmarks_detection(
+            frame, detector, draw_detection_points=False
         )
 
-        # Calculating mouth aspect ratio
-        mouth_aspect_ratio = ratio_utils.mouth_aspect_ratio(
-            [mesh_coordinates[index] for index in mesh_indices.mouth]
-        )
+    # Calculating FPS
+    frames_per_second.stop()
+    frames_per_second_value = frames_per_second.window_fps()
 
-        # Calculating FPS
-        frames_per_second.stop()
-        frames_per_second_value = frames_per_second.fps()
+    # Settings of config.toml, swapped between two frames when it is reloaded
+    current_settings = config_file_watcher.settings
+    if current_settings is not applied_settings:
+        current_settings.apply(pipeline)
+        applied_settings = current_settings
 
-        # Drawing FPS
-        if config["draw_info"]["fps"]:
-            frame = drawing_utils.text(
-                frame, f"FPS: {round(frames_per_second_value, 1)}", (width - 80, 0)
-            )
-        # Drawing ratios
-        if config["show_ratios"]["eye_aspect_ratio"]:
-            frame = drawing_utils.text_with_background(
+    # Deciding eyes open/closed and mouth yawning/normal of every face, feeding the alarms
+    stage_timers.start("ratios")
+    decisions = pipeline.process(faces_coordinates, capture_timestamp)
+    governor.update(pipeline, decisions)
+    stage_timers.stop("ratios")
+
+    stage_timers.start("overlay")
+    if len(decisions["face_ids"]):
+        for coordinates_index in decisions["coordinates_indices"]:
+            drawing_utils.face_landmarks(
                 frame,
-                f"(Left, Right) Eye Aspect Ratios: ({round(left_eye_aspect_ratio,3)}, {round(right_eye_aspect_ratio,3)})",
+                faces_coordinates[coordinates_index],
+                face=current_settings.draw_face_landmarks,
+                eye=current_settings.draw_eye_landmarks,
+                mouth=current_settings.draw_mouth_landmarks,
+            )
+
+        # Drawing FPS
+        if current_settings.draw_fps:
+            hud.text(f"FPS: {round(frames_per_second_value, 1)}", (width - 80, 0))
+        # Drawing ratios (of the face tracked the longest)
+        if current_settings.show_eye_aspect_ratio:
+            hud.text_with_background(
+                f"(Left, Right) Eye Aspect Ratios: ({round(decisions['left_eye_aspect_ratio'][0],3)}, {round(decisions['right_eye_aspect_ratio'][0],3)})",
                 (0, 0),
                 text_color=colors.GREEN,
                 background_color=colors.BLACK,
                 background_opacity=0.8,
             )
-        if config["show_ratios"]["mouth_aspect_ratio"]:
-            frame = drawing_utils.text_with_background(
-                frame,
-                f"Mouth Aspect Ratio: {round(mouth_aspect_ratio, 3)}",
+        if current_settings.show_mouth_aspect_ratio:
+            hud.text_with_background(
+                f"Mouth Aspect Ratio: {round(decisions['mouth_aspect_ratio'][0], 3)}",
                 (0, 23),
                 text_color=colors.GREEN,
                 background_color=colors.BLACK,
                 background_opacity=0.8,
             )
-        # Deciding eyes open or closed
-        if (
-            left_eye_aspect_ratio >= EYE_ASPECT_RATIO_THRESHOLD
-            or right_eye_aspect_ratio >= EYE_ASPECT_RATIO_THRESHOLD
-        ):
-            frame = drawing_utils.text_with_background(
-                frame,
+        # Drawing eyes state
+        if decisions["eyes_open"][0]:
+            hud.text_with_background(
                 "Eyes: OPEN",
                 (0, 46),
                 text_color=colors.BLACK,
                 background_color=colors.GREEN,
                 background_opacity=0.8,
             )
-            eyes_closed_alarm.add_bounded_frame(ok=True, fps=frames_per_second_value)
         else:
-            frame = drawing_utils.text_with_background(
-                frame,
+            hud.text_with_background(
                 "Eyes: CLOSE",
                 (0, 46),
                 text_color=colors.WHITE,
                 background_color=colors.RED,
                 background_opacity=0.8,
             )
-            eyes_closed_alarm.add_bounded_frame(ok=False, fps=frames_per_second_value)
-        # Deciding mouth yawning or normal
-        if mouth_aspect_ratio <= MOUTH_ASPECT_RATIO_THRESHOLD:
-            frame = drawing_utils.text_with_background(
-                frame,
+        # Drawing mouth state
+        if decisions["mouth_normal"][0]:
+            hud.text_with_background(
                 "Mouth: NORMAL",
                 (0, 69),
                 text_color=colors.BLACK,
                 background_color=colors.GREEN,
                 background_opacity=0.8,
             )
-            yawn_alarm.add_bounded_frame(ok=True, fps=frames_per_second_value)
         else:
-            frame = drawing_utils.text_with_background(
-                frame,
+            hud.text_with_background(
                 "Mouth: YAWNING",
                 (0, 69),
                 text_color=colors.WHITE,
                 background_color=colors.RED,
                 background_opacity=0.8,
             )
-            yawn_alarm.add_bounded_frame(ok=False, fps=frames_per_second_value)
-    cv.imshow("Drowsy Driver", frame)
+        # Labeling the faces, red while their alarm sounds
+        if MAX_NUM_FACES > 1:
+            for i, face_id in enumerate(decisions["face_ids"]):
+                face_x, face_y = faces_coordinates[
+                    decisions["coordinates_indices"][i]
+                ].min(axis=0)
+                alarming = (
+                    decisions["eyes_closed_alarming"][i]
+                    or decisions["yawn_alarming"][i]
+                )
+                hud.text_with_background(
+                    f"Face {face_id}",
+                    (int(face_x), max(int(face_y) - 23, 0)),
+                    text_color=colors.WHITE if alarming else colors.BLACK,
+                    background_color=colors.RED if alarming else colors.GREEN,
+                    background_opacity=0.8,
+                )
+    hud.compose(frame)
+    stage_timers.stop("overlay")
 
+    stage_timers.start("display")
+    cv.imshow("Drowsy Driver", frame)
     key_pressed = cv.waitKey(1)
+    stage_timers.stop("display")
     if key_pressed == ord("q"):
         break
     if key_pressed == ord(" "):
@@ -240,3 +286,17 @@ while True:
 # Cleaning up resources used
 cv.destroyAllWindows()
 camera.release()
+detector.close()
+metrics_exporter.stop()
+config_file_watcher.stop()
+alarm_audio_service.stop()
+print(f"[INFO] Inference governor: {governor.stats()}")
+print(
+    "[INFO] FPS: average {:.1f}, last {} frames {:.1f}, EWMA {:.1f}".format(
+        frames_per_second.fps(),
+        frames_per_second.window_size,
+        frames_per_second.window_fps(),
+        frames_per_second.ewma_fps(),
+    )
+)
+print("[INFO] Stage timings:\n" + stage_timers.report())
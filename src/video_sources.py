@@ -0,0 +1,19 @@
+# Video source utility functions
+#
+# Kept apart from video_stream, so that camera_supervisor can parse its sources
+# without loading OpenCV in the supervisor process.
+
+
+def parse_source(source):
+    """
+    Converts a camera source given as text to a device index if it is one.
+
+    Args:
+    - source (int or str): Device index, or path/URL of a video.
+
+    Returns:
+    - source (int or str): The device index as int, or the unchanged path/URL.
+    """
+    if isinstance(source, str) and source.isdigit():
+        return int(source)
+    return source
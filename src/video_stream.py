@@ -1,34 +1,88 @@
 # Video Stream Class (Uses Multithreading)
 
+import collections
 import threading
+import time
 import cv2 as cv
+import numpy as np
+
+import frame_buffer_pool
+
+# Drop policies of the frame queue
+# - latest: keeps only the newest frame, queue_size is ignored
+# - drop_oldest: keeps the newest queue_size frames, dropping the oldest one when full
+# - block: keeps queue_size frames, capture waits for the consumer when full
+DROP_POLICIES = ("latest", "drop_oldest", "block")
 
 
 class VideoStream:
-    def __init__(self, video_source_index: int = 0) -> None:
+    def __init__(
+        self,
+        video_source_index=0,
+        queue_size: int = 1,
+        drop_policy: str = "latest",
+        buffer_pool_size: int = 0,
+        stage_timers=None,
+    ) -> None:
         """
         Initializes the VideoStream object.
 
         Args:
-        - video_source_index (int): Index of the video source device.
+        - video_source_index (int or str): Index of the video source device, or path/URL of a video.
+        - queue_size (int): Maximum number of captured frames waiting to be read.
+        - drop_policy (str): What to do when the frame queue is full, one of DROP_POLICIES.
+        - buffer_pool_size (int): Number of preallocated frame buffers captured frames are read into,
+                                  0 allocates a new array per frame. Use at least queue_size + 2.
+        - stage_timers (StageTimers): Times the reads of the capture thread as the "capture" stage,
+                                      None to not time them.
 
         Attributes:
-        - video_source_index (int): Index of the video source device.
+        - video_source_index (int or str): Index of the video source device, or path/URL of a video.
         - stream: OpenCV VideoCapture object for capturing video frames.
-        - frame_read_success (bool): Flag indicating if the frame read was successful.
-        - frame: Captured video frame.
+        - queue_size (int): Maximum number of captured frames waiting to be read.
+        - drop_policy (str): What to do when the frame queue is full.
+        - buffer_pool (FrameBufferPool): Pool of frame buffers, None if not used.
+        - stage_timers (StageTimers): Times the reads of the capture thread, None to not time them.
+        - frames (collections.deque): Queue of captured (sequence_number, capture_timestamp, frame) entries.
+        - frames_condition: Threading condition guarding the frame queue.
+        - frame_read_success (bool): Flag indicating if the last frame read was successful.
+        - sequence_number (int): Sequence number of the last captured frame.
+        - frames_captured (int): Number of frames captured.
+        - frames_dropped (int): Number of captured frames dropped before being read.
+        - frames_read (int): Number of frames read by the consumer.
         - stream_started (bool): Flag indicating if the video stream has started.
         - stream_ended (bool): Flag indicating if the video stream has ended.
         - thread: Thread object for running the video stream update loop.
-        - read_lock: Threading lock for reading the video frame.
         """
+        if drop_policy not in DROP_POLICIES:
+            raise ValueError(
+                f"Unknown drop policy: {drop_policy}, expected one of {DROP_POLICIES}"
+            )
+        if queue_size < 1:
+            raise ValueError(f"Queue size must be at least 1, got {queue_size}")
         self.video_source_index = video_source_index
         self.stream = cv.VideoCapture(self.video_source_index)
-        (self.frame_read_success, self.frame) = self.stream.read()
+        self.queue_size: int = 1 if drop_policy == "latest" else queue_size
+        self.drop_policy: str = drop_policy
+        self.stage_timers = stage_timers
+        self.frames = collections.deque()
+        self.frames_condition = threading.Condition()
+        self.frame_read_success: bool = True
+        self.sequence_number: int = 0
+        self.frames_captured: int = 0
+        self.frames_dropped: int = 0
+        self.frames_read: int = 0
         self.stream_started: bool = False
         self.stream_ended: bool = False
         self.thread = None
-        self.read_lock = threading.Lock()
+        frame_read_success, frame = self.stream.read()
+        self.buffer_pool = None
+        if buffer_pool_size > 0 and frame_read_success:
+            self.buffer_pool = frame_buffer_pool.FrameBufferPool(
+                frame.shape, frame.dtype, buffer_pool_size
+            )
+        with self.frames_condition:
+            self.put_frame(frame_read_success, frame, time.perf_counter())
 
     def start(self):
         """
@@ -51,30 +105,141 @@ class VideoStream:
 
     def update(self) -> None:
         """
-        Continuously reads video frames from the video source and updates the frame attribute.
+        Continuously reads video frames from the video source and puts them in the frame queue.
 
         Returns:
         None
         """
         while not self.stream_ended:
-            (frame_read_success, frame) = self.stream.read()
-            with self.read_lock:
-                self.frame_read_success = frame_read_success
-                self.frame = frame
+            buffer = self.buffer_pool.acquire() if self.buffer_pool else None
+            if self.stage_timers is not None:
+                self.stage_timers.start("capture")
+            frame_read_success, frame = self.stream.read(buffer)
+            capture_timestamp = time.perf_counter()
+            if self.stage_timers is not None:
+                self.stage_timers.stop("capture")
+            if not frame_read_success:
+                self.release(buffer)
+            with self.frames_condition:
+                self.put_frame(frame_read_success, frame, capture_timestamp)
+
+    def put_frame(
+        self, frame_read_success: bool, frame, capture_timestamp: float
+    ) -> None:
+        """
+        Puts a captured frame in the frame queue, applying the drop policy.
+
+        Must be called with frames_condition held.
+
+        Args:
+        - frame_read_success (bool): Flag indicating if the frame read was successful.
+        - frame: The captured video frame.
+        - capture_timestamp (float): time.perf_counter() value at capture.
+
+        Returns:
+        None
+        """
+        if not frame_read_success:
+            # End of a video file, or the device went away
+            self.frame_read_success = False
+            self.stream_ended = True
+            self.frames_condition.notify_all()
+            return
+        if self.drop_policy == "block":
+            while len(self.frames) >= self.queue_size and not self.stream_ended:
+                self.frames_condition.wait()
+            if self.stream_ended:
+                # Not queued, the buffer goes back to the pool
+                self.release(frame)
+                return
+        elif len(self.frames) >= self.queue_size:
+            _, _, dropped_frame = self.frames.popleft()
+            self.release(dropped_frame)
+            self.frames_dropped += 1
+        self.sequence_number += 1
+        self.frames_captured += 1
+        self.frames.append((self.sequence_number, capture_timestamp, frame))
+        self.frames_condition.notify_all()
+
+    def read(self, timeout: float = None, into=None):
+        """
+        Reads the next captured video frame, waiting for one if the queue is empty.
+
+        Args:
+        - timeout (float): Maximum seconds to wait for a frame, None waits until one is captured.
+        - into (numpy.ndarray): Optional preallocated array the frame is copied into, the captured
+                                frame buffer is then given back to the pool right away.
+
+        Returns:
+        - frame_read_success (bool): Flag indicating if a frame was read.
+        - frame: The captured video frame (or into), None if no frame was read.
+        - sequence_number (int): Sequence number of the frame, gaps mean dropped frames.
+        - capture_timestamp (float): time.perf_counter() value at capture.
+
+        Notes:
+        - Every frame is handed out once, so the consumer never processes the same frame twice.
+        - The frame is not shared with the capture thread, so it is not copied. With a buffer pool
+          the consumer owns the frame buffer, and gives it back with release() when done with it.
+        """
+        with self.frames_condition:
+            self.frames_condition.wait_for(
+                lambda: self.frames or self.stream_ended, timeout
+            )
+            if not self.frames:
+                return False, None, self.sequence_number, None
+            sequence_number, capture_timestamp, frame = self.frames.popleft()
+            self.frames_read += 1
+            self.frames_condition.notify_all()
+        if into is not None:
+            np.copyto(into, frame)
+            self.release(frame)
+            frame = into
+        return True, frame, sequence_number, capture_timestamp
 
     def read_frame(self):
         """
-        Reads the latest video frame from the stream.
+        Reads the next captured video frame from the stream.
 
         Returns:
         - frame_read_success (bool): Flag indicating if the frame read was successful.
         - frame: The captured video frame.
         """
-        with self.read_lock:
-            frame_read_success = self.frame_read_success
-            frame = self.frame.copy()
+        frame_read_success, frame, _, _ = self.read()
         return frame_read_success, frame
 
+    def release(self, frame) -> None:
+        """
+        Gives a frame read from the stream back to the buffer pool.
+
+        Args:
+        - frame: The frame returned by read() or read_frame(), must not be used afterwards.
+
+        Returns:
+        None
+        """
+        if self.buffer_pool:
+            self.buffer_pool.release(frame)
+
+    def stats(self) -> dict:
+        """
+        Returns the capture statistics of the stream.
+
+        Returns:
+        - stats (dict): Frames captured, dropped and read, current queue depth, drop rate
+                        and buffer pool misses.
+        """
+        with self.frames_condition:
+            return {
+                "frames_captured": self.frames_captured,
+                "frames_dropped": self.frames_dropped,
+                "frames_read": self.frames_read,
+                "queue_depth": len(self.frames),
+                "drop_rate": self.frames_dropped / max(self.frames_captured, 1),
+                "buffer_pool_misses": (
+                    self.buffer_pool.misses if self.buffer_pool else 0
+                ),
+            }
+
     def end(self) -> None:
         """
         Ends the video stream by stopping the update loop and joining the thread.
@@ -82,9 +247,22 @@ class VideoStream:
         Returns:
         None
         """
-        self.stream_started = False
-        self.stream_ended = True
-        self.thread.join()
+        with self.frames_condition:
+            self.stream_started = False
+            self.stream_ended = True
+            self.frames_condition.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+
+    def close(self) -> None:
+        """
+        Ends the video stream, then releases the video capture.
+
+        Returns:
+        None
+        """
+        self.end()
+        self.stream.release()
 
     def width(self) -> int:
         """
@@ -106,9 +284,9 @@ class VideoStream:
 
     def __exit__(self, exec_type, exec_value, traceback) -> None:
         """
-        Releases the video stream resource when exiting the context.
+        Ends the video stream and releases its capture when exiting the context.
 
         Returns:
         None
         """
-        self.stream.release()
+        self.close()
@@ -0,0 +1,5 @@
+# The modules of src/ import each other by bare name, as when run from src/
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
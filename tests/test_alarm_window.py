@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from alarm_window import MAX_FRAME_GAP, AlarmWindow, AlarmWindowArray
+
+NUM_FACES = 6
+
+
+@pytest.mark.parametrize("seed", range(5))
+@pytest.mark.parametrize("time_threshold", [0.5, 2.0])
+def test_alarm_window_array_matches_alarm_window(seed, time_threshold):
+    rng = np.random.default_rng(seed)
+    # A small capacity, so that the ring buffers wrap around and grow
+    windows = AlarmWindowArray(NUM_FACES, time_threshold, capacity=4)
+    expected_windows = [AlarmWindow(time_threshold) for _ in range(NUM_FACES)]
+    # Some faces are "notok" much more often than others
+    notok_probabilities = rng.uniform(0.1, 0.9, size=NUM_FACES)
+
+    timestamp = 1000.0
+    alarming_frames = 0
+    for _ in range(1500):
+        timestamp += rng.choice(
+            [0.0, 1 / 30, 0.2, MAX_FRAME_GAP + 0.5], p=[0.03, 0.9, 0.05, 0.02]
+        ) * rng.uniform(0.8, 1.2)
+        # Faces come and go, those away longer than MAX_FRAME_GAP start over
+        indices = np.flatnonzero(rng.random(NUM_FACES) < 0.8)
+        rng.shuffle(indices)
+        ok = rng.random(len(indices)) >= notok_probabilities[indices]
+
+        alarming = windows.add(indices, ok, timestamp)
+        expected = [
+            expected_windows[index].add(face_ok, timestamp)
+            for index, face_ok in zip(indices.tolist(), ok.tolist())
+        ]
+        np.testing.assert_array_equal(alarming, expected)
+        alarming_frames += int(alarming.sum())
+        np.testing.assert_array_equal(
+            windows.notok_pending(indices),
+            [expected_windows[index].notok_pending() for index in indices.tolist()],
+        )
+        np.testing.assert_array_equal(
+            windows.notok_durations[indices],
+            [expected_windows[index].notok_duration for index in indices.tolist()],
+        )
+    assert alarming_frames > 0
+    assert windows.ends.shape[1] > 4
+
+
+def test_alarm_window_array_resets_after_a_gap():
+    windows = AlarmWindowArray(2, 1.0)
+    expected_windows = [AlarmWindow(1.0) for _ in range(2)]
+    for frame in range(60):
+        timestamp = frame / 30
+        assert windows.add([0, 1], [False, False], timestamp).tolist() == [
+            window.add(False, timestamp) for window in expected_windows
+        ]
+    assert windows.alarming.all()
+
+    # Only the second face was away longer than MAX_FRAME_GAP
+    timestamp += MAX_FRAME_GAP / 2
+    windows.add([0], [False], timestamp)
+    expected_windows[0].add(False, timestamp)
+    timestamp += MAX_FRAME_GAP / 2 + 0.1
+    alarming = windows.add([0, 1], [False, False], timestamp)
+    assert alarming.tolist() == [
+        window.add(False, timestamp) for window in expected_windows
+    ]
+    assert alarming.tolist() == [True, False]
+    assert windows.counts[1] == 0
@@ -0,0 +1,27 @@
+import pathlib
+import shutil
+
+from config_watcher import ConfigWatcher
+
+CONFIG_FILE_PATH = pathlib.Path(__file__).parent.parent / "config.toml"
+
+
+def test_failing_on_reload_does_not_stop_reloads(tmp_path, capsys):
+    config_file_path = tmp_path / "config.toml"
+    shutil.copy(CONFIG_FILE_PATH, config_file_path)
+    reloaded_configs = []
+
+    def on_reload(config):
+        reloaded_configs.append(config)
+        raise RuntimeError("main thread is not in main loop")
+
+    watcher = ConfigWatcher(str(config_file_path), on_reload=on_reload)
+    config_text = config_file_path.read_text()
+    for yawn_time_threshold in (5, 60):
+        config_file_path.write_text(
+            config_text.replace("yawn = 4", f"yawn = {yawn_time_threshold}")
+        )
+        assert watcher.check()
+        assert watcher.settings.yawn_time_threshold == yawn_time_threshold
+    assert len(reloaded_configs) == 2
+    assert "[WARNING] Reload callback" in capsys.readouterr().out
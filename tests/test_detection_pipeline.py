@@ -0,0 +1,65 @@
+import numpy as np
+
+from alarm_tracker import AlarmTracker
+from detection_pipeline import MultiFaceDetectionPipeline
+from landmark_detectors import SyntheticLandmarkDetector
+
+FPS = 30.0
+
+
+class CountingAlarm(AlarmTracker):
+    def __init__(self, time_threshold: int) -> None:
+        super().__init__(time_threshold)
+        self.triggered: int = 0
+
+    def trigger_alarm(self) -> None:
+        self.triggered += 1
+
+
+def run_driver_and_passenger(alarm_all_faces: bool) -> tuple:
+    """
+    Runs 4 seconds of an awake driver and a passenger whose eyes stay closed, the passenger
+    sitting to the right of the driver and appearing one frame later. The driver is not
+    detected on the last 5 frames.
+
+    Returns:
+    - pipeline (MultiFaceDetectionPipeline): The pipeline after the last frame.
+    - passenger_alarming (bool): Whether the passenger was alarming on the last frame.
+    """
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    driver = SyntheticLandmarkDetector(fps=FPS, closed_eye_aspect_ratio=0.3)
+    passenger = SyntheticLandmarkDetector(fps=FPS, open_eye_aspect_ratio=0.05, seed=1)
+    pipeline = MultiFaceDetectionPipeline(
+        CountingAlarm(1),
+        CountingAlarm(100),
+        0.15,
+        0.15,
+        0.4,
+        max_faces=2,
+        alarm_all_faces=alarm_all_faces,
+    )
+    num_frames = int(4 * FPS)
+    for frame_index in range(num_frames):
+        faces = []
+        if frame_index > 0:
+            faces.append(passenger.detect(frame) + np.array([300, 0], dtype=np.int32))
+        if frame_index < num_frames - 5:
+            faces.append(driver.detect(frame))
+        decisions = pipeline.process(np.concatenate(faces), frame_index / FPS)
+    passenger_alarming = bool(
+        decisions["eyes_closed_alarming"][decisions["face_ids"] == 1].all()
+    )
+    return (pipeline, passenger_alarming)
+
+
+def test_passenger_alarms_stay_silent():
+    pipeline, passenger_alarming = run_driver_and_passenger(alarm_all_faces=False)
+    assert passenger_alarming
+    assert pipeline.eyes_closed_alarms.alarms_started_total == 1
+    assert pipeline.eyes_closed_alarm.triggered == 0
+
+
+def test_passenger_alarms_sound_with_alarm_all_faces():
+    pipeline, passenger_alarming = run_driver_and_passenger(alarm_all_faces=True)
+    assert passenger_alarming
+    assert pipeline.eyes_closed_alarm.triggered > 0
@@ -0,0 +1,32 @@
+import sys
+import threading
+
+from fps import StageTimers
+
+
+def test_stage_timers_stats_while_stages_are_added():
+    stage_timers = StageTimers(window_size=10)
+    stopped = threading.Event()
+
+    def time_stages():
+        for index in range(20000):
+            stage = f"stage_{index % 2000}"
+            stage_timers.start(stage)
+            stage_timers.stop(stage)
+        stopped.set()
+
+    # Switching threads often, so that stats runs while stages are added
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        thread = threading.Thread(target=time_stages)
+        thread.start()
+        while not stopped.is_set():
+            stage_timers.report()
+        thread.join()
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    stats = stage_timers.stats()
+    assert len(stats) == 2000
+    assert all(stage_stats["count"] == 10 for stage_stats in stats.values())
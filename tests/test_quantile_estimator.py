@@ -0,0 +1,87 @@
+import numpy as np
+import pytest
+
+from quantile_estimator import QuantileEstimatorArray
+
+QUANTILES = np.array([0.05, 0.5, 0.95])
+
+# Independent streams per quantile, so the tolerances hold for most, and at worst
+NUM_STREAMS = 100
+
+
+def estimate(values):
+    """
+    Streams (N, 3, NUM_STREAMS) values through an estimator of QUANTILES.
+
+    Returns:
+    - estimates (numpy.ndarray): (3, NUM_STREAMS) estimated quantiles.
+    - exact (numpy.ndarray): (3, NUM_STREAMS) numpy.quantile of the values.
+    """
+    estimator = QuantileEstimatorArray(
+        np.repeat(QUANTILES[:, None], values.shape[2], axis=1)
+    )
+    for row in values:
+        estimator.add(row)
+    exact = np.stack(
+        [
+            np.quantile(values[:, index], quantile, axis=0)
+            for index, quantile in enumerate(QUANTILES)
+        ]
+    )
+    return estimator.estimates(), exact
+
+
+@pytest.mark.parametrize("count", [1, 2, 3, 4])
+def test_first_values_are_exact(count):
+    rng = np.random.default_rng(count)
+    quantiles = rng.uniform(0.01, 0.99, size=(2, 8))
+    values = rng.normal(size=(count, 2, 8))
+    estimator = QuantileEstimatorArray(quantiles)
+    for row in values:
+        estimator.add(row)
+    exact = np.array(
+        [
+            [
+                np.quantile(values[:, row, column], quantiles[row, column])
+                for column in range(8)
+            ]
+            for row in range(2)
+        ]
+    )
+    np.testing.assert_allclose(estimator.estimates(), exact)
+
+
+# Tolerances in standard deviations of a standard normal: 210 values are a 7 s calibration at
+# 30 fps, where P² is still off by up to a few standard errors of the sample quantile (0.15 for
+# the 5th and 95th percentiles)
+@pytest.mark.parametrize(
+    "count, median_tolerance, max_tolerance", [(210, 0.1, 0.6), (2000, 0.03, 0.1)]
+)
+def test_estimates_match_numpy_quantile(count, median_tolerance, max_tolerance):
+    values = np.random.default_rng(7).normal(size=(count, 3, NUM_STREAMS))
+    estimates, exact = estimate(values)
+    errors = np.abs(estimates - exact)
+    assert np.median(errors) < median_tolerance
+    assert errors.max() < max_tolerance
+
+
+def test_outlier_barely_moves_estimates():
+    values = np.random.default_rng(3).normal(size=(210, 3, NUM_STREAMS))
+    values[100] = 1000.0
+    estimates, exact = estimate(values)
+    assert np.abs(estimates - exact).max() < 0.6
+    assert estimates.max() < 5.0
+
+
+def test_reset_forgets_values():
+    rng = np.random.default_rng(5)
+    estimator = QuantileEstimatorArray(np.full(4, 0.95))
+    for row in rng.normal(size=(50, 4)):
+        estimator.add(row)
+    estimator.reset()
+    assert np.isnan(estimator.estimates()).all()
+    fresh = QuantileEstimatorArray(np.full(4, 0.95))
+    for row in rng.normal(size=(50, 4)):
+        estimator.add(row)
+        fresh.add(row)
+    np.testing.assert_array_equal(estimator.estimates(), fresh.estimates())
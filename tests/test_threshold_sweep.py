@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from alarm_window import MAX_FRAME_GAP, AlarmWindow
+from threshold_sweep import sweep_alarms
+
+TIME_THRESHOLDS = np.array([0.5, 1.0, 2.0, 3.5])
+
+
+def random_session(rng, num_frames: int, num_sequences: int):
+    """
+    Draws a session of frames as a camera and a driver would produce them.
+
+    Frame intervals are mostly around 1/30 s, some repeated timestamps, some stalls
+    longer than MAX_FRAME_GAP. "notok" comes in runs (blinks, closures) of random length.
+
+    Returns:
+    - notok_frames (numpy.ndarray): (num_sequences, num_frames) "notok" flags.
+    - timestamps (numpy.ndarray): (num_frames,) nondecreasing timestamps in seconds.
+    """
+    intervals = rng.choice(
+        [0.0, 1 / 30, 1 / 15, 0.2, MAX_FRAME_GAP, MAX_FRAME_GAP + 0.5],
+        p=[0.02, 0.78, 0.12, 0.05, 0.015, 0.015],
+        size=num_frames,
+    ) * rng.uniform(0.8, 1.2, size=num_frames)
+    timestamps = 1000.0 + np.cumsum(intervals)
+    # Runs of random state, the longer runs of "notok" start the alarms
+    notok_frames = np.empty((num_sequences, num_frames), dtype=bool)
+    for sequence in notok_frames:
+        frame = 0
+        while frame < num_frames:
+            run = int(rng.geometric(1 / rng.choice([3, 30, 120])))
+            sequence[frame : frame + run] = rng.random() < 0.5
+            frame += run
+    return (notok_frames, timestamps)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_sweep_alarms_counts_the_alarms_of_alarm_window(seed):
+    rng = np.random.default_rng(seed)
+    notok_frames, timestamps = random_session(rng, 3000, 6)
+    alarms, _ = sweep_alarms(notok_frames, TIME_THRESHOLDS, timestamps)
+
+    expected = np.zeros_like(alarms)
+    for sequence_index, notok in enumerate(notok_frames):
+        for time_index, time_threshold in enumerate(TIME_THRESHOLDS):
+            window = AlarmWindow(time_threshold)
+            # An alarm starts where the condition holds and did not on the previous frame
+            was_alarming = False
+            for frame_notok, timestamp in zip(notok.tolist(), timestamps.tolist()):
+                alarming = window.add(not frame_notok, timestamp)
+                expected[sequence_index, time_index] += alarming and not was_alarming
+                was_alarming = alarming
+    assert expected.sum() > 0
+    np.testing.assert_array_equal(alarms, expected)
+
+
+def test_sweep_alarms_without_frames():
+    alarms, latencies = sweep_alarms(
+        np.zeros((3, 0), dtype=bool), TIME_THRESHOLDS, np.zeros(0)
+    )
+    assert alarms.shape == latencies.shape == (3, len(TIME_THRESHOLDS))
+    assert not alarms.any()